@@ -18,7 +18,7 @@ def make_3D_figure(save_filename):
 
     best_bodies_info = []
     for ax, name, letter in list(zipper)[:]:
-        current_sim = Simulation.load_from_folder(f"simulations/{name}")
+        current_sim = Simulation.load_from_folder(f"simulations/{name}", load_positions=False)
         if name in ["L1_tracking_5", "L2", "L3"]:
             factors = (1, 1e3)
             ax.set_xlabel(r"$D_{\odot x}$ [Gm]")
@@ -63,7 +63,7 @@ def make_2D_figure(save_filename, split_figures: bool=False):
 
     best_bodies_info = []
     for ax, name, letter in list(zipper)[:]:
-        current_sim = Simulation.load_from_folder(f"simulations/{name}")
+        current_sim = Simulation.load_from_folder(f"simulations/{name}", load_positions=False)
         if name in ["L1_tracking_5", "L2", "L3"]:
             factors = (1, 1e3)
             ax.set_ylabel(r"$D_{\odot y}$ [Mm]")
@@ -33,6 +33,8 @@ if __name__ == '__main__':
             (0,                                        0)
         ],
         save_foldername=f"simulations/L1",
+        use_ephemeris=True,
+        ephemeris_cache_foldername="simulations/ephemeris_cache",
         simulation_duration=3e8,
         integrator="synchronous",
         positions_saving_frequency=1,
@@ -1,11 +1,13 @@
 from __future__ import annotations
 
+import numpy as np
 from copy import deepcopy
 from warnings import filterwarnings
 
 from src.fields.scalar_field import ScalarField
 from src.fields.vector_field import VectorField
 from src.tools.vector import Vector
+from src.tools.trajectory_buffer import TrajectoryBuffer
 
 filterwarnings('ignore')
 
@@ -68,6 +70,12 @@ class Body:
         """
 
         raise NotImplementedError
+
+    def __setstate__(self, state: dict):
+        # Bodies pickled before the trajectory buffers stored their positions as a list
+        if "positions" in state:
+            state["trajectory"] = TrajectoryBuffer(state.pop("positions"))
+        self.__dict__.update(state)
     
     def __str__(self):
         return (f"fixed: {self.fixed}, has_potential: {self.has_potential}, " + 
@@ -125,6 +133,32 @@ class Body:
 
         raise NotImplementedError
 
+    @property
+    def positions(self) -> np.ndarray:
+        """
+        Gives the saved positions of the body.
+
+        Returns
+        -------
+        positions : np.ndarray
+            The (T,3) view of the saved positions, which is valid until the next saved position.
+        """
+
+        return self.trajectory.array
+
+    @positions.setter
+    def positions(self, positions: list | np.ndarray):
+        """
+        Replaces the saved positions of the body.
+
+        Parameters
+        ----------
+        positions : list | np.ndarray
+            Any sequence of positions, such as a (T,3) array, which is then used without being copied.
+        """
+
+        self.trajectory = TrajectoryBuffer(positions)
+
     @property
     def position(self) -> Vector:
         """
@@ -3,6 +3,9 @@ from numpy.random import randint
 from random import choice
 
 from src.bodies.gravitational_body import GravitationalBody
+from src.tools.vector import Vector
+from src.tools.decimation import reconstruct
+from src.tools.trajectory_codec import decode
 
 
 class ComputedBody(GravitationalBody):
@@ -10,6 +13,17 @@ class ComputedBody(GravitationalBody):
     A class to create bodies that are updated using sequences of positions and not the system's physics.
     """
 
+    # Index of the next position to play, defined at the class level for bodies pickled before its introduction
+    _cursor = 0
+    # Indices of the saved samples of a decimated trajectory, None if every sample is saved
+    sample_indices = None
+    # Trajectory encoded by src.tools.trajectory_codec, None if the positions are saved as they are
+    encoded_trajectory = None
+    # System whose playback gives the body's state and row of the body in it, see ComputedSystem.seek
+    _playback = None
+    playback_row = None
+    _dead = False
+
     def __init__(self, positions: list, type: str, time_survived: int = None, *args, **kwargs):
         """
         Defines required parameters.
@@ -17,7 +31,8 @@ class ComputedBody(GravitationalBody):
         Parameters
         ----------
         positions : list
-            Specifies the positions of the body at every time step.
+            Specifies the positions of the body at every time step. Any sequence of positions is accepted, such as a
+            (T,3) array.
         type : str
             Specifies the body's type. Supported types are: "base_body", "alive" and "dead".
         time_survived : int
@@ -33,8 +48,72 @@ class ComputedBody(GravitationalBody):
         self.type = type
         self.time_survived = time_survived
 
+    def __getstate__(self) -> dict:
+        # The playback belongs to the system that is playing the body
+        state = self.__dict__.copy()
+        state.pop("_playback", None)
+        state.pop("playback_row", None)
+        return state
+
+    def __setstate__(self, state: dict):
+        # Encoded and decimated trajectories are reconstructed as soon as they are loaded
+        if "dead" in state:
+            state["_dead"] = state.pop("dead")
+        super().__setstate__(state)
+        if self.encoded_trajectory is not None:
+            self.positions = decode(self.encoded_trajectory)
+            self.encoded_trajectory = None
+        if self.sample_indices is not None:
+            self.positions = reconstruct(self.sample_indices, self.positions)
+            self.sample_indices = None
+
     def __str__(self):
         return super().__str__() + f" type: {self.type}, len(positions): {len(self.positions)}"
+
+    @property
+    def position(self) -> Vector:
+        """
+        Gives the body's position as a Vector object, read from the playback of its system if it is being played.
+
+        Returns
+        -------
+        position : Vector
+            The body's position.
+        """
+
+        if self._playback is not None:
+            return Vector(*self._playback.playback_positions[self.playback_row])
+        return self._position
+
+    @property
+    def dead(self) -> bool:
+        """
+        Gives whether the body has played all of its trajectory, read from the playback of its system if it is being
+        played.
+        """
+
+        if self._playback is not None:
+            return bool(self._playback.dead_mask[self.playback_row])
+        return self._dead
+
+    @dead.setter
+    def dead(self, dead: bool):
+        self._dead = dead
+
+    def set_playback(self, system, row: int):
+        """
+        Make the body read its state from the playback of a system.
+
+        Parameters
+        ----------
+        system : ComputedSystem
+            System playing the body.
+        row : int
+            Row of the body in the system's playback arrays.
+        """
+
+        self._playback = system
+        self.playback_row = row
     
     def to_gravitational_body(self) -> GravitationalBody:
         """
@@ -57,15 +136,38 @@ class ComputedBody(GravitationalBody):
 
     def update(self):
         """
-        Update the body's position.
+        Update the body's position to its next sample.
         """
 
-        if self.positions:
-            self._position = self.positions[0]
-            del self.positions[0]
+        if self._cursor < len(self.positions):
+            self._position = Vector(*self.positions[self._cursor])
+            self._cursor += 1
         else:
             self.dead = True
 
+    def seek(self, sample: float):
+        """
+        Place the body at a point of its trajectory. The positions between two saved samples are interpolated
+        linearly and the body is dead past its last sample.
+
+        Parameters
+        ----------
+        sample : float
+            Index of the sample at which to place the body, which may be fractional.
+        """
+
+        last = len(self.positions) - 1
+        self.dead = sample > last
+        if last < 0:
+            return
+        i = min(max(int(sample), 0), last)
+        fraction = sample - i
+        self._cursor = i + 1
+        if 0 < fraction and i < last:
+            self._position = Vector(*(self.positions[i] + fraction * (self.positions[i+1] - self.positions[i])))
+        else:
+            self._position = Vector(*self.positions[i])
+
     def get_color(self, random_tuple=True) -> str | tuple[int, int, int]:
         """
         Get the color of the body depending on its type.
@@ -1,7 +1,8 @@
-from numpy import arctan2, cos, pi, sin
+from numpy import arctan2, cos, pi, sin, ndarray
 
 from src.bodies.gravitational_body import GravitationalBody
 from src.tools.vector import Vector
+from src.tools.trajectory_buffer import TrajectoryBuffer
 
 
 class FakeBody:
@@ -23,7 +24,7 @@ class FakeBody:
         self.has_potential = False
         self.integrator = None
         self.time_survived = 1e20
-        self.positions = []
+        self.trajectory = TrajectoryBuffer()
         self.type = self.__class__.__name__
 
     def __call__(self, attractive_bodies: list[GravitationalBody]):
@@ -33,6 +34,25 @@ class FakeBody:
 
         raise NotImplementedError
 
+    def __setstate__(self, state: dict):
+        # Bodies pickled before the trajectory buffers stored their positions as a list
+        if "positions" in state:
+            state["trajectory"] = TrajectoryBuffer(state.pop("positions"))
+        self.__dict__.update(state)
+
+    @property
+    def positions(self) -> ndarray:
+        """
+        Gives the saved positions of the body.
+
+        Returns
+        -------
+        positions : ndarray
+            The (T,3) view of the saved positions, which is valid until the next saved position.
+        """
+
+        return self.trajectory.array
+
     @property
     def position(self) -> Vector:
         """
@@ -73,10 +93,10 @@ class FakeBody:
 
     def save_position(self):
         """
-        Saves the current position of the body to the positions list.
+        Saves the current position of the body to the positions array.
         """
 
-        self.positions.append(self._position)
+        self.trajectory.append(self._position)
 
 
 class L1Body(FakeBody):
@@ -1,7 +1,10 @@
 from __future__ import annotations
 
+from typing import Callable
+
 from scipy.constants.constants import gravitational_constant
 from eztcolors import Colors as C
+from numpy import array
 from numpy.linalg import norm
 from numpy.random import randint
 
@@ -10,6 +13,7 @@ from src.fields.scalar_field import ScalarField
 from src.fields.vector_field import VectorField
 from src.tools.vector import Vector
 from src.simulator.lambda_func import Lambda
+from src.tools.adaptive_integrator import integrate_adaptive
 
 
 class GravitationalBody(Body):
@@ -18,6 +22,11 @@ class GravitationalBody(Body):
     position and velocity.
     """
 
+    # Last substep of the adaptive integration, defined at the class level for bodies pickled before its introduction
+    adaptive_step = None
+    # Number of steps of the system when the body was removed as dead, None while the body is alive
+    death_step = None
+
     def __init__(
             self,
             mass: float,
@@ -61,7 +70,7 @@ class GravitationalBody(Body):
             self.yoshida_d_constants = (w_1, w_0, w_1)
 
         super().__init__(position, velocity, fixed, has_potential)
-        assert mass > 0, "mass must be positive"
+        assert mass >= 0, "mass must not be negative"
         self.mass = mass
         self.dead = False   # Whether the body is dead or not and should be removed from the display
         self.time_survived = 0
@@ -230,12 +239,61 @@ class GravitationalBody(Body):
 
         self(time_step, field, epsilon, method)
 
+    def adaptive_update(
+            self,
+            time_step: float,
+            field: ScalarField | VectorField | Callable[[float], ScalarField | VectorField],
+            tolerance: float,
+            method: str = "potential"
+    ) -> None:
+        """
+        Updates the position and velocity of the body according to an interaction field and time step, using as many
+        substeps as needed to keep the local error on the position below a tolerance. The substeps are chosen by an
+        embedded Runge-Kutta method and the body's integrator is ignored.
+
+        Parameters
+        ----------
+        time_step : float
+            The time step by which the body is advanced, which is also the largest allowed substep.
+        field : ScalarField | VectorField | Callable[[float], ScalarField | VectorField]
+            The interaction causing the body's acceleration. If the interaction's sources move during the step, a
+            function giving the interaction at a time elapsed since the beginning of the step can be given instead.
+        tolerance : float
+            The maximum local error on the position, in the field's space unit.
+        method : str
+            The acceleration computation method, "potential" uses the gradient of the potential field and "force" uses
+            a force field, defaults to "potential".
+        """
+
+        assert method in ["potential", "force"], 'The currently implemented methods are: "potential", "force"'
+
+        if isinstance(field, (ScalarField, VectorField)):
+            field_at = lambda time: field
+        else:
+            field_at = field
+        if method == "force":
+            acceleration = lambda times, positions: field_at(times[0]).evaluate(positions)
+        else:
+            acceleration = lambda times, positions: -field_at(times[0]).get_gradients(positions)
+        positions, velocities, steps, _ = integrate_adaptive(
+            [tuple(self._position)],
+            [tuple(self._velocity)],
+            time_step,
+            acceleration,
+            tolerance,
+            array([self.adaptive_step if self.adaptive_step is not None else float("nan")])
+        )
+        self._position = Vector(*positions[0])
+        self._velocity = Vector(*velocities[0])
+        self.adaptive_step = steps[0]
+        self.time_survived += time_step
+
     def save_position(self):
         """
-        Saves the current position of the body to the positions list.
+        Saves the current position of the body to the positions array.
         """
 
-        self.positions.append(self._position)
+        self.trajectory.append(self._position)
 
     @property
     def potential(self) -> ScalarField:
@@ -280,7 +338,7 @@ class GravitationalBody(Body):
         potential : ScalarField
             Potential field to evaluate the body's acceleration.
         epsilon : float
-            The space interval with which the gradient is computed.
+            Kept for compatibility, the potential's gradient is computed in closed form.
         potential_gradient_limit: float
             Limit above which the body is considered dead.
         body_alive_limits: Lambda
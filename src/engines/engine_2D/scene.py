@@ -1,6 +1,7 @@
 from pygame.font import SysFont
 
 from src.engines.engine_2D.models import *
+from src.engines.playback import ObjectsPlayback
 from src.systems.computed_system import ComputedSystem
 
 # from numpy import arctan, pi
@@ -18,6 +19,7 @@ class Scene:
             self.load_objects(app.objects)
         if app.simulation:
             self.system = app.simulation.system
+            self.playback = ObjectsPlayback(self.system)
             self.load_simulation()
         self.current_tick = 0
 
@@ -61,14 +63,19 @@ class Scene:
                 self.system.update(self.app.simulation.maximum_delta_time)
                 self.current_tick -= self.app.simulation.maximum_delta_time
 
-            # Update display
-            for obj in self.objects:
-                if not obj.instance.dead:
-                    obj.move((obj.instance.position[0], obj.instance.position[1]))
+            # Update display, the played bodies' state being read at once from the system's playback arrays
+            positions, dead_mask = self.playback.get_states(self.objects)
+            kept_objects = []
+            for obj, position, dead in zip(self.objects, positions.tolist(), dead_mask.tolist()):
+                if not dead:
+                    if obj.instance:
+                        obj.move((position[0], position[1]))
                     obj.update()
+                    kept_objects.append(obj)
                 else:
                     obj.destroy()
-                    self.objects.remove(obj)
+            self.objects = kept_objects
+            self.playback.keep(~dead_mask)
 
         else:
             for obj in self.objects:
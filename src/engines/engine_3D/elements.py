@@ -1,6 +1,7 @@
 from typing import Callable
 from eztcolors import Colors as C
 
+from src.fields.potential_tile_cache import shared_cache
 from src.systems.computed_system import ComputedSystem
 from src.tools.vector import Vector
 from src.engines.engine_3D.models import *
@@ -68,7 +69,9 @@ class Function3D(Element3D):
             y_limits: tuple=(-100,100),
             instance: ComputedSystem=None,
             hidden: bool=False,
-            save_filename: str=None
+            save_filename: str=None,
+            potential_solver: str="direct",
+            use_tile_cache: bool=False
         ):
         """
         Initialize a Function3D object. All coordinates are given in tuples of x, y, z.
@@ -101,6 +104,13 @@ class Function3D(Element3D):
             If present, allows to quickly save and load the created vertices for later use. If the Function3D is used
             for the first time, the file will be created at the provided filename and the file will be loaded for every
             subsequent uses. The file's extension should be .gz. Defaults to None.
+        potential_solver : str, optional
+            Solver used to evaluate the instance's potential on the plane's vertices: "direct" or "particle-mesh". See
+            ScalarField.get_potential_field. Defaults to "direct".
+        use_tile_cache : bool, optional
+            If True, the instance's potential is interpolated from the tiles of the shared PotentialTileCache, which
+            are reused by every rebuild of the plane as long as the potential does not change, e.g. if the attractive
+            bodies are fixed. Defaults to False.
         """
         assert not save_filename or save_filename.endswith('.gz'), (
             f"{C.RED+C.BOLD}save_filename extension must be .gz, not {save_filename.split('.')[-1]}.{C.END}")
@@ -113,8 +123,23 @@ class Function3D(Element3D):
         self.y_limits = y_limits
         self.save_filename = save_filename
         self.hidden = hidden
+        self.potential_solver = potential_solver
+        self.use_tile_cache = use_tile_cache
         if instance:
             self.update()
 
     def update(self):
-        self.function = lambda x, y: self.instance.get_potential_function()(Vector(x,y,0)) * 1e10# + self.i
+        if self.use_tile_cache:
+            # The potential is interpolated on the regular grid given by the meshgrid arrays x and y, indexed [y,x]
+            self.function = lambda x, y: shared_cache.get_image(
+                self.instance.get_potential_function(), (x.min(), y.min()), (x.max(), y.max()),
+                (x.shape[1], x.shape[0]), solver=self.potential_solver
+            ).T * 1e10
+        elif self.potential_solver == "particle-mesh":
+            # The potential is computed on the regular grid given by the meshgrid arrays x and y, indexed [y,x]
+            self.function = lambda x, y: self.instance.get_potential_function().get_potential_field(
+                Vector(x.min(), y.min(), 0), Vector(x.max(), y.max(), 0), {"x": x.shape[1], "y": x.shape[0]},
+                (0, 0, 0), solver="particle-mesh"
+            )[:,:,0].T * 1e10
+        else:
+            self.function = lambda x, y: self.instance.get_potential_function()(Vector(x,y,0)) * 1e10# + self.i
@@ -2,6 +2,7 @@ from pygame.font import SysFont
 from astropy.constants import M_sun, M_earth, R_sun, R_earth
 
 from src.engines.engine_3D.models import *
+from src.engines.playback import ObjectsPlayback
 
 from src.systems.computed_system import ComputedSystem
 from src.bodies.fake_body import FakeBody
@@ -20,6 +21,7 @@ class Scene:
             self.load_surfaces(app.functions)
         if app.simulation:
             self.system = app.simulation.system
+            self.playback = ObjectsPlayback(self.system)
             self.load_simulation()
         self.skybox = Skybox(app)
         self.current_tick = 0
@@ -86,14 +88,20 @@ class Scene:
                 self.system.update(self.app.simulation.maximum_delta_time)
                 self.current_tick -= self.app.simulation.maximum_delta_time
 
-            # Update objects on display
-            for obj in self.objects:
+            # Update objects on display, the played bodies' state being read at once from the system's playback
+            # arrays
+            positions, dead_mask = self.playback.get_states(self.objects)
+            kept_objects = []
+            for obj, position, dead in zip(self.objects, positions.tolist(), dead_mask.tolist()):
                 if obj.instance:
-                    if not obj.instance.dead:
-                        obj.move(tuple(obj.instance.position))
+                    if not dead:
+                        obj.move(tuple(position))
                     else:
                         obj.destroy()
-                        self.objects.remove(obj)
+                        continue
+                kept_objects.append(obj)
+            self.objects = kept_objects
+            self.playback.keep(~dead_mask)
 
         else:
             # Keep old methods for legacy
@@ -0,0 +1,74 @@
+import numpy as np
+
+from src.systems.computed_system import ComputedSystem
+
+
+class ObjectsPlayback:
+    """
+    Reads the state of the objects displayed by a scene. The states of the bodies played by a ComputedSystem are
+    gathered from its (N,3) playback_positions and (N,) dead_mask arrays in a single indexing operation, the playback
+    row of every object being found once, after the system has built its playback. The other instances, such as the
+    bodies of a simulated system, are read one by one.
+    """
+
+    def __init__(self, system):
+        """
+        Initialize an ObjectsPlayback object.
+
+        Parameters
+        ----------
+        system : BaseSystem
+            The system of the displayed simulation.
+        """
+
+        self.system = system
+        # Playback row of every object, -1 for the objects whose instance is not played
+        self.rows = None
+
+    def get_states(self, objects: list) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Gives the position and the dead state of the instances of the displayed objects.
+
+        Parameters
+        ----------
+        objects : list
+            The displayed objects, whose instance is a body or None. It must be the list given at the previous call,
+            filtered with the keep method.
+
+        Returns
+        -------
+        positions, dead_mask : tuple[np.ndarray, np.ndarray]
+            The (M,3) array of the objects' positions and the (M,) array of whether each object's instance is dead.
+            The objects without instance are given NaN positions and are never dead.
+        """
+
+        if self.rows is None and isinstance(self.system, ComputedSystem) and self.system.playback_bodies is not None:
+            self.rows = np.array([
+                row if (row := getattr(obj.instance, "playback_row", None)) is not None else -1 for obj in objects
+            ], dtype=int)
+        positions = np.full((len(objects), 3), np.nan)
+        dead_mask = np.zeros(len(objects), dtype=bool)
+        played = np.zeros(len(objects), dtype=bool)
+        if self.rows is not None:
+            played = self.rows >= 0
+            positions[played] = self.system.playback_positions[self.rows[played]]
+            dead_mask[played] = self.system.dead_mask[self.rows[played]]
+        for i in np.flatnonzero(~played):
+            instance = objects[i].instance
+            if instance is not None:
+                positions[i] = tuple(instance.position)
+                dead_mask[i] = instance.dead
+        return positions, dead_mask
+
+    def keep(self, kept: list[bool]):
+        """
+        Removes the objects that are no longer displayed.
+
+        Parameters
+        ----------
+        kept : list[bool]
+            Whether each object given to the last get_states call is kept.
+        """
+
+        if self.rows is not None:
+            self.rows = self.rows[np.asarray(kept, dtype=bool)]
@@ -1,21 +1,277 @@
+from __future__ import annotations
+
+from typing import List, Tuple
+
+from numpy import all as np_all, array, asarray, broadcast_arrays, concatenate, einsum, ndarray, ones, sqrt, stack, \
+    zeros
+
 from src.tools.vector import Vector
 
 
 class Field:
     """
-    A class used to compute and define a field.
+    A class used to compute and define a field. The terms are stored in packed arrays of powers, coefficients and
+    origins so that the field can be evaluated on many positions at once. Arithmetic operations never modify the
+    operands and always return a new field.
     """
 
-    def __add__(self, other):
+    def __init__(self, terms: List[Tuple[float, float, Vector]] = None):
+        """
+        Defines the required parameters.
+
+        Parameters
+        ----------
+        terms : List[Tuple[float, float, Vector]]
+            A list of the different terms of the equation defining the field. Each term is composed of a tuple with
+            three elements: the position's power within the term, the coefficient multiplying the position factor and
+            the origin from which the term is computed. Defaults to a field without terms.
+        """
+
+        terms = terms or []
+        self._size = len(terms)
+        self._powers = zeros(max(self._size, 4))
+        self._coefficients = zeros(max(self._size, 4))
+        self._origins = zeros((max(self._size, 4), 3))
+        for i, (power, coefficient, origin) in enumerate(terms):
+            self._powers[i] = power
+            self._coefficients[i] = coefficient
+            self._origins[i] = tuple(origin)
+
+    @classmethod
+    def from_arrays(cls, powers: ndarray, coefficients: ndarray, origins: ndarray) -> Field:
+        """
+        Creates a field directly from the packed arrays of its terms, without copying them.
+
+        Parameters
+        ----------
+        powers : ndarray
+            The (T,) array of each term's power.
+        coefficients : ndarray
+            The (T,) array of each term's coefficient.
+        origins : ndarray
+            The (T,3) array of each term's origin.
+
+        Returns
+        -------
+        field : Field
+            The field of the same class as the one used to call the method.
+        """
+
+        field = cls.__new__(cls)
+        field._size = len(powers)
+        field._powers = asarray(powers, dtype=float)
+        field._coefficients = asarray(coefficients, dtype=float)
+        field._origins = asarray(origins, dtype=float).reshape(-1, 3)
+        return field
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def powers(self) -> ndarray:
+        """
+        Gives the power of every term of the field.
+
+        Returns
+        -------
+        powers : ndarray
+            The (T,) array of each term's power.
+        """
+
+        return self._powers[:self._size]
+
+    @property
+    def coefficients(self) -> ndarray:
+        """
+        Gives the coefficient of every term of the field.
+
+        Returns
+        -------
+        coefficients : ndarray
+            The (T,) array of each term's coefficient.
+        """
+
+        return self._coefficients[:self._size]
+
+    @property
+    def origins(self) -> ndarray:
+        """
+        Gives the origin of every term of the field.
+
+        Returns
+        -------
+        origins : ndarray
+            The (T,3) array of each term's origin.
+        """
+
+        return self._origins[:self._size]
+
+    @property
+    def terms(self) -> List[Tuple[float, float, Vector]]:
+        """
+        Gives the terms of the field in the form of tuples.
+
+        Returns
+        -------
+        terms : List[Tuple[float, float, Vector]]
+            A list of the (power, coefficient, origin) tuple of every term.
+        """
+
+        return [(float(power), float(coefficient), Vector(*map(float, origin)))
+                for power, coefficient, origin in zip(self.powers, self.coefficients, self.origins)]
+
+    def append(self, power: float, coefficient: float, origin: Vector):
+        """
+        Appends a term to the field in place. The storage grows geometrically so appending is O(1) amortized.
+
+        Parameters
+        ----------
+        power : float
+            The position's power within the term.
+        coefficient : float
+            The coefficient multiplying the position factor.
+        origin : Vector
+            The origin from which the term is computed.
+        """
+
+        if self._size == len(self._powers):
+            capacity = max(2 * self._size, 4)
+            self._powers = concatenate((self._powers, zeros(capacity - self._size)))
+            self._coefficients = concatenate((self._coefficients, zeros(capacity - self._size)))
+            self._origins = concatenate((self._origins, zeros((capacity - self._size, 3))))
+        self._powers[self._size] = power
+        self._coefficients[self._size] = coefficient
+        self._origins[self._size] = tuple(origin)
+        self._size += 1
+
+    def without_term(self, index: int) -> Field:
+        """
+        Gives a copy of the field without one of its terms.
+
+        Parameters
+        ----------
+        index : int
+            The index of the term to remove.
+
+        Returns
+        -------
+        updated_field : Field
+            The field made from every other term.
+        """
+
+        kept = ones(self._size, dtype=bool)
+        kept[index] = False
+        return self.from_arrays(self.powers[kept], self.coefficients[kept], self.origins[kept])
+
+    def __add__(self, other: Field) -> Field:
         """
         Adds two fields together.
+
+        Returns
+        -------
+        updated_field : Field
+            The field made from the sum of the two fields.
         """
 
-        raise NotImplementedError
+        return self.from_arrays(
+            concatenate((self.powers, other.powers)),
+            concatenate((self.coefficients, other.coefficients)),
+            concatenate((self.origins, other.origins))
+        )
 
-    def __sub__(self, other):
+    def __sub__(self, other: Field) -> Field:
         """
-        Subtracts the second field's values from the first.
+        Subtracts the second field's values from the first. Terms of the second field that are present in the first
+        are removed from it, the others are added with an opposite coefficient.
+
+        Returns
+        -------
+        updated_field : Field
+            The field made from the difference of the two fields.
+        """
+
+        kept = ones(self._size, dtype=bool)
+        added = zeros(len(other), dtype=bool)
+        for i, (power, coefficient, origin) in enumerate(zip(other.powers, other.coefficients, other.origins)):
+            matches = (kept & (self.powers == power) & (self.coefficients == coefficient)
+                       & np_all(self.origins == origin, axis=1))
+            index = matches.argmax()
+            if matches[index]:
+                kept[index] = False
+            else:
+                added[i] = True
+        if not added.any():
+            return self.from_arrays(self.powers[kept], self.coefficients[kept], self.origins[kept])
+        return self.from_arrays(
+            concatenate((self.powers[kept], other.powers[added])),
+            concatenate((self.coefficients[kept], -other.coefficients[added])),
+            concatenate((self.origins[kept], other.origins[added]))
+        )
+
+    def __mul__(self, other) -> Field:
+        """
+        Multiplies the field by a scalar value.
+
+        Returns
+        -------
+        updated_field : Field
+            The field made from the scalar product of the field with the scalar value.
+        """
+
+        if not isinstance(other, float) and not isinstance(other, int):
+            raise NotImplementedError(f"Only scalar multiplication of a field is implemented. The given object "
+                                      f"was of type {type(other)}")
+        return self.from_arrays(self.powers.copy(), other * self.coefficients, self.origins.copy())
+
+    def __rmul__(self, other) -> Field:
+        """
+        Multiplies the field by a scalar value.
+
+        Returns
+        -------
+        updated_field : Field
+            The field made from the scalar product of the field with the scalar value.
+        """
+
+        return self * other
+
+    def _get_relative_positions(self, positions: ndarray) -> Tuple[ndarray, ndarray]:
+        """
+        Computes the position of every origin relative to every given position.
+
+        Parameters
+        ----------
+        positions : ndarray
+            The (N,3) array of positions.
+
+        Returns
+        -------
+        relative_positions, distances : Tuple[ndarray, ndarray]
+            The (N,T,3) array of each origin minus each position and the (N,T) array of their norms.
+        """
+
+        relative_positions = self.origins[None, :, :] - asarray(positions, dtype=float).reshape(-1, 1, 3)
+        return relative_positions, sqrt(einsum("ntj,ntj->nt", relative_positions, relative_positions))
+
+    @staticmethod
+    def _to_positions(position: Vector) -> Tuple[ndarray, tuple]:
+        """
+        Converts a Vector, whose components may be arrays of the same shape, to an (N,3) array of positions.
+
+        Returns
+        -------
+        positions, shape : Tuple[ndarray, tuple]
+            The (N,3) array of positions and the shape of the given components.
+        """
+
+        if all(isinstance(component, (int, float)) for component in position):
+            return array([tuple(position)], dtype=float), ()
+        components = broadcast_arrays(*(asarray(component, dtype=float) for component in position))
+        return stack(components, axis=-1).reshape(-1, 3), components[0].shape
+
+    def evaluate(self, positions: ndarray) -> ndarray:
+        """
+        The definition of this function depends on the type of field.
         """
 
         raise NotImplementedError
@@ -0,0 +1,201 @@
+from __future__ import annotations
+
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Tuple
+
+from numpy import arange, ceil, floor, log2, ndarray, zeros
+
+from src.fields.scalar_field import ScalarField
+from src.tools.vector import FakeVector
+
+
+class PotentialTileCache:
+    """
+    A pyramid of square tiles of a potential in a plane, used to draw views of the potential at any zoom level
+    without computing it again. At level L, the plane is divided into tiles of side root_length / 2**L holding
+    tile_size x tile_size samples at the center of their cells. A view is drawn from the tiles of the coarsest level
+    that is at least as fine as its pixels, so only the tiles in view are computed, and they are reused by the next
+    views of the same potential. Tiles are identified by a hash of the potential's terms, so the tiles of a system
+    whose bodies did not move are reused while those of a changed potential are never used. The least recently used
+    tiles are dropped once the cache is full.
+    """
+
+    def __init__(self, tile_size: int = 64, root_length: float = 1024, max_tiles: int = 1024):
+        """
+        Defines the required parameters.
+
+        Parameters
+        ----------
+        tile_size : int
+            The number of samples along each side of a tile. Defaults to 64.
+        root_length : float
+            The side of the tiles at level 0, in the potential's space unit. Defaults to 1024.
+        max_tiles : int
+            The maximum number of tiles kept in the cache. Defaults to 1024, about 32 MB of 64 x 64 tiles.
+        """
+
+        self.tile_size = tile_size
+        self.root_length = root_length
+        self.max_tiles = max_tiles
+        self.tiles = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self.tiles)
+
+    def clear(self):
+        """
+        Removes every tile from the cache.
+        """
+
+        self.tiles.clear()
+
+    @staticmethod
+    def get_fingerprint(field: ScalarField) -> str:
+        """
+        Gives the hash of the terms of a field, which identifies the tiles computed from it.
+        """
+
+        return sha256(
+            field.powers.tobytes() + field.coefficients.tobytes() + field.origins.tobytes()
+        ).hexdigest()
+
+    def get_level(self, spacing: float) -> int:
+        """
+        Gives the coarsest level whose samples are at most as far apart as the given spacing.
+        """
+
+        return int(ceil(log2(self.root_length / (self.tile_size * spacing))))
+
+    def get_tile(
+            self,
+            field: ScalarField,
+            level: int,
+            index: Tuple[int, int],
+            axes: Tuple[str, str] = ("x", "y"),
+            plane_position: float = 0,
+            solver: str = "direct",
+            fingerprint: str = None
+    ) -> ndarray:
+        """
+        Gives a tile, computing it if it is not in the cache.
+
+        Parameters
+        ----------
+        field : ScalarField
+            The potential.
+        level : int
+            The tile's level.
+        index : Tuple[int, int]
+            The tile's index along both axes of the plane. The tile (i, j) starts at (i, j) * root_length / 2**level.
+        axes : Tuple[str, str]
+            The two axes of the plane. Defaults to x and y.
+        plane_position : float
+            The position of the plane along the third axis. Defaults to 0.
+        solver : str
+            The solver used to compute the tile, see ScalarField.get_potential_field. Defaults to "direct".
+        fingerprint : str
+            The field's fingerprint, computed if not given.
+
+        Returns
+        -------
+        tile : ndarray
+            The (tile_size, tile_size) array of the potential at the center of the tile's cells.
+        """
+
+        if fingerprint is None:
+            fingerprint = self.get_fingerprint(field)
+        key = (fingerprint, tuple(axes), float(plane_position), solver, int(level), tuple(index))
+        if key in self.tiles:
+            self.tiles.move_to_end(key)
+            return self.tiles[key]
+
+        length = self.root_length * 2.**-level
+        spacing = length / self.tile_size
+        start, stop = FakeVector(0, 0, 0), FakeVector(0, 0, 0)
+        origin_position = [0, 0, 0]
+        origin_position["xyz".index(({"x", "y", "z"} - set(axes)).pop())] = plane_position
+        for axis, i in zip(axes, index):
+            setattr(start, axis, i * length + spacing / 2)
+            setattr(stop, axis, (i + 1) * length - spacing / 2)
+        tile = field.get_potential_field(
+            start.vectorise(), stop.vectorise(), {axis: self.tile_size for axis in axes}, tuple(origin_position), solver
+        ).reshape(self.tile_size, self.tile_size)
+
+        self.tiles[key] = tile
+        while len(self.tiles) > self.max_tiles:
+            self.tiles.popitem(last=False)
+        return tile
+
+    def get_image(
+            self,
+            field: ScalarField,
+            start: Tuple[float, float],
+            stop: Tuple[float, float],
+            resolution: Tuple[int, int],
+            axes: Tuple[str, str] = ("x", "y"),
+            plane_position: float = 0,
+            solver: str = "direct"
+    ) -> ndarray:
+        """
+        Gives the potential on a regular grid of a plane, interpolated bilinearly from the tiles in view. The grid is
+        the same as the one of ScalarField.get_potential_field.
+
+        Parameters
+        ----------
+        field : ScalarField
+            The potential.
+        start : Tuple[float, float]
+            The position of the grid's first corner along both axes of the plane.
+        stop : Tuple[float, float]
+            The position of the grid's last corner along both axes of the plane.
+        resolution : Tuple[int, int]
+            The number of positions along both axes of the plane.
+        axes : Tuple[str, str]
+            The two axes of the plane. Defaults to x and y.
+        plane_position : float
+            The position of the plane along the third axis. Defaults to 0.
+        solver : str
+            The solver used to compute missing tiles, see ScalarField.get_potential_field. Defaults to "direct".
+
+        Returns
+        -------
+        image : ndarray
+            The (resolution[0], resolution[1]) array of the potential at every position of the grid.
+        """
+
+        resolution = [int(ticks) for ticks in resolution]
+        positions = [
+            start[i] + (stop[i] - start[i]) * arange(resolution[i]) / max(resolution[i] - 1, 1) for i in range(2)
+        ]
+        spacings = [
+            abs(stop[i] - start[i]) / (resolution[i] - 1) if resolution[i] > 1 and stop[i] != start[i]
+            else self.root_length for i in range(2)
+        ]
+        level = self.get_level(min(spacings))
+        length = self.root_length * 2.**-level
+        spacing = length / self.tile_size
+
+        # Fractional global sample coordinates of the grid, the samples being at the center of the cells. Every tile
+        # holding a sample around the grid is gathered in a single mosaic, on which the grid is interpolated
+        coordinates = [p / spacing - 0.5 for p in positions]
+        first = [int(floor(c.min())) // self.tile_size for c in coordinates]
+        last = [(int(floor(c.max())) + 1) // self.tile_size for c in coordinates]
+        fingerprint = self.get_fingerprint(field)
+        mosaic = zeros(((last[0] - first[0] + 1) * self.tile_size, (last[1] - first[1] + 1) * self.tile_size))
+        for i in range(first[0], last[0] + 1):
+            for j in range(first[1], last[1] + 1):
+                tile = self.get_tile(field, level, (i, j), axes, plane_position, solver, fingerprint)
+                mosaic[(i - first[0]) * self.tile_size:(i - first[0] + 1) * self.tile_size,
+                       (j - first[1]) * self.tile_size:(j - first[1] + 1) * self.tile_size] = tile
+
+        (i, j), (f_x, f_y) = zip(*(
+            (floor(c - f * self.tile_size).astype(int), c - f * self.tile_size - floor(c - f * self.tile_size))
+            for c, f in zip(coordinates, first)
+        ))
+        i, f_x, j, f_y = i[:, None], f_x[:, None], j[None, :], f_y[None, :]
+        return ((1 - f_x) * (1 - f_y) * mosaic[i, j] + f_x * (1 - f_y) * mosaic[i + 1, j]
+                + (1 - f_x) * f_y * mosaic[i, j + 1] + f_x * f_y * mosaic[i + 1, j + 1])
+
+# Cache shared by every view of the current process
+shared_cache = PotentialTileCache()
@@ -1,8 +1,10 @@
 from typing import Dict, List, Tuple
 
-from numpy import linspace, ndarray, sqrt, zeros
+from numpy import arange, asarray, column_stack, einsum, errstate, linspace, ndarray, prod, ravel, unravel_index, \
+    zeros
 
 from src.fields.base_field import Field
+from src.tools.particle_mesh import get_mesh_potential
 from src.tools.vector import Vector
 
 
@@ -11,121 +13,99 @@ class ScalarField(Field):
     A class used to compute and define a scalar field.
     """
 
-    def __init__(self, terms: List[Tuple[float, float, Vector]]):
+    # Size in bytes allowed for the temporary arrays used when evaluating the field on a grid
+    memory_budget = 2**28
+
+    def evaluate(self, positions: ndarray) -> ndarray:
         """
-        Defines the required parameters.
+        Computes the value of the scalar field at many positions at once.
 
         Parameters
         ----------
-        terms : List[Tuple[float, float, Vector]]
-            A list of the different terms of the equation defining the field. Each term is composed of a tuple with
-            three elements: the position's power within the term, the coefficient multiplying the position factor and
-            the origin from which the term is computed.
-        """
-
-        self.terms = terms
-
-    def __add__(self, other):
-        """
-        Adds two fields together.
+        positions : ndarray
+            The (N,3) array of the positions where the field should be evaluated.
 
         Returns
         -------
-        updated_field : ScalarField
-            The field made from the sum of the two fields.
+        values : ndarray
+            The (N,) array of the field's values at the given positions.
         """
 
-        updated_terms = self.terms
-        updated_terms += other.terms
-        return ScalarField(updated_terms)
+        return self._evaluate_terms(positions).sum(axis=1)
 
-    def __sub__(self, other):
+    def _evaluate_terms(self, positions: ndarray) -> ndarray:
         """
-        Subtracts the second field from the first.
+        Computes the value of every term of the field at many positions at once.
 
         Returns
         -------
-        updated_field : ScalarField
-            The field made from the difference of the two fields.
+        values : ndarray
+            The (N,T) array of each term's value at the given positions.
         """
 
-        updated_terms = self.terms
-        for term in other.terms:
-            if term in updated_terms:
-                updated_terms.remove(term)
-            else:
-                updated_terms.append((term[0], -term[1], term[2]))
-        return ScalarField(updated_terms)
-
-    def __mul__(self, other):
-        """
-        Multiplies the field by a scalar value.
+        _, distances = self._get_relative_positions(positions)
+        with errstate(divide="ignore", invalid="ignore"):
+            return self.coefficients * distances**self.powers
 
-        Returns
-        -------
-        updated_field : ScalarField
-            The field made from the scalar product of the field with the scalar value.
+    def __call__(self, position: Vector, iterative: bool = False) -> float:
         """
+        Computes the value of the scalar field at a desired position.
 
-        if not isinstance(other, float) and not isinstance(other, int):
-            raise NotImplementedError(f"Only scalar multiplication of a scalar field is implemented. The given object "
-                                      f"was of type {type(other)}")
-        updated_terms = []
-        for term in self.terms:
-            updated_terms.append((term[0], other*term[1], term[2]))
-        return ScalarField(updated_terms)
-
-    def __rmul__(self, other):
-        """
-        Multiplies the field by a scalar value.
+        Parameters
+        ----------
+        position : Vector
+            The Vector object representing the position of the point where the field should be evaluated. Its
+            components may also be arrays of the same shape to evaluate the field at many positions.
+        iterative : bool
+            If True, the value of each term is given separately. Defaults to False.
 
         Returns
         -------
-        updated_field : ScalarField
-            The field made from the scalar product of the field with the scalar value.
+        value : float
+            The value of the field at the given position.
         """
 
-        return self * other
+        positions, shape = self._to_positions(position)
+        if iterative:
+            values = self._evaluate_terms(positions)
+            return [values[..., i].reshape(shape) if shape else values[0, i] for i in range(len(self))]
+        values = self.evaluate(positions)
+        return values.reshape(shape) if shape else values[0]
 
-    def __call__(self, position: Vector, iterative: bool = False) -> float:
+    def get_gradients(self, positions: ndarray) -> ndarray:
         """
-        Computes the value of the scalar field at a desired position.
+        Computes the closed-form gradient of the scalar field at many positions at once. The gradient of each term
+        coef * r**power around an origin is coef * power * r**(power-2) * (position - origin).
 
         Parameters
         ----------
-        position : Vector
-            The Vector object representing the position of the point where the field should be evaluated.
+        positions : ndarray
+            The (N,3) array of the positions where the gradient should be evaluated.
 
         Returns
         -------
-        value : float
-            The value of the field at the given position.
+        gradients : ndarray
+            The (N,3) array of the gradients at the desired positions.
         """
 
-        value = 0
-        if iterative:
-            value = []
-            for term in self.terms:
-                relative_distance = sqrt(
-                    (term[2].x - position.x) ** 2 + (term[2].y - position.y) ** 2 + (term[2].z - position.z) ** 2)
-                value.append(term[1] * (relative_distance ** term[0]))
-        else:
-            for term in self.terms:
-                relative_distance = sqrt((term[2].x-position.x)**2+(term[2].y-position.y)**2+(term[2].z-position.z)**2)
-                value += term[1]*(relative_distance**term[0])
-        return value
+        relative_positions, distances = self._get_relative_positions(positions)
+        with errstate(divide="ignore", invalid="ignore"):
+            factors = self.coefficients * self.powers * distances**(self.powers-2)
+        # Constant terms have no gradient
+        factors[:, (self.powers == 0) | (self.coefficients == 0)] = 0
+        # The relative positions are given from the position to the origins, hence the minus sign
+        return -einsum("nt,ntj->nj", factors, relative_positions)
 
     def get_gradient(self, position: Vector, epsilon: float = 10**(-2)) -> Vector:
         """
-        Computes the gradient of the scalar field at a given position using a step of size epsilon.
+        Computes the gradient of the scalar field at a given position using the closed-form derivative of its terms.
 
         Parameters
         ----------
         position : Vector
             The position where the gradient should be evaluated
         epsilon : float
-            The space interval with which the gradient is computed, a smaller value gives more accurate results,
-            defaults to 10**(-3).
+            Kept for compatibility with the previous finite difference implementation, it has no effect.
 
         Returns
         -------
@@ -133,64 +113,56 @@ class ScalarField(Field):
             The gradient at the desired position.
         """
 
-        x, y, z = position
-        return Vector(
-            (self(Vector(x + epsilon/2, y, z)) - self(Vector(x - epsilon/2, y, z)))/epsilon,
-            (self(Vector(x, y + epsilon/2, z)) - self(Vector(x, y - epsilon/2, z)))/epsilon,
-            (self(Vector(x, y, z + epsilon/2)) - self(Vector(x, y, z - epsilon/2)))/epsilon,
-        )
-        # return Vector(
-        #     (self(Vector(x + epsilon, y, z)) - self(Vector(x, y, z))) / epsilon,
-        #     (self(Vector(x, y + epsilon, z)) - self(Vector(x, y, z))) / epsilon,
-        #     (self(Vector(x, y, z + epsilon)) - self(Vector(x, y, z))) / epsilon,
-        # )
+        return Vector(*self.get_gradients([tuple(position)])[0])
 
     def get_acceleration(self, position: Vector, epsilon: float = 10**(-2), iterative: bool = False) -> Vector:
         """
-        Computes the gradient of the scalar field at a given position using a step of size epsilon.
+        Computes the acceleration caused by the scalar field at a given position, which is minus its closed-form
+        gradient.
 
         Parameters
         ----------
         position : Vector
-            The position where the gradient should be evaluated
+            The position where the acceleration should be evaluated
         epsilon : float
-            The space interval with which the gradient is computed, a smaller value gives more accurate results,
-            defaults to 10**(-3).
+            Kept for compatibility with the previous finite difference implementation, it has no effect.
+        iterative : bool
+            Kept for compatibility with the previous finite difference implementation, it has no effect.
 
         Returns
         -------
-        gradient : Vector
-            The gradient at the desired position.
+        acceleration : Vector
+            The acceleration at the desired position.
         """
 
-        x, y, z = position
-        a_x, a_y, a_z = 0, 0, 0
-        if iterative:
-            v_plus = [
-                self(Vector(x + epsilon/2, y, z), iterative=iterative),
-                self(Vector(x, y + epsilon/2, z), iterative=iterative),
-                self(Vector(x, y, z + epsilon/2), iterative=iterative)
-            ]
-            v_minus = [
-                self(Vector(x - epsilon/2, y, z), iterative=iterative),
-                self(Vector(x, y - epsilon/2, z), iterative=iterative),
-                self(Vector(x, y, z - epsilon/2), iterative=iterative)
-            ]
-            for i, p, m in zip([0, 1, 2], v_plus, v_minus):
-                for v_p, v_m in zip(p, m):
-                    if i == 0:
-                        a_x += -(v_p - v_m)/epsilon
-                    elif i == 1:
-                        a_y += -(v_p - v_m)/epsilon
-                    elif i == 2:
-                        a_z += -(v_p - v_m)/epsilon
-            return Vector(a_x, a_y, a_z)
-        else:
-            return Vector(
-                -(self(Vector(x + epsilon/2, y, z)) - self(Vector(x - epsilon/2, y, z)))/epsilon,
-                -(self(Vector(x, y + epsilon/2, z)) - self(Vector(x, y - epsilon/2, z)))/epsilon,
-                -(self(Vector(x, y, z + epsilon/2)) - self(Vector(x, y, z - epsilon/2)))/epsilon,
-            )
+        return Vector(*-self.get_gradients([tuple(position)])[0])
+
+    @staticmethod
+    def _get_axes_positions(
+            start: Vector,
+            stop: Vector,
+            nb_ticks_per_axis: Dict[str, int] = None,
+            origin_position: Tuple[float, float, float] = None
+    ) -> Tuple[ndarray, ndarray, ndarray]:
+        """
+        Gives the positions of a grid along each axis. The axes missing from nb_ticks_per_axis hold the single position
+        of the origin along that axis.
+
+        Returns
+        -------
+        axes_positions : Tuple[ndarray, ndarray, ndarray]
+            The positions of the grid along the x, y and z axes.
+        """
+
+        if nb_ticks_per_axis is None:
+            nb_ticks_per_axis = {"x": 100, "y": 100, "z": 100}
+        if origin_position is None:
+            origin_position = [0], [0], [0]
+        axes_positions = [ravel(position) for position in origin_position]
+        for i, axis in enumerate("xyz"):
+            if axis in nb_ticks_per_axis:
+                axes_positions[i] = linspace(getattr(start, axis), getattr(stop, axis), int(nb_ticks_per_axis[axis]))
+        return tuple(axes_positions)
 
     @staticmethod
     def _compute_field_wide_operations(
@@ -198,10 +170,12 @@ class ScalarField(Field):
             stop: Vector,
             function,
             nb_ticks_per_axis: Dict[str, int] = None,
-            origin_position: Tuple[float, float, float] = None
+            origin_position: Tuple[float, float, float] = None,
+            chunk_size: int = None
     ):
         """
-        Computes the value of a certain function on a grid and returns its values as a numpy array.
+        Computes the value of a certain function on a grid and returns its values as a numpy array. The function is
+        evaluated on chunks of grid positions at once, so the temporary arrays of a chunk stay within a memory budget.
 
         Parameters
         ----------
@@ -211,7 +185,8 @@ class ScalarField(Field):
             The position of the stopping corner of the space cube.
         function
             Callable object that defines the operation to apply on all array elements. This function must take as
-            argument a Vector object of the three axis positions such as function(Vector(x, y, z)).
+            argument an (N,3) array of positions and return either the (N,) array of the values at these positions or
+            an (N,3) array of vectors, such as function(positions).
         nb_ticks_per_axis : Dict[str, int]
             The number of steps between the starting and stopping positions for each axis in the form of {axis, value}.
             Defaults to 100 values per dimension.
@@ -219,37 +194,41 @@ class ScalarField(Field):
             The position of the origin within the given space cube. It is of no consequence for 3D arrays, but for
             arrays with fewer dimensions it determines the position of the plane for the missing dimensions. Defaults to
             (0, 0, 0).
+        chunk_size : int
+            The number of positions given to the function at once. Defaults to None, meaning every position of the
+            grid at once.
 
         Returns
         -------
         array : ndarray
-            The array of the computed function at the specified coordinates.
+            The (nx,ny,nz) array of the computed function at the specified coordinates, or the (nx,ny,nz,3) array if
+            the function gives vectors.
         """
 
         if not callable(function):
             raise TypeError("The function must be callable")
-        if nb_ticks_per_axis is None:
-            nb_ticks_per_axis = {"x": 100, "y": 100, "z": 100}
-        if origin_position is None:
-            origin_position = [0], [0], [0]
-        x_positions, y_positions, z_positions = origin_position
-        x_positions = [x_positions]
-        y_positions = [y_positions]
-        z_positions = [z_positions]
-        for axis, nb_ticks in nb_ticks_per_axis.items():
-            if axis == "x":
-                x_positions = linspace(getattr(start, axis), getattr(stop, axis), int(nb_ticks))
-            if axis == "y":
-                y_positions = linspace(getattr(start, axis), getattr(stop, axis), int(nb_ticks))
-            if axis == "z":
-                z_positions = linspace(getattr(start, axis), getattr(stop, axis), int(nb_ticks))
-        array = zeros((len(x_positions), len(y_positions), len(z_positions)))
-        for i_x, x in enumerate(x_positions):
-            for i_y, y in enumerate(y_positions):
-                for i_z, z in enumerate(z_positions):
-                    array[i_x, i_y, i_z] = function(Vector(x, y, z))
-
-        return array
+        axes_positions = ScalarField._get_axes_positions(start, stop, nb_ticks_per_axis, origin_position)
+        shape = tuple(len(positions) for positions in axes_positions)
+        size = prod(shape, dtype=int)
+        chunk_size = max(int(chunk_size or size), 1)
+        array = None
+        for chunk_start in range(0, size, chunk_size):
+            indices = unravel_index(arange(chunk_start, min(chunk_start + chunk_size, size)), shape)
+            positions = column_stack([axis_positions[i] for axis_positions, i in zip(axes_positions, indices)])
+            values = asarray(function(positions), dtype=float)
+            if array is None:
+                array = zeros((size,) + values.shape[1:])
+            array[chunk_start:chunk_start+len(values)] = values
+
+        return array.reshape(shape + array.shape[1:])
+
+    def _get_chunk_size(self) -> int:
+        """
+        Gives the number of positions on which the field can be evaluated at once while keeping its temporary (N,T,3)
+        arrays within the memory budget.
+        """
+
+        return max(self.memory_budget // (max(len(self), 1) * 3 * 8 * 4), 1)
 
     def get_potential_field(
             self,
@@ -257,6 +236,7 @@ class ScalarField(Field):
             stop: Vector,
             nb_ticks_per_axis: Dict[str, int] = None,
             origin_position: Tuple[float, float, float] = None,
+            solver: str = "direct"
     ) -> ndarray:
         """
         Computes the value of the field a grid and returns the result as a numpy array.
@@ -274,6 +254,11 @@ class ScalarField(Field):
             The position of the origin within the given space cube. It is of no consequence for 3D arrays, but for
             arrays with fewer dimensions it determines the position of the plane for the missing dimensions. Defaults to
             (0, 0, 0).
+        solver : str
+            The way the field is evaluated. "direct" sums every term at every position and "particle-mesh" deposits
+            the coefficients of the 1/r terms on the grid and convolves them with FFTs (see get_mesh_potential), which
+            is much faster for many terms on large grids at the cost of a small error near the terms' origins. Other
+            terms are always summed directly. Defaults to "direct".
 
         Returns
         -------
@@ -281,12 +266,25 @@ class ScalarField(Field):
             The array of the field's values at the specified coordinates.
         """
 
+        assert solver in ["direct", "particle-mesh"], \
+            'The currently implemented solvers are: "direct", "particle-mesh"'
+        if solver == "particle-mesh":
+            axes_positions = self._get_axes_positions(start, stop, nb_ticks_per_axis, origin_position)
+            deposited = (self.powers == -1) & (self.coefficients != 0)
+            array = get_mesh_potential(axes_positions, self.coefficients[deposited], self.origins[deposited])
+            if not deposited.all():
+                remaining = self.from_arrays(self.powers[~deposited], self.coefficients[~deposited],
+                                             self.origins[~deposited])
+                array += remaining.get_potential_field(start, stop, nb_ticks_per_axis, origin_position)
+            return array
+
         return self._compute_field_wide_operations(
             start,
             stop,
-            lambda vector: self(vector),
+            self.evaluate,
             nb_ticks_per_axis,
-            origin_position
+            origin_position,
+            self._get_chunk_size()
         )
 
     def get_gradient_field(
@@ -316,15 +314,16 @@ class ScalarField(Field):
         Returns
         -------
         array : ndarray
-            The array of the field's gradient at the specified coordinates.
+            The (nx,ny,nz,3) array of the field's closed-form gradient at the specified coordinates.
         """
 
         return self._compute_field_wide_operations(
             start,
             stop,
-            lambda vector: self.get_gradient(vector),
+            self.get_gradients,
             nb_ticks_per_axis,
             origin_position,
+            self._get_chunk_size()
         )
 
 
@@ -0,0 +1,213 @@
+from __future__ import annotations
+
+import numpy as np
+
+from src.bodies.computed_body import ComputedBody
+from src.tools.vector import Vector
+
+
+class BodyIndex:
+    """
+    The attributes of saved bodies stored as columns, one row per body. The index is saved next to the bodies' file
+    so the bodies can be filtered and sorted without reading their trajectories. Besides the bodies' attributes, the
+    index contains columns giving the location of each trajectory, which depend on the storage.
+    """
+
+    # dtype of every column that can be found in an index, columns of shape (N,3) are marked by a tuple
+    dtypes = {
+        "offsets": np.int64, "lengths": np.int64, "member_offsets": np.int64, "member_positions": np.int64,
+        "types": str, "masses": np.float64, "initial_positions": (np.float64,), "initial_velocities": (np.float64,),
+        "time_survived": np.float64, "fixed": bool, "has_potential": bool, "integrators": str, "death_steps": np.int64
+    }
+    attribute_columns = [
+        "types", "masses", "initial_positions", "initial_velocities", "time_survived", "fixed", "has_potential",
+        "integrators", "death_steps"
+    ]
+
+    def __init__(self, columns: dict[str, np.ndarray]):
+        """
+        Initialize a BodyIndex object.
+
+        Parameters
+        ----------
+        columns : dict[str, np.ndarray]
+            Every column of the index, all with the same number of rows.
+        """
+        self.columns = columns
+
+    def __len__(self) -> int:
+        return len(self.columns["types"])
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        return self.columns[key]
+
+    @staticmethod
+    def get_attributes(body, type: str) -> dict:
+        """
+        Give the values of the attribute columns for a body.
+
+        Parameters
+        ----------
+        body : GravitationalBody | ComputedBody | FakeBody
+            Body to index.
+        type : str
+            Type of the body.
+
+        Returns
+        -------
+        attributes : dict
+            Value of every attribute column. A missing initial velocity is stored as NaNs and the death step of a body
+            that did not die as -1.
+        """
+        velocity = body.initial_velocity if body.initial_velocity is not None else (np.nan, np.nan, np.nan)
+        death_step = getattr(body, "death_step", None)
+        return {
+            "types": type,
+            "masses": body.mass,
+            "initial_positions": tuple(body.initial_position),
+            "initial_velocities": tuple(velocity),
+            "time_survived": body.time_survived,
+            "fixed": body.fixed,
+            "has_potential": body.has_potential,
+            "integrators": body.integrator or "",
+            "death_steps": death_step if death_step is not None else -1
+        }
+
+    @classmethod
+    def save(cls, filename: str, columns: dict[str, list]):
+        """
+        Save columns built row by row to a .npz file.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the .npz file.
+        columns : dict[str, list]
+            Every column of the index, as lists of values.
+        """
+        arrays = {}
+        for key, values in columns.items():
+            dtype = cls.dtypes[key]
+            if isinstance(dtype, tuple):
+                arrays[key] = np.array(values, dtype=dtype[0]).reshape(-1, 3)
+            else:
+                arrays[key] = np.array(values, dtype=dtype)
+        np.savez(filename, **arrays)
+
+    @classmethod
+    def load(cls, filename: str) -> BodyIndex:
+        """
+        Load an index saved with the save method.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the .npz file.
+
+        Returns
+        -------
+        index : BodyIndex
+            The loaded index.
+        """
+        with np.load(filename) as file:
+            columns = {key: file[key] for key in file.files}
+        # Indices saved before the death steps were recorded
+        if "death_steps" not in columns:
+            columns["death_steps"] = np.full(len(columns["types"]), -1, dtype=np.int64)
+        return cls(columns)
+
+    def subset(self, indices: np.ndarray) -> BodyIndex:
+        """
+        Give the index of some of the bodies.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            Indices of the rows to keep.
+
+        Returns
+        -------
+        index : BodyIndex
+            Index containing only the given rows.
+        """
+        return BodyIndex({key: column[indices] for key, column in self.columns.items()})
+
+    def select(self, min_time_survived: float=None, types: list[str]=None) -> np.ndarray:
+        """
+        Select bodies using only the index.
+
+        Parameters
+        ----------
+        min_time_survived : float
+            Minimum time a body must have survived to be selected. Defaults to None.
+        types : list[str]
+            Types of the bodies to select. Defaults to None, which selects every type.
+
+        Returns
+        -------
+        indices : np.ndarray
+            Indices of the selected bodies.
+        """
+        mask = np.ones(len(self), dtype=bool)
+        if min_time_survived:
+            mask &= self.columns["time_survived"] >= min_time_survived
+        if types is not None:
+            mask &= np.isin(self.columns["types"], types)
+        return mask.nonzero()[0]
+
+    def get_bodies_info(self, indices: np.ndarray=None) -> np.ndarray:
+        """
+        Give the initial conditions and the time survived of bodies, in the format of ComputedBody.get_info.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            Indices of the bodies. Defaults to None, which gives every body.
+
+        Returns
+        -------
+        bodies_info : np.ndarray
+            (N,7) array whose columns are: position.x, position.y, position.z, velocity.x, velocity.y, velocity.z,
+            time_survived.
+        """
+        if indices is None:
+            indices = slice(None)
+        return np.column_stack((
+            self.columns["initial_positions"][indices],
+            self.columns["initial_velocities"][indices],
+            self.columns["time_survived"][indices]
+        ))
+
+    def get_body(self, i: int, positions=None) -> ComputedBody:
+        """
+        Create a body from its attributes in the index.
+
+        Parameters
+        ----------
+        i : int
+            Index of the body.
+        positions : list | np.ndarray
+            Positions to give to the body. Defaults to None, which gives an empty trajectory.
+
+        Returns
+        -------
+        body : ComputedBody
+            The body.
+        """
+        velocity = self.columns["initial_velocities"][i]
+        body = ComputedBody(
+            positions=positions if positions is not None else np.zeros((0, 3)),
+            type=str(self.columns["types"][i]),
+            time_survived=float(self.columns["time_survived"][i]),
+            mass=float(self.columns["masses"][i]),
+            position=Vector(*map(float, self.columns["initial_positions"][i])),
+            velocity=Vector(*map(float, velocity)),
+            fixed=bool(self.columns["fixed"][i]),
+            has_potential=bool(self.columns["has_potential"][i]),
+            integrator=str(self.columns["integrators"][i]) or None
+        )
+        if np.isnan(velocity).all():
+            body.initial_velocity = None
+        if self.columns["death_steps"][i] >= 0:
+            body.death_step = int(self.columns["death_steps"][i])
+        return body
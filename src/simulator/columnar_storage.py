@@ -0,0 +1,203 @@
+from __future__ import annotations
+
+import numpy as np
+from os.path import exists
+
+from src.bodies.computed_body import ComputedBody
+from src.simulator.body_index import BodyIndex
+
+
+class ColumnarWriter:
+    """
+    Writes bodies to a folder in a columnar format: the positions of every body are appended to a single flat float64
+    file and the other attributes are gathered in an index, saved as a .npz file when the writer is closed.
+    """
+
+    def __init__(self, foldername: str, name: str="bodies", bodies_count: int=None):
+        """
+        Initialize a ColumnarWriter object.
+
+        Parameters
+        ----------
+        foldername : str
+            Name of the folder in which to write the files.
+        name : str
+            Prefix of the written files. The positions are written to {name}_positions.bin and the index to
+            {name}_index.npz. Defaults to "bodies".
+        bodies_count : int
+            If given, the writer appends to existing files and keeps only their first bodies_count bodies. This is used
+            to resume writing from a checkpoint. Defaults to None, which creates new files.
+        """
+        self.positions_filename = f"{foldername}/{name}_positions.bin"
+        self.index_filename = f"{foldername}/{name}_index.npz"
+        self.columns = {key: [] for key in ["offsets", "lengths", *BodyIndex.attribute_columns]}
+        self.offset = 0
+        if bodies_count is None:
+            self.positions_file = open(self.positions_filename, "wb")
+        else:
+            index = BodyIndex.load(self.index_filename)
+            for key in self.columns:
+                self.columns[key] = index[key][:bodies_count].tolist()
+            self.offset = sum(self.columns["lengths"])
+            self.positions_file = open(self.positions_filename, "r+b")
+            self.positions_file.truncate(self.size)
+            self.positions_file.seek(0, 2)
+
+    def __enter__(self) -> ColumnarWriter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def size(self) -> int:
+        """
+        Gives the number of bytes written to the positions file.
+        """
+        return self.offset * 3 * 8
+
+    def write(self, body, type: str):
+        """
+        Write a body of a certain type.
+
+        Parameters
+        ----------
+        body : GravitationalBody | ComputedBody | FakeBody
+            Body to write.
+        type : str
+            Type of the body.
+        """
+        positions = np.asarray(body.positions, dtype=np.float64).reshape(-1, 3)
+        self.positions_file.write(positions.tobytes())
+
+        self.columns["offsets"].append(self.offset)
+        self.columns["lengths"].append(len(positions))
+        for key, value in BodyIndex.get_attributes(body, type).items():
+            self.columns[key].append(value)
+        self.offset += len(positions)
+
+    def flush(self):
+        """
+        Flush the written positions to the disk.
+        """
+        self.positions_file.flush()
+
+    def close(self):
+        """
+        Close the positions file and write the index.
+        """
+        self.positions_file.close()
+        self.write_index()
+
+    def write_index(self):
+        """
+        Flush the positions and write the index of every body written so far.
+        """
+        if not self.positions_file.closed:
+            self.positions_file.flush()
+        BodyIndex.save(self.index_filename, self.columns)
+
+
+class ColumnarReader:
+    """
+    Reads bodies written by a ColumnarWriter. The positions file is opened with numpy.memmap so only the trajectories
+    that are actually used are read from the disk.
+    """
+
+    def __init__(self, foldername: str, name: str="bodies"):
+        """
+        Initialize a ColumnarReader object.
+
+        Parameters
+        ----------
+        foldername : str
+            Name of the folder containing the files.
+        name : str
+            Prefix of the files to read. Defaults to "bodies".
+        """
+        self.index = BodyIndex.load(f"{foldername}/{name}_index.npz")
+        positions_filename = f"{foldername}/{name}_positions.bin"
+        if self.index["lengths"].sum():
+            self.positions = np.memmap(positions_filename, dtype=np.float64, mode="r").reshape(-1, 3)
+        else:
+            # numpy.memmap cannot map empty files
+            self.positions = np.zeros((0, 3))
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @staticmethod
+    def exists(foldername: str, name: str="bodies") -> bool:
+        """
+        Gives whether a folder contains bodies saved in the columnar format.
+
+        Parameters
+        ----------
+        foldername : str
+            Name of the folder to check.
+        name : str
+            Prefix of the files to check. Defaults to "bodies".
+
+        Returns
+        -------
+        exists : bool
+            Whether the columnar files are present.
+        """
+        return exists(f"{foldername}/{name}_index.npz") and exists(f"{foldername}/{name}_positions.bin")
+
+    def get_positions(self, i: int) -> np.ndarray:
+        """
+        Get the trajectory of a body without copying it from the disk.
+
+        Parameters
+        ----------
+        i : int
+            Index of the body.
+
+        Returns
+        -------
+        positions : np.ndarray
+            (T,3) memory-mapped view of the body's positions.
+        """
+        offset = self.index["offsets"][i]
+        return self.positions[offset:offset + self.index["lengths"][i]]
+
+    def get_body(self, i: int, load_positions: bool=True) -> ComputedBody:
+        """
+        Get a body as a ComputedBody whose positions are a memory-mapped view.
+
+        Parameters
+        ----------
+        i : int
+            Index of the body.
+        load_positions : bool
+            Whether the body's trajectory should be given. If False, the body has an empty trajectory. Defaults to
+            True.
+
+        Returns
+        -------
+        body : ComputedBody
+            The loaded body.
+        """
+        return self.index.get_body(i, self.get_positions(i) if load_positions else None)
+
+    def get_bodies(self, indices: np.ndarray=None, load_positions: bool=True) -> list[ComputedBody]:
+        """
+        Get multiple bodies.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            Indices of the bodies to get. Defaults to None, which gives every body.
+        load_positions : bool
+            Whether the bodies' trajectories should be given. If False, the bodies have an empty trajectory. Defaults
+            to True.
+
+        Returns
+        -------
+        bodies : list[ComputedBody]
+            The loaded bodies.
+        """
+        if indices is None:
+            indices = range(len(self))
+        return [self.get_body(i, load_positions) for i in indices]
@@ -0,0 +1,208 @@
+from __future__ import annotations
+
+import numpy as np
+from pickle import dump, dumps, load, loads
+from gzip import open as gzip_open
+from eztcolors import Colors as C
+
+from src.tools.adaptive_integrator import hermite_interpolate
+
+
+class Ephemeris:
+    """
+    The precomputed trajectory of the moving attractive bodies of a system, sampled at every step and interpolated in
+    between with cubic Hermite polynomials. Systems using an ephemeris read the state of these bodies from it instead
+    of integrating them, which is valid as long as the other moving bodies have no potential.
+    """
+
+    def __init__(self, delta_time: float, positions: np.ndarray, velocities: np.ndarray, system=None):
+        """
+        Initialize an Ephemeris object.
+
+        Parameters
+        ----------
+        delta_time : float
+            Time between two samples.
+        positions : np.ndarray
+            (T,S,3) array of the positions of the S bodies at each of the T samples, the first sample being at time 0.
+        velocities : np.ndarray
+            (T,S,3) array of the velocities of the S bodies at each sample.
+        system : BaseSystem
+            System that was integrated to compute the ephemeris, if available. Defaults to None.
+        """
+        self.delta_time = delta_time
+        self.positions = positions
+        self.velocities = velocities
+        self.system = system
+
+    def __getstate__(self) -> dict:
+        # The integrated system is only needed by the process that computed the ephemeris
+        return {**self.__dict__, "system": None}
+
+    def __len__(self) -> int:
+        return len(self.positions)
+
+    @property
+    def duration(self) -> float:
+        """
+        Gives the time of the last sample.
+        """
+        return (len(self) - 1) * self.delta_time
+
+    @staticmethod
+    def get_bodies(system) -> list:
+        """
+        Gives the bodies of a system whose trajectory is stored in an ephemeris, in the order of the ephemeris.
+
+        Parameters
+        ----------
+        system : BaseSystem
+            System from which to get the bodies.
+
+        Returns
+        -------
+        bodies : list
+            The moving attractive bodies of the system.
+        """
+        return [body for body in system.attractive_bodies if not body.fixed]
+
+    @classmethod
+    def compute(
+            cls,
+            system,
+            delta_time: float,
+            duration: float,
+            tolerance: float=None,
+            positions_saving_frequency: int=None,
+            integrator: str=None
+        ) -> Ephemeris:
+        """
+        Integrate the moving attractive bodies of a system. The system is copied and every moving body without
+        potential is ignored, as they cannot affect the attractive bodies. The integrated copy is kept in the
+        ephemeris' system attribute.
+
+        Parameters
+        ----------
+        system : BaseSystem
+            System whose attractive bodies are integrated.
+        delta_time : float
+            Time step of the integration, which is also the time between two samples.
+        duration : float
+            Duration of the integration in seconds.
+        tolerance : float
+            Tolerance of the adaptive substeps, see the Simulation.run method. Defaults to None.
+        positions_saving_frequency : int
+            If given, the positions of the copied system's bodies, including the fake bodies, are saved every
+            positions_saving_frequency steps, as by the Simulation.run_attractive_bodies method. Defaults to None.
+        integrator : str
+            If given, the system is integrated with this integrator instead of its own, as are the systems of a
+            SimulationMother.dispatch, which use the dispatch's integrator. Defaults to None.
+
+        Returns
+        -------
+        ephemeris : Ephemeris
+            The computed ephemeris.
+        """
+        system = loads(dumps(system))
+        if integrator:
+            system.set_integrator(integrator)
+        system._compact_moving_bodies(np.array([body.has_potential for body in system.moving_bodies], dtype=bool))
+        bodies = cls.get_bodies(system)
+        steps = int(duration // delta_time)
+        positions = np.zeros((steps + 1, len(bodies), 3))
+        velocities = np.zeros((steps + 1, len(bodies), 3))
+        if positions_saving_frequency:
+            system.reserve_positions(steps // int(positions_saving_frequency), reserve_fake=True)
+        for i in range(steps + 1):
+            if i:
+                system.update(delta_time, tolerance=tolerance)
+                if positions_saving_frequency and i % int(positions_saving_frequency) == 0:
+                    system.save_positions(save_fake=True)
+            positions[i] = [tuple(body.position) for body in bodies]
+            velocities[i] = [tuple(body.velocity) for body in bodies]
+        return cls(delta_time, positions, velocities, system)
+
+    def save(self, filename: str):
+        """
+        Save the ephemeris, including the integrated system, to a gzip file.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file.
+        """
+        with gzip_open(filename, "wb") as file:
+            dump(self.__dict__, file)
+
+    @classmethod
+    def load(cls, filename: str) -> Ephemeris:
+        """
+        Load an ephemeris saved with the save method.
+
+        Parameters
+        ----------
+        filename : str
+            Name of the file.
+
+        Returns
+        -------
+        ephemeris : Ephemeris
+            The loaded ephemeris.
+        """
+        with gzip_open(filename, "rb") as file:
+            attributes = load(file)
+        return cls(**attributes)
+
+    def get_states(self, times: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Give the interpolated state of the bodies at many times.
+
+        Parameters
+        ----------
+        times : np.ndarray
+            (Q,) array of the times, which must be within the ephemeris.
+
+        Returns
+        -------
+        positions, velocities : tuple[np.ndarray, np.ndarray]
+            (Q,S,3) arrays of the bodies' positions and velocities.
+        """
+        times = np.asarray(times, dtype=float)
+        assert (times >= 0).all() and (times <= self.duration * (1 + 1e-12)).all(), \
+            f"{C.RED+C.BOLD}Times must be between 0 and the ephemeris' duration ({self.duration}).{C.END}"
+        # A sample time falls at the beginning of its interval, except for the last sample
+        i = np.minimum((times // self.delta_time).astype(int), len(self) - 2)
+        elapsed = times - i * self.delta_time
+        x_0, v_0 = self.positions[i], self.velocities[i]
+        x_1, v_1 = self.positions[i + 1], self.velocities[i + 1]
+        positions = hermite_interpolate(x_0, v_0, x_1, v_1, self.delta_time, elapsed)
+        # The velocities are given by the derivative of the Hermite polynomials
+        s = (elapsed / self.delta_time)[:, None, None]
+        velocities = (
+            (6*s**2 - 6*s) * x_0 / self.delta_time
+            + (3*s**2 - 4*s + 1) * v_0
+            + (-6*s**2 + 6*s) * x_1 / self.delta_time
+            + (3*s**2 - 2*s) * v_1
+        )
+        return positions, velocities
+
+    def get_state(self, time: float) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Give the interpolated state of the bodies at a single time.
+
+        Parameters
+        ----------
+        time : float
+            Time, which must be within the ephemeris.
+
+        Returns
+        -------
+        positions, velocities : tuple[np.ndarray, np.ndarray]
+            (S,3) arrays of the bodies' positions and velocities.
+        """
+        # Fixed time steps fall on the samples, which are returned directly
+        i = round(time / self.delta_time)
+        if abs(time - i * self.delta_time) <= 1e-9 * self.delta_time and 0 <= i < len(self):
+            return self.positions[i], self.velocities[i]
+        positions, velocities = self.get_states([time])
+        return positions[0], velocities[0]
@@ -0,0 +1,134 @@
+from __future__ import annotations
+
+from hashlib import sha256
+from pickle import dumps
+from os import getpid, makedirs, replace
+from os.path import exists
+
+from src.simulator.ephemeris import Ephemeris
+
+
+class EphemerisCache:
+    """
+    A folder of ephemerides computed by previous runs. Every ephemeris is saved under a hash of everything that
+    determines it, so any run with the same attractive bodies and integration parameters reuses it instead of
+    integrating the attractive bodies again, whatever the test bodies simulated with them.
+    """
+
+    # Must be incremented whenever the computation of the ephemerides changes, which invalidates the saved ones
+    version = 1
+
+    def __init__(self, foldername: str):
+        """
+        Initialize an EphemerisCache object.
+
+        Parameters
+        ----------
+        foldername : str
+            Name of the folder containing the saved ephemerides. It is created when the first ephemeris is saved.
+        """
+        self.foldername = foldername
+
+    @classmethod
+    def get_key(
+            cls,
+            system,
+            delta_time: float,
+            duration: float,
+            tolerance: float=None,
+            positions_saving_frequency: int=None,
+            integrator: str=None
+        ) -> str:
+        """
+        Give the key of the ephemeris computed with the given arguments, see the Ephemeris.compute method. Besides the
+        system's class and settings, only the current state of the attractive bodies and the type of the fake bodies
+        are considered, as the other bodies do not change the ephemeris.
+
+        Returns
+        -------
+        key : str
+            Hexadecimal hash of the arguments.
+        """
+        bodies = [
+            (
+                type(body).__name__, body.mass, tuple(body.position),
+                tuple(body.velocity) if body.velocity is not None else None, body.fixed, body.integrator
+            )
+            for body in system.attractive_bodies
+        ]
+        fake_bodies = [type(body).__name__ for body in system.fake_bodies]
+        configuration = (
+            cls.version, type(system).__name__, bodies, fake_bodies, system.n, system.method,
+            integrator or system.integrator,
+            dumps(system._base_potential), dumps(system._base_force_field),
+            float(delta_time), float(duration), tolerance,
+            int(positions_saving_frequency) if positions_saving_frequency else None
+        )
+        return sha256(repr(configuration).encode()).hexdigest()
+
+    def get_filename(self, key: str) -> str:
+        """
+        Give the name of the file in which the ephemeris of a key is saved.
+        """
+        return f"{self.foldername}/{key}.gz"
+
+    def load(self, key: str) -> Ephemeris | None:
+        """
+        Load a saved ephemeris.
+
+        Parameters
+        ----------
+        key : str
+            Key of the ephemeris.
+
+        Returns
+        -------
+        ephemeris : Ephemeris | None
+            The saved ephemeris, or None if no ephemeris is saved for this key.
+        """
+        filename = self.get_filename(key)
+        return Ephemeris.load(filename) if exists(filename) else None
+
+    def save(self, key: str, ephemeris: Ephemeris):
+        """
+        Save an ephemeris. The file is written under a temporary name and then renamed, so processes sharing the
+        cache never read a partially written ephemeris.
+
+        Parameters
+        ----------
+        key : str
+            Key of the ephemeris.
+        ephemeris : Ephemeris
+            Ephemeris to save.
+        """
+        makedirs(self.foldername, exist_ok=True)
+        filename = self.get_filename(key)
+        temporary_filename = f"{filename}.{getpid()}.tmp"
+        ephemeris.save(temporary_filename)
+        replace(temporary_filename, filename)
+
+    def get(
+            self,
+            system,
+            delta_time: float,
+            duration: float,
+            tolerance: float=None,
+            positions_saving_frequency: int=None,
+            integrator: str=None
+        ) -> Ephemeris:
+        """
+        Give the ephemeris computed with the given arguments, see the Ephemeris.compute method. The ephemeris is
+        loaded from the cache if possible, otherwise it is computed and saved.
+
+        Returns
+        -------
+        ephemeris : Ephemeris
+            The loaded or computed ephemeris.
+        """
+        key = self.get_key(system, delta_time, duration, tolerance, positions_saving_frequency, integrator)
+        ephemeris = self.load(key)
+        if ephemeris is None:
+            ephemeris = Ephemeris.compute(system, delta_time, duration, tolerance, positions_saving_frequency,
+                                          integrator)
+            self.save(key, ephemeris)
+        return ephemeris
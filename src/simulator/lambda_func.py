@@ -1,3 +1,13 @@
+import ast
+
+import numpy as np
+from eztcolors import Colors as C
+
+
+# Functions compiled in the current process, by string representation, so that unpickled copies are not recompiled
+compiled_functions = {}
+
+
 class Lambda:
     """
     Wraps the lambda function to allow pickling.
@@ -20,9 +30,115 @@ class Lambda:
         """
         self.func_str = func
         self.number_of_parameters = number_of_parameters
-    
+
     def __call__(self, *values):
-        return eval(self.func_str)(*values)
-    
+        return self.func(*values)
+
     def __str__(self) -> str:
         return self.func_str
+
+    @property
+    def func(self):
+        """
+        Gives the function, compiled once per process.
+        """
+        if self.func_str not in compiled_functions:
+            compiled_functions[self.func_str] = eval(compile(self.func_str, "<Lambda>", "eval"), {})
+        return compiled_functions[self.func_str]
+
+    @property
+    def vectorized_func(self):
+        """
+        Gives the function rewritten to operate element-wise on arrays, compiled once per process. The boolean
+        operators, the chained comparisons and the conditional expressions, which cannot operate on arrays, are
+        replaced by their numpy equivalents. The rewritten function is None if the function is not a lambda.
+        """
+        key = ("vectorized", self.func_str)
+        if key not in compiled_functions:
+            tree = ast.parse(self.func_str, mode="eval")
+            if isinstance(tree.body, ast.Lambda):
+                tree = ast.fix_missing_locations(VectorizingTransformer().visit(tree))
+                compiled_functions[key] = eval(compile(tree, "<Lambda>", "eval"), {"np": np})
+            else:
+                compiled_functions[key] = None
+        return compiled_functions[key]
+
+    def alive_mask(self, positions: np.ndarray, tracked_position: np.ndarray=None) -> np.ndarray:
+        """
+        Evaluates the function for many bodies at once.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            The (N,3) array of the bodies' positions.
+        tracked_position : np.ndarray
+            The (3,) position of the tracked body, or the (N,3) array of the tracked body's position for each body.
+            Only used by functions of 6 parameters. Defaults to None.
+
+        Returns
+        -------
+        alive_mask : np.ndarray
+            The (N,) boolean array of the function's value for each body.
+        """
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        if self.number_of_parameters == 3:
+            arguments = positions.T
+        elif self.number_of_parameters == 6:
+            assert tracked_position is not None, \
+                f"{C.RED+C.BOLD}A tracked position is required by functions of 6 parameters.{C.END}"
+            tracked_position = np.broadcast_to(np.asarray(tracked_position, dtype=float), positions.shape)
+            arguments = (*positions.T, *tracked_position.T)
+        else:
+            raise ValueError(C.RED + "Function has an incorrect number of parameters. Expected 3 or 6." + C.END)
+
+        try:
+            mask = np.asarray(self.vectorized_func(*arguments), dtype=bool)
+            return np.broadcast_to(mask, len(positions)).copy()
+        except (TypeError, ValueError):
+            # Functions that cannot operate on arrays are evaluated for each body
+            return np.array([bool(self.func(*values)) for values in zip(*arguments)], dtype=bool)
+
+    def __getstate__(self) -> dict:
+        # Compiled functions cannot be pickled and are compiled again by each process
+        return {"func_str": self.func_str, "number_of_parameters": self.number_of_parameters}
+
+
+class VectorizingTransformer(ast.NodeTransformer):
+    """
+    Rewrites an expression so that it operates element-wise on numpy arrays.
+    """
+    @staticmethod
+    def call(name: str, *args: ast.expr) -> ast.Call:
+        """
+        Creates the call of a numpy function.
+        """
+        function = ast.Attribute(value=ast.Name(id="np", ctx=ast.Load()), attr=name, ctx=ast.Load())
+        return ast.Call(func=function, args=list(args), keywords=[])
+
+    def visit_BoolOp(self, node: ast.BoolOp) -> ast.expr:
+        name = "logical_and" if isinstance(node.op, ast.And) else "logical_or"
+        values = [self.visit(value) for value in node.values]
+        result = values[-1]
+        for value in reversed(values[:-1]):
+            result = self.call(name, value, result)
+        return result
+
+    def visit_UnaryOp(self, node: ast.UnaryOp) -> ast.expr:
+        if isinstance(node.op, ast.Not):
+            return self.call("logical_not", self.visit(node.operand))
+        return self.generic_visit(node)
+
+    def visit_Compare(self, node: ast.Compare) -> ast.expr:
+        # a < b < c is evaluated as (a < b) and (b < c)
+        operands = [self.visit(node.left)] + [self.visit(comparator) for comparator in node.comparators]
+        comparisons = [
+            ast.Compare(left=left, ops=[op], comparators=[right])
+            for left, op, right in zip(operands[:-1], node.ops, operands[1:])
+        ]
+        result = comparisons[-1]
+        for comparison in reversed(comparisons[:-1]):
+            result = self.call("logical_and", comparison, result)
+        return result
+
+    def visit_IfExp(self, node: ast.IfExp) -> ast.expr:
+        return self.call("where", self.visit(node.test), self.visit(node.body), self.visit(node.orelse))
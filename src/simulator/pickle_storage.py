@@ -0,0 +1,273 @@
+from __future__ import annotations
+
+import numpy as np
+from pickle import dump, load
+from gzip import GzipFile
+from os.path import exists
+
+from src.bodies.computed_body import ComputedBody
+from src.simulator.body_index import BodyIndex
+from src.tools.decimation import decimate
+from src.tools.trajectory_codec import encode
+
+
+class PickleWriter:
+    """
+    Writes bodies as pickled ComputedBody objects in a gzip file, along with an index of the bodies' attributes. Every
+    flush ends the current gzip member, so the index can locate each body by the offset of its member in the file and
+    its position within the decompressed member. A single body can then be read by decompressing only its member.
+    """
+
+    def __init__(
+            self,
+            foldername: str,
+            name: str="bodies",
+            bodies_count: int=None,
+            file_size: int=None,
+            decimation_tolerance: float=None,
+            encoding_resolution: float=None
+        ):
+        """
+        Initialize a PickleWriter object.
+
+        Parameters
+        ----------
+        foldername : str
+            Name of the folder in which to write the files.
+        name : str
+            Prefix of the written files. The bodies are written to {name}.gz and the index to {name}_info.npz.
+            Defaults to "bodies".
+        bodies_count : int
+            If given, the writer appends to existing files and keeps only their first bodies_count bodies, the bodies
+            file being truncated to file_size bytes. This is used to resume writing from a checkpoint. Defaults to
+            None, which creates new files.
+        file_size : int
+            Size of the bodies file when its first bodies_count bodies were written. Must be given with bodies_count.
+        decimation_tolerance : float
+            If given, only the samples needed to reconstruct each trajectory within this distance, in the system's
+            space unit, are written along with their indices (see src.tools.decimation). The trajectories are
+            reconstructed when the bodies are loaded. Defaults to None, which writes every sample.
+        encoding_resolution : float
+            If given, the trajectories are quantized to this resolution, in the system's space unit, and written with
+            the codec of src.tools.trajectory_codec, which compresses much better than the raw positions. They are
+            decoded when the bodies are loaded. Defaults to None, which writes the exact positions.
+        """
+        self.filename = f"{foldername}/{name}.gz"
+        self.index_filename = f"{foldername}/{name}_info.npz"
+        self.columns = {key: [] for key in ["member_offsets", "member_positions", "lengths",
+                                            *BodyIndex.attribute_columns]}
+        self.member = None
+        self.decimation_tolerance = decimation_tolerance
+        self.encoding_resolution = encoding_resolution
+        if bodies_count is None:
+            self.file = open(self.filename, "wb")
+        else:
+            index = BodyIndex.load(self.index_filename)
+            for key in self.columns:
+                self.columns[key] = index[key][:bodies_count].tolist()
+            self.file = open(self.filename, "r+b")
+            self.file.truncate(file_size)
+            self.file.seek(0, 2)
+
+    def __enter__(self) -> PickleWriter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def size(self) -> int:
+        """
+        Gives the number of bytes written to the bodies file, including the current gzip member only once it is
+        flushed.
+        """
+        return self.file.tell()
+
+    def write(self, body, type: str):
+        """
+        Write a body of a certain type.
+
+        Parameters
+        ----------
+        body : GravitationalBody | ComputedBody | FakeBody
+            Body to write.
+        type : str
+            Type of the body.
+        """
+        if self.member is None:
+            self.member_offset = self.file.tell()
+            self.member = GzipFile(fileobj=self.file, mode="wb")
+
+        self.columns["member_offsets"].append(self.member_offset)
+        self.columns["member_positions"].append(self.member.tell())
+        self.columns["lengths"].append(len(body.positions))
+        for key, value in BodyIndex.get_attributes(body, type).items():
+            self.columns[key].append(value)
+        dump(self.get_computed_body(body, type, self.decimation_tolerance, self.encoding_resolution), self.member)
+
+    @staticmethod
+    def get_computed_body(
+            body,
+            type: str,
+            decimation_tolerance: float=None,
+            encoding_resolution: float=None
+        ) -> ComputedBody:
+        """
+        Give the ComputedBody with which a body is saved.
+
+        Parameters
+        ----------
+        body : GravitationalBody | ComputedBody | FakeBody
+            Body to save.
+        type : str
+            Type of the body.
+        decimation_tolerance : float
+            If given, the trajectory is decimated within this tolerance. Defaults to None.
+        encoding_resolution : float
+            If given, the trajectory is encoded with this resolution. Defaults to None.
+
+        Returns
+        -------
+        computed_body : ComputedBody
+            The body to pickle.
+        """
+        positions = body.positions
+        if decimation_tolerance:
+            sample_indices = decimate(positions, decimation_tolerance)
+            positions = np.asarray(positions)[sample_indices]
+        computed_body = ComputedBody(
+            positions=positions if not encoding_resolution else np.zeros((0, 3)),
+            type=type,
+            mass=body.mass,
+            position=body.initial_position,
+            velocity=body.initial_velocity,
+            fixed=body.fixed,
+            has_potential=body.has_potential,
+            integrator=body.integrator,
+            time_survived=body.time_survived
+        )
+        computed_body.death_step = getattr(body, "death_step", None)
+        if decimation_tolerance:
+            computed_body.sample_indices = sample_indices.astype(np.int32)
+        if encoding_resolution:
+            computed_body.encoded_trajectory = encode(positions, encoding_resolution)
+        return computed_body
+
+    def flush(self):
+        """
+        End the current gzip member and flush it to the disk.
+        """
+        if self.member is not None:
+            self.member.close()
+            self.member = None
+        self.file.flush()
+
+    def close(self):
+        """
+        Close the bodies file and write the index.
+        """
+        self.write_index()
+        self.file.close()
+
+    def write_index(self):
+        """
+        Flush the bodies and write the index of every body written so far.
+        """
+        self.flush()
+        BodyIndex.save(self.index_filename, self.columns)
+
+
+class PickleReader:
+    """
+    Reads bodies written by a PickleWriter. Only the gzip members containing the requested bodies are decompressed.
+    """
+
+    def __init__(self, foldername: str, name: str="bodies"):
+        """
+        Initialize a PickleReader object.
+
+        Parameters
+        ----------
+        foldername : str
+            Name of the folder containing the files.
+        name : str
+            Prefix of the files to read. Defaults to "bodies".
+        """
+        self.filename = f"{foldername}/{name}.gz"
+        self.index = BodyIndex.load(f"{foldername}/{name}_info.npz")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    @staticmethod
+    def exists(foldername: str, name: str="bodies") -> bool:
+        """
+        Gives whether a folder contains pickled bodies along with their index.
+
+        Parameters
+        ----------
+        foldername : str
+            Name of the folder to check.
+        name : str
+            Prefix of the files to check. Defaults to "bodies".
+
+        Returns
+        -------
+        exists : bool
+            Whether the bodies file and its index are present.
+        """
+        return exists(f"{foldername}/{name}.gz") and exists(f"{foldername}/{name}_info.npz")
+
+    def get_bodies(self, indices: np.ndarray=None, load_positions: bool=True) -> list[ComputedBody]:
+        """
+        Get multiple bodies.
+
+        Parameters
+        ----------
+        indices : np.ndarray
+            Indices of the bodies to get. Defaults to None, which gives every body.
+        load_positions : bool
+            Whether the bodies' trajectories should be given. If False, the bodies are created from the index only and
+            the bodies file is not read. Defaults to True.
+
+        Returns
+        -------
+        bodies : list[ComputedBody]
+            The loaded bodies.
+        """
+        if indices is None:
+            indices = range(len(self))
+        if not load_positions:
+            return [self.index.get_body(i) for i in indices]
+
+        bodies = []
+        member, member_offset = None, None
+        with open(self.filename, "rb") as file:
+            for i in indices:
+                # The current member is kept while the bodies follow each other in it
+                position = self.index["member_positions"][i]
+                if self.index["member_offsets"][i] != member_offset or member.tell() > position:
+                    member_offset = self.index["member_offsets"][i]
+                    file.seek(member_offset)
+                    member = GzipFile(fileobj=file, mode="rb")
+                member.seek(position)
+                bodies.append(load(member))
+        return bodies
+
+    def get_body(self, i: int, load_positions: bool=True) -> ComputedBody:
+        """
+        Get a single body.
+
+        Parameters
+        ----------
+        i : int
+            Index of the body.
+        load_positions : bool
+            Whether the body's trajectory should be given. Defaults to True.
+
+        Returns
+        -------
+        body : ComputedBody
+            The loaded body.
+        """
+        return self.get_bodies([i], load_positions)[0]
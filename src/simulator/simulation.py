@@ -9,6 +9,8 @@ from src.systems.base_system import BaseSystem
 from src.systems.computed_system import ComputedSystem
 from src.engines.engine_3D.elements import Function3D
 from src.simulator.lambda_func import Lambda
+from src.simulator.columnar_storage import ColumnarReader
+from src.simulator.pickle_storage import PickleReader
 try:
     from src.engines.engine_2D.engine import Engine2D
     from src.engines.engine_3D.engine import Engine3D
@@ -67,7 +69,8 @@ class Simulation:
             cls,
             foldername: str,
             min_time_survived: int=None,
-            only_load_best_body: bool=False
+            only_load_best_body: bool=False,
+            load_positions: bool=True
         ) -> Simulation:
         """
         Load a simulation from a folder containing details of a previously rendered simulation.
@@ -81,6 +84,10 @@ class Simulation:
         only_load_best_body : bool
             Whether the simulation should only be loaded with the best body. If False, all the bodies will be loaded.
             Defaults to False.
+        load_positions : bool
+            Whether the bodies' trajectories should be loaded. If False and the folder contains an index of the bodies,
+            the bodies are created from the index only, with empty trajectories, which is enough to plot the bodies'
+            initial conditions and time survived. Defaults to True.
 
         Returns
         -------
@@ -98,15 +105,29 @@ class Simulation:
         delta_time = float(info_dict["delta_time"])
         
         base_system = cls.load_pickle_file(f"{foldername}/base_system.gz")
+        if ColumnarReader.exists(foldername):
+            reader = ColumnarReader(foldername)
+        elif PickleReader.exists(foldername):
+            reader = PickleReader(foldername)
+        else:
+            # Simulations saved before the bodies were indexed
+            reader = None
+
+        bodies_index = None
         if only_load_best_body:
             bodies = cls.load_pickle_file(f"{foldername}/best_body.gz")
+        elif reader:
+            # The filtering is done on the index so the trajectories of the other bodies are never read
+            indices = reader.index.select(min_time_survived=min_time_survived)
+            bodies = reader.get_bodies(indices, load_positions)
+            bodies_index = reader.index.subset(indices)
         else:
             bodies = cls.load_pickle_file(f"{foldername}/bodies.gz")
+            if min_time_survived:
+                bodies = [body for body in bodies if body.time_survived >= min_time_survived]
 
-        if min_time_survived and not only_load_best_body:
-            bodies = [body for body in bodies if body.time_survived >= min_time_survived]
-
-        return cls(system=ComputedSystem(base_system + bodies, n=n, tick_factor=save_freq*delta_time, info=info_dict),
+        return cls(system=ComputedSystem(base_system + bodies, n=n, tick_factor=save_freq*delta_time, info=info_dict,
+                                         bodies_index=bodies_index),
                    maximum_delta_time=delta_time)
 
     def show_2D(self, *args, traces: list | bool=None, **kwargs):
@@ -137,7 +158,7 @@ class Simulation:
         )
         app.run()
 
-    def show_3D(self, show_potential: bool=False, **kwargs):
+    def show_3D(self, show_potential: bool=False, potential_solver: str="direct", **kwargs):
         """
         Show a simulation in 3D with pygame and moderngl.
 
@@ -146,6 +167,9 @@ class Simulation:
         show_potential : bool
             If True, the potential function is passed directly to the Engine3D class. This eases the plotting of the 
             potential field. Defaults to False.
+        potential_solver : str
+            Solver used to evaluate the potential surface, "direct" or "particle-mesh". The latter is much faster for
+            systems with many bodies. Defaults to "direct".
         kwargs : dict
             Parameters to pass to the Engine3D class.
         """
@@ -157,7 +181,8 @@ class Simulation:
                     resolution=200,
                     x_limits=(0,900),
                     y_limits=(0,900),
-                    instance=self.system
+                    instance=self.system,
+                    potential_solver=potential_solver
                 )
             ]
 
@@ -172,7 +197,8 @@ class Simulation:
             duration: int,
             positions_saving_frequency: int,
             potential_gradient_limit: float,
-            body_alive_func: Lambda
+            body_alive_func: Lambda,
+            tolerance: float=None
     ) -> dict:
         """
         Run the simulation.
@@ -187,6 +213,10 @@ class Simulation:
             Limit for the potential gradient on a body to be considered still alive.
         body_alive_func: Lambda
             Lambda function specifying the conditions a body must respect to stay alive.
+        tolerance : float
+            If given, every step of maximum_delta_time is divided into adaptive substeps keeping the local error on
+            the positions below this tolerance, in the system's space unit. The positions are still saved every
+            positions_saving_frequency steps. Defaults to None, which uses a single step of the body's integrator.
 
         Returns
         -------
@@ -198,16 +228,17 @@ class Simulation:
         system = self.system
         system.method = "force"
         dead_body_removal_frequency = 10
+        system.reserve_positions(int(total_iterations // positions_saving_frequency))
         for i in range(1, int(total_iterations // positions_saving_frequency)+1):
             for j in range(int(positions_saving_frequency)):
-                system.update(self.maximum_delta_time)
+                system.update(self.maximum_delta_time, tolerance=tolerance)
 
                 if (i * positions_saving_frequency + j) % dead_body_removal_frequency == 0:
                     # Check for dead bodies in the system
                     system.remove_dead_bodies(potential_gradient_limit, body_alive_func)
 
             # Check if no bodies remain
-            if len(system.attractive_bodies) - len(system.fixed_bodies) == len(system.moving_bodies):
+            if not system.alive_bodies_count:
                 break
             
             system.save_positions()
@@ -217,7 +248,7 @@ class Simulation:
             "dead": system.dead_bodies
         }
     
-    def run_attractive_bodies(self, duration: int, positions_saving_frequency: int) -> dict:
+    def run_attractive_bodies(self, duration: int, positions_saving_frequency: int, tolerance: float=None) -> dict:
         """ 
         Run the simulation only for the attractive moving bodies of the system.
 
@@ -227,6 +258,8 @@ class Simulation:
             Duration of the simulation in seconds.
         positions_saving_frequency : int
             Sets the number of steps after which the body's positions will be saved. Defaults to 1000.
+        tolerance : float
+            Tolerance of the adaptive substeps, see the run method. Defaults to None.
 
         Returns
         -------
@@ -236,12 +269,13 @@ class Simulation:
         total_iterations = duration // self.maximum_delta_time
         system = self.system
         system.method = "force"
+        system.reserve_positions(int(total_iterations // positions_saving_frequency), reserve_fake=True)
         for i in range(int(total_iterations // positions_saving_frequency)):
             for i in range(int(positions_saving_frequency)):
-                system.update(self.maximum_delta_time)
+                system.update(self.maximum_delta_time, tolerance=tolerance)
             system.save_positions(save_fake=True)
         return {
             "attractive_moving": [body for body in system.list_of_bodies if body in system.moving_bodies],
-            "fake": system.fake_bodies[0]
+            "fake": system.fake_bodies[0] if system.fake_bodies else None
         }
     
\ No newline at end of file
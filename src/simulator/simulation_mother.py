@@ -1,18 +1,28 @@
+from __future__ import annotations
+
 import numpy as np
 
-from pickle import dump
+from pickle import dump, dumps, load, loads
 from gzip import open as gzip_open
 from gzip import GzipFile
+from json import dumps as dumps_json, loads as loads_json
 from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
 from datetime import datetime
 from os.path import exists
-from os import makedirs
+from os import makedirs, remove, replace
+from weakref import finalize
 from tqdm import tqdm
 from eztcolors import Colors as C
 
 from src.simulator.simulation import Simulation
+from src.simulator.columnar_storage import ColumnarWriter
+from src.simulator.ephemeris import Ephemeris
+from src.simulator.ephemeris_cache import EphemerisCache
+from src.simulator.pickle_storage import PickleWriter
 from src.simulator.lambda_func import Lambda
 from src.systems.base_system import BaseSystem
+from src.systems.vectorized_system import VectorizedSystem
 from src.bodies.gravitational_body import GravitationalBody
 from src.bodies.fake_body import FakeBody
 from src.bodies.computed_body import ComputedBody
@@ -36,7 +46,13 @@ class SimulationMother:
         self.initial_system = base_system
 
     @staticmethod
-    def dump_body(body: GravitationalBody | ComputedBody | FakeBody, type: str, file: GzipFile):
+    def dump_body(
+            body: GravitationalBody | ComputedBody | FakeBody,
+            type: str,
+            file: GzipFile,
+            decimation_tolerance: float=None,
+            encoding_resolution: float=None
+        ):
         """
         Dump a body of a certain type into a file.
 
@@ -48,22 +64,23 @@ class SimulationMother:
             Type of the body.
         file : gzip.GzipFile
             Reference to the file in which the body should be dumped.
+        decimation_tolerance : float
+            If given, only the samples needed to reconstruct the trajectory within this distance are dumped, see
+            src.simulator.pickle_storage.PickleWriter. Defaults to None.
+        encoding_resolution : float
+            If given, the trajectory is dumped with the codec of src.tools.trajectory_codec and this resolution, see
+            src.simulator.pickle_storage.PickleWriter. Defaults to None.
         """
-        dump(
-            ComputedBody(
-                positions=body.positions,
-                type=type,
-                mass=body.mass,
-                position=body.initial_position,
-                velocity=body.initial_velocity,
-                fixed=body.fixed,
-                has_potential=body.has_potential,
-                integrator=body.integrator,
-                time_survived=body.time_survived
-            ), file
-        )
+        dump(PickleWriter.get_computed_body(body, type, decimation_tolerance, encoding_resolution), file)
 
-    def save_results(self, results: list, save_foldername: str):
+    def save_results(
+            self,
+            results: list,
+            save_foldername: str,
+            storage: str="pickle",
+            decimation_tolerance: float=None,
+            encoding_resolution: float=None
+        ):
         """
         Save the results of a single simulation to a .pkl file.
 
@@ -73,22 +90,24 @@ class SimulationMother:
             List of dictionaries containing the results of each simulation.
         save_foldername : str
             Name of the folder in which to save the results.
+        storage : str
+            Format in which the bodies are saved. "pickle" dumps ComputedBody objects in bodies.gz and "columnar" writes
+            the positions in a flat file that can be memory-mapped. Both formats save an index of the bodies'
+            attributes that can be queried without reading the trajectories (see src.simulator.pickle_storage and
+            src.simulator.columnar_storage). Defaults to "pickle".
+        decimation_tolerance : float
+            If given, the trajectories are decimated within this distance, in the system's space unit, see
+            src.tools.decimation. Only supported by the pickle storage. Defaults to None.
+        encoding_resolution : float
+            If given, the trajectories are quantized to this resolution, in the system's space unit, and saved with
+            the codec of src.tools.trajectory_codec. They are decoded transparently when loaded. Only supported by the
+            pickle storage. Defaults to None.
         """
         print(C.LIGHT_CYAN, end="")
-        fake_body_saved = False
-        with gzip_open(f"{save_foldername}/bodies.gz", "wb") as file:
+        with ResultsWriter(save_foldername, storage, decimation_tolerance=decimation_tolerance,
+                           encoding_resolution=encoding_resolution) as writer:
             for listi in tqdm(results, desc="Saving", miniters=1, mininterval=0.001):
-                for key, value in listi.items():
-                    if key == "fake":
-                        body = value
-                        if fake_body_saved:
-                            continue
-                        else:
-                            self.dump_body(body, body.type, file)
-                            fake_body_saved = True
-                    else:
-                        for body in value:
-                            self.dump_body(body, key, file)
+                writer.write(listi)
         print(C.END, end="")
 
     def save_best_body(self, results: list, save_foldername: str) -> int:
@@ -107,36 +126,10 @@ class SimulationMother:
         max_time_survived : int
             Maximum time survived.
         """
-        max_number = 0
-        max_body = None
-        body_type = "dead"
-        for listi in results[1:]:           # Remove first value has it corresponds to the attractive body simulation
-            for state, bodies in listi.items():
-                if state == "alive" and bodies:
-                    max_number = bodies[0].time_survived
-                    max_body = bodies[0]
-                    body_type = "alive"
-                    break
-                else:
-                    for body in bodies:
-                        if body.time_survived > max_number:
-                            max_number = body.time_survived
-                            max_body = body
-            else:
-                continue
-            break
-
-        if max_body:
-            with gzip_open(f"{save_foldername}/best_body.gz", "wb") as file:
-                # Save attractive moving bodies
-                attractive_moving = results[0].get("attractive_moving")
-                if attractive_moving:
-                    for body in attractive_moving:
-                        self.dump_body(body, "attractive_moving", file)
-                if results[0].get("fake"):
-                    self.dump_body(results[0]["fake"], results[0]["fake"].type, file)
-                self.dump_body(max_body, body_type, file)
-        return max_number
+        tracker = BestBodyTracker()
+        for listi in results:
+            tracker.update(listi)
+        return tracker.save(save_foldername)
 
     def save_simulation_parameters(self, save_foldername: str, **kwargs):
         """
@@ -175,7 +168,16 @@ class SimulationMother:
             positions_saving_frequency: int=1e2,
             potential_gradient_limit: float=5e-10,
             body_alive_func: Lambda=Lambda("lambda x,y,z: (0 < x < 900) and (0 < y < 900)", 3),
-            integrator: str="synchronous"
+            integrator: str="synchronous",
+            tolerance: float=None,
+            use_ephemeris: bool=False,
+            ephemeris_cache_foldername: str=None,
+            batched: bool=False,
+            storage: str="pickle",
+            decimation_tolerance: float=None,
+            encoding_resolution: float=None,
+            resume: bool=False,
+            checkpoint_frequency: int=100
         ) -> str:
         """
         Start a simulation and dispatch to Simulation objects.
@@ -211,13 +213,50 @@ class SimulationMother:
         integrator : str
             Integrator to use for computing the body positions. Supported integrators can be found in 
             src.bodies.gravitational_bodies.__call__. Defaults to "synchronous".
+        tolerance : float
+            If given, the bodies are integrated with adaptive substeps whose local error on the positions is kept below
+            this tolerance, in the system's space unit, and the integrator is ignored. The delta_time then only sets
+            the maximum substep and the interval between the dead bodies checks. Defaults to None.
+        use_ephemeris : bool
+            If True, the moving attractive bodies are integrated once before the simulations and every simulation
+            reads their state from the resulting ephemeris instead of integrating them (see
+            src.simulator.ephemeris). Defaults to False.
+        ephemeris_cache_foldername : str
+            Folder in which the ephemerides are cached (see src.simulator.ephemeris_cache). If given and use_ephemeris
+            is True, the ephemeris is loaded from this folder when a previous dispatch computed it with the same
+            attractive bodies and parameters, otherwise it is computed and saved there. Defaults to None, which always
+            computes the ephemeris.
+        batched : bool
+            If True, every test body of every simulation is stacked in a single VectorizedSystem and integrated in the
+            current process against the shared attractive bodies, instead of dispatching one simulation per process.
+            This is only valid because the test bodies have no potential and therefore do not interact. The
+            simulations are batched by chunks of checkpoint_frequency simulations. Defaults to False.
+        storage : str
+            Format in which the bodies are saved: "pickle" or "columnar". The columnar format can be memory-mapped
+            when loading the simulation. Defaults to "pickle".
+        decimation_tolerance : float
+            If given, only the samples needed to reconstruct each trajectory within this distance, in the system's
+            space unit, are saved (see src.tools.decimation). Only supported by the pickle storage. Defaults to None.
+        encoding_resolution : float
+            If given, the trajectories are quantized to this resolution, in the system's space unit, and saved with
+            the codec of src.tools.trajectory_codec, which makes the results several times smaller. Only supported by
+            the pickle storage. Defaults to None.
+        resume : bool
+            If True and save_foldername contains the checkpoint of an interrupted dispatch, the dispatch is resumed in
+            that folder: the saved initial conditions are reused and only the missing simulations are computed. The
+            parameters saved in info.txt, such as the storage, must match those of the interrupted dispatch, otherwise
+            a ValueError is raised. Defaults to False.
+        checkpoint_frequency : int
+            Number of completed simulations after which a checkpoint is saved. When batched is True, it is also the
+            number of simulations integrated together. Defaults to 100.
         
         Returns
         -------
         foldername : str
             Actual name of the folder in which the simulation results were saved.
         """
-        while exists(save_foldername):
+        checkpoint = self.load_checkpoint(save_foldername) if resume else None
+        while not checkpoint and exists(save_foldername):
             if "_" in save_foldername:
                 split = save_foldername.split("_")
                 try:
@@ -231,17 +270,46 @@ class SimulationMother:
         
         body_initial_position_limits = [(round(val[0],10), round(val[1],10)) for val in body_initial_position_limits]
         body_initial_velocity_limits = [(round(val[0],10), round(val[1],10)) for val in body_initial_velocity_limits]
+        parameters = dict(
+            simulation_count=simulation_count, bodies_per_simulation=bodies_per_simulation,
+            body_initial_position_limits=body_initial_position_limits,
+            body_initial_velocity_limits=body_initial_velocity_limits,
+            positions_saving_frequency=int(positions_saving_frequency),
+            simulation_duration=f"{simulation_duration:.3e}",
+            delta_time=delta_time, integrator=integrator, tolerance=tolerance, use_ephemeris=use_ephemeris,
+            potential_gradient_limit=potential_gradient_limit,
+            body_alive_func=str(body_alive_func), decimation_tolerance=decimation_tolerance,
+            encoding_resolution=encoding_resolution, storage=storage
+        )
 
-        body_positions = np.array([
-            np.random.uniform(*body_initial_position_limits[0], size=simulation_count),
-            np.random.uniform(*body_initial_position_limits[1], size=simulation_count),
-            np.random.uniform(*body_initial_position_limits[2], size=simulation_count)
-        ]).transpose()
-        body_velocities = np.array([
-            np.random.uniform(*body_initial_velocity_limits[0], size=bodies_per_simulation),
-            np.random.uniform(*body_initial_velocity_limits[1], size=bodies_per_simulation),
-            np.random.uniform(*body_initial_velocity_limits[2], size=bodies_per_simulation)
-        ]).transpose().tolist()
+        if checkpoint:
+            # The simulations of a folder must all be computed and saved in the same way
+            saved_parameters = loads_json(str(checkpoint["parameters"]))
+            mismatched_parameters = [
+                key for key, value in loads_json(dumps_json(parameters)).items() if saved_parameters.get(key) != value
+            ]
+            if mismatched_parameters:
+                raise ValueError(f"{C.RED}The parameters {', '.join(mismatched_parameters)} differ from those of the "
+                                 f"interrupted dispatch in {save_foldername}.{C.END}")
+            body_positions = checkpoint["body_positions"]
+            body_velocities = checkpoint["body_velocities"].tolist()
+            completed = checkpoint["completed"]
+            attractive_completed = bool(checkpoint["attractive_completed"])
+            print(f"{C.YELLOW+C.BOLD}Resuming {save_foldername}: {completed.sum()}/{len(completed)} simulations "
+                  f"were already completed.{C.END}")
+        else:
+            body_positions = np.array([
+                np.random.uniform(*body_initial_position_limits[0], size=simulation_count),
+                np.random.uniform(*body_initial_position_limits[1], size=simulation_count),
+                np.random.uniform(*body_initial_position_limits[2], size=simulation_count)
+            ]).transpose()
+            body_velocities = np.array([
+                np.random.uniform(*body_initial_velocity_limits[0], size=bodies_per_simulation),
+                np.random.uniform(*body_initial_velocity_limits[1], size=bodies_per_simulation),
+                np.random.uniform(*body_initial_velocity_limits[2], size=bodies_per_simulation)
+            ]).transpose().tolist()
+            completed = np.zeros(simulation_count, dtype=bool)
+            attractive_completed = False
 
         print(f"{C.YELLOW+C.BOLD}Simulation starting at {datetime.now().strftime('%H:%M:%S')} with parameters:{C.END}")
         print(C.BROWN)
@@ -256,59 +324,575 @@ class SimulationMother:
               f"\n    simulation_duration:      {simulation_duration:.0e}" +
               f"\n    pos_saving_frequency:     {positions_saving_frequency:.0f}" +
               f"\n    integrator:               {integrator}" +
+              f"\n    tolerance:                {tolerance}" +
               f"\n    save_foldername:          {save_foldername}{C.END}\n")
 
-        pool = Pool()
-        number_of_processes = pool._processes
-        print(f"{C.BROWN}Number of processes used: {number_of_processes}{C.END}")
-        start = datetime.now()
+        if use_ephemeris and Ephemeris.get_bodies(self.initial_system):
+            # The attractive bodies are integrated with the integrator of the simulations
+            ephemeris_arguments = (self.initial_system, delta_time, simulation_duration, tolerance,
+                                   positions_saving_frequency, integrator)
+            if ephemeris_cache_foldername:
+                print(f"{C.LIGHT_PURPLE}Getting the ephemeris of the attractive bodies from "
+                      f"{ephemeris_cache_foldername}{C.END}")
+                ephemeris = EphemerisCache(ephemeris_cache_foldername).get(*ephemeris_arguments)
+            else:
+                print(f"{C.LIGHT_PURPLE}Computing the ephemeris of the attractive bodies{C.END}")
+                ephemeris = Ephemeris.compute(*ephemeris_arguments)
+        else:
+            ephemeris = None
 
-        worker_args = [(body_pos, body_velocities, self.initial_system, delta_time, simulation_duration,
-                        positions_saving_frequency, potential_gradient_limit, body_alive_func, integrator)
-                       for body_pos in body_positions]
-        
-        # Dispatch a worker simulation to compute the independent movement of attractive moving bodies
-        if self.initial_system.moving_bodies:
-            special_args = [(None, None, self.initial_system, delta_time, simulation_duration,
-                             positions_saving_frequency, None, None, integrator)]
+        if batched:
+            pool = None
+            number_of_processes = 1
         else:
-            special_args = []
+            # The base system and the initial conditions are published once per worker, tasks only carry an index
+            shared_arrays = [SharedArray(body_positions), SharedArray(np.array(body_velocities))]
+            pool = Pool(
+                initializer=initialize_worker,
+                initargs=(dumps(self.initial_system), *shared_arrays, dict(
+                    delta_time=delta_time, simulation_duration=simulation_duration,
+                    positions_saving_frequency=positions_saving_frequency,
+                    potential_gradient_limit=potential_gradient_limit, body_alive_func=body_alive_func,
+                    integrator=integrator, tolerance=tolerance, ephemeris=ephemeris
+                ))
+            )
+            number_of_processes = pool._processes
+        # The workers and the shared memory blocks are released even if the dispatch fails or is interrupted
+        try:
+            print(f"{C.BROWN}Number of processes used: {number_of_processes}{C.END}")
 
-        total_args = special_args + worker_args
-        results = []
-        mapped_pool = pool.imap(self.worker_simulation_star, total_args)
-        print(C.LIGHT_PURPLE, end="")
-        for result in tqdm(mapped_pool, total=len(total_args), desc="Simulating", miniters=1, mininterval=0.001):
-            results.append(result)
-        print(C.END, end="")
-        stop = datetime.now()
-        time = stop - start
-        print(f"\n{C.GREEN}Simulation finished in {time}.{C.END}")
+            # The parameters are saved before simulating so that partial results can be loaded if the dispatch is
+            # stopped
+            if not checkpoint:
+                makedirs(save_foldername)
+                self.save_simulation_parameters(save_foldername, number_of_processes=number_of_processes, **parameters)
+            start = datetime.now()
 
-        makedirs(save_foldername)
+            # Every task is identified by the index of its simulation, -1 being the attractive bodies simulation
+            pending = np.flatnonzero(~completed)
+            run_attractive = bool(self.initial_system.moving_bodies) and not attractive_completed
+            if run_attractive and ephemeris is not None:
+                # The attractive bodies simulation was already done by computing the ephemeris
+                attractive_result = {
+                    "attractive_moving": [body for body in ephemeris.system.list_of_bodies
+                                          if body in ephemeris.system.moving_bodies],
+                    "fake": ephemeris.system.fake_bodies[0] if ephemeris.system.fake_bodies else None
+                }
+                run_attractive = False
+            else:
+                attractive_result = None
+            task_indices = ([-1] if run_attractive else []) + pending.tolist()
 
-        max_time_survived = self.save_best_body(results, save_foldername)
-        self.save_simulation_parameters(
-            save_foldername, number_of_processes=number_of_processes, real_time_duration=time,
-            simulation_count=simulation_count, bodies_per_simulation=bodies_per_simulation,
-            body_initial_position_limits=body_initial_position_limits,
-            body_initial_velocity_limits=body_initial_velocity_limits,
-            positions_saving_frequency=int(positions_saving_frequency),
-            simulation_duration=f"{simulation_duration:.3e}",
-            delta_time=delta_time, integrator=integrator, potential_gradient_limit=potential_gradient_limit,
-            body_alive_func=str(body_alive_func), max_time_survived=f"{max_time_survived:.3e}"
-        )
-        self.save_results(results, save_foldername)
-        print(f"{C.GREEN+C.BOLD}Simulation successfully saved at {save_foldername}.{C.END}")
-        pool.close()
+            # Results are written as soon as they are computed so that only one result is kept in memory at a time
+            with ResultsWriter(
+                    save_foldername, storage, checkpoint, decimation_tolerance, encoding_resolution
+            ) as writer:
+                if attractive_result:
+                    writer.write(attractive_result)
+                    attractive_completed = True
+                if batched:
+                    # The simulations are batched by chunks of checkpoint_frequency so that a checkpoint is saved
+                    # after each chunk, the attractive bodies simulation being run with the first one
+                    results = (
+                        result
+                        for chunk_start in range(0, max(len(pending), 1), checkpoint_frequency)
+                        for result in self.run_batched_simulations(
+                            body_positions[pending[chunk_start:chunk_start+checkpoint_frequency]], body_velocities,
+                            delta_time, simulation_duration, positions_saving_frequency, potential_gradient_limit,
+                            body_alive_func, integrator, run_attractive and chunk_start == 0, tolerance, ephemeris
+                        )
+                    )
+                else:
+                    # The special task -1 computes the independent movement of attractive moving bodies
+                    mapped_pool = pool.imap(worker_trial, task_indices)
+                    print(C.LIGHT_PURPLE, end="")
+                    results = tqdm(mapped_pool, total=len(task_indices), desc="Simulating", miniters=1,
+                                   mininterval=0.001)
+
+                # Only the simulations are counted between checkpoints, so that a checkpoint is saved after each
+                # chunk of batched simulations
+                simulations_completed = 0
+                for task_index, result in zip(task_indices, results):
+                    writer.write(result)
+                    if task_index == -1:
+                        attractive_completed = True
+                        continue
+                    completed[task_index] = True
+                    simulations_completed += 1
+                    if simulations_completed % checkpoint_frequency == 0:
+                        self.save_checkpoint(save_foldername, writer, body_positions, body_velocities, completed,
+                                             attractive_completed, parameters)
+                print(C.END, end="")
+                max_time_survived = writer.best_body_tracker.save(save_foldername)
+            stop = datetime.now()
+            time = stop - start
+            print(f"\n{C.GREEN}Simulation finished in {time}.{C.END}")
+
+            self.save_simulation_parameters(
+                save_foldername, number_of_processes=number_of_processes, real_time_duration=time, **parameters,
+                max_time_survived=f"{max_time_survived:.3e}"
+            )
+            self.remove_checkpoint(save_foldername)
+            print(f"{C.GREEN+C.BOLD}Simulation successfully saved at {save_foldername}.{C.END}")
+        finally:
+            if pool:
+                pool.terminate()
+                pool.join()
+                for shared_array in shared_arrays:
+                    shared_array.release()
         return save_foldername
-    
+
     @staticmethod
-    def worker_simulation_star(args):
+    def save_checkpoint(
+            save_foldername: str,
+            writer: ResultsWriter,
+            body_positions: np.ndarray,
+            body_velocities: list[list[float]],
+            completed: np.ndarray,
+            attractive_completed: bool,
+            parameters: dict
+        ):
         """
-        Makes multiprocessing.pool.map -> multiprocessing.pool.starmap.
+        Save the state of a dispatch so it can be resumed if it is interrupted. The results file is first made
+        consistent on the disk, then the initial conditions and the completed simulations are saved in
+        checkpoint.npz.
+
+        Parameters
+        ----------
+        save_foldername : str
+            Name of the folder in which the results are saved.
+        writer : ResultsWriter
+            Writer of the dispatch's results.
+        body_positions : np.ndarray
+            Initial position of the bodies of each simulation.
+        body_velocities : list[list[float]]
+            Initial velocities of the bodies added to every simulation.
+        completed : np.ndarray
+            Whether each simulation was completed and written.
+        attractive_completed : bool
+            Whether the attractive bodies simulation was completed and written.
+        parameters : dict
+            Parameters of the dispatch saved in info.txt, which a resumed dispatch must match.
+        """
+        writer_state = writer.checkpoint()
+        # The checkpoint is written to a temporary file first so an interruption never leaves a corrupted checkpoint
+        np.savez(
+            f"{save_foldername}/checkpoint.tmp.npz",
+            body_positions=body_positions,
+            body_velocities=np.array(body_velocities),
+            completed=completed,
+            attractive_completed=attractive_completed,
+            parameters=dumps_json(parameters),
+            **writer_state
+        )
+        replace(f"{save_foldername}/checkpoint.tmp.npz", f"{save_foldername}/checkpoint.npz")
+
+    @staticmethod
+    def load_checkpoint(save_foldername: str) -> dict | None:
+        """
+        Load the checkpoint of an interrupted dispatch.
+
+        Parameters
+        ----------
+        save_foldername : str
+            Name of the folder in which the results are saved.
+
+        Returns
+        -------
+        checkpoint : dict | None
+            The saved state of the dispatch, or None if the folder does not contain a checkpoint.
+        """
+        if not exists(f"{save_foldername}/checkpoint.npz"):
+            return None
+        with np.load(f"{save_foldername}/checkpoint.npz") as file:
+            return {key: file[key] for key in file.files}
+
+    @staticmethod
+    def remove_checkpoint(save_foldername: str):
+        """
+        Remove the checkpoint files of a completed dispatch.
+
+        Parameters
+        ----------
+        save_foldername : str
+            Name of the folder in which the results are saved.
+        """
+        for filename in ["checkpoint.npz", "checkpoint_best_body.gz"]:
+            if exists(f"{save_foldername}/{filename}"):
+                remove(f"{save_foldername}/{filename}")
+
+    def run_batched_simulations(
+            self,
+            body_positions: np.ndarray,
+            body_velocities: list[list[float]],
+            delta_time: float,
+            simulation_duration: float,
+            positions_saving_frequency: int,
+            potential_gradient_limit: float,
+            body_alive_func: Lambda,
+            integrator: str,
+            run_attractive: bool=True,
+            tolerance: float=None,
+            ephemeris: Ephemeris=None
+        ) -> list:
+        """
+        Run every simulation of a dispatch at once by stacking all the test bodies in a single VectorizedSystem. The
+        attractive bodies' field is then computed once per step for all the simulations.
+
+        Parameters
+        ----------
+        body_positions : np.ndarray
+            Initial position of the bodies of each simulation.
+        body_velocities : list[list[float]]
+            Initial velocities of the bodies added to every simulation.
+        delta_time : float
+            Delta time between of each step.
+        simulation_duration : float
+            Duration of the simulation in seconds.
+        positions_saving_frequency : int
+            Sets the number of steps after which the body's positions will be saved.
+        potential_gradient_limit: float
+            Limit for the potential gradient on a body to be considered still alive.
+        body_alive_func: Lambda
+            Lambda function specifying the conditions a body must respect to stay alive.
+        integrator : str
+            Integrator to use for computing the body positions.
+        run_attractive : bool
+            Whether the attractive moving bodies simulation should also be run, if there are such bodies. Defaults to
+            True.
+        tolerance : float
+            Tolerance of the adaptive substeps, None to integrate with fixed steps. Defaults to None.
+        ephemeris : Ephemeris
+            Ephemeris of the moving attractive bodies, None to integrate them with the test bodies. Defaults to None.
+
+        Returns
+        -------
+        results : list
+            Results of each simulation, in the same format as the results given by the worker_simulation function.
+        """
+        results = []
+        if self.initial_system.moving_bodies and run_attractive:
+            attractive_system = loads(dumps(self.initial_system))
+            attractive_system.set_integrator(integrator)
+            results.append(worker_simulation(None, None, attractive_system, delta_time, simulation_duration,
+                                             positions_saving_frequency, None, None, integrator, tolerance))
+
+        simulations_bodies = [
+            [GravitationalBody(
+                mass=1,
+                position=Vector(*body_position),
+                velocity=Vector(v_x,v_y,v_z),
+                has_potential=False,
+                integrator=integrator
+            ) for v_x, v_y, v_z in body_velocities]
+            for body_position in body_positions
+        ]
+        list_of_bodies = (loads(dumps(self.initial_system.list_of_bodies))
+                          + [body for bodies in simulations_bodies for body in bodies])
+        # The options of the initial system, such as the force solver of a VectorizedSystem, are kept
+        if isinstance(self.initial_system, VectorizedSystem):
+            batched_system = self.initial_system.copy_with_bodies(list_of_bodies, integrator=integrator)
+        else:
+            batched_system = VectorizedSystem(
+                list_of_bodies, **{**self.initial_system.options, "integrator": integrator}
+            )
+        batched_system.set_ephemeris(ephemeris)
+        print(f"{C.LIGHT_PURPLE}Simulating {len(batched_system.moving_bodies)} bodies in a single system{C.END}")
+        batched_result = Simulation(system=batched_system, maximum_delta_time=delta_time).run(
+            simulation_duration, positions_saving_frequency, potential_gradient_limit, body_alive_func, tolerance
+        )
+
+        # Split the bodies back into their respective simulation
+        simulation_index = {id(body): i for i, bodies in enumerate(simulations_bodies) for body in bodies}
+        split_results = [{"alive": [], "dead": []} for _ in simulations_bodies]
+        for state, bodies in batched_result.items():
+            for body in bodies:
+                split_results[simulation_index[id(body)]][state].append(body)
+        return results + split_results
+
+
+class BestBodyTracker:
+    """
+    Keeps track of the body that survived the longest among the results of a dispatch, one result at a time.
+    """
+
+    def __init__(self):
+        """
+        Initialize a BestBodyTracker object.
+        """
+        self.max_time_survived = 0
+        self.best_body = None
+        self.best_body_type = "dead"
+        self.attractive_result = None
+
+    def update(self, result: dict):
+        """
+        Update the best body with the bodies of a result. A body that stayed alive is always kept over the others.
+
+        Parameters
+        ----------
+        result : dict
+            Result of a single simulation.
         """
-        return worker_simulation(*args)
+        if "attractive_moving" in result:
+            # Result of the attractive bodies simulation, needed to save the best body file
+            self.attractive_result = result
+            return
+        if self.best_body_type == "alive":
+            return
+        if result.get("alive"):
+            self.max_time_survived = result["alive"][0].time_survived
+            self.best_body = result["alive"][0]
+            self.best_body_type = "alive"
+            return
+        for body in result.get("dead", []):
+            if body.time_survived > self.max_time_survived:
+                self.max_time_survived = body.time_survived
+                self.best_body = body
+
+    def save(self, save_foldername: str) -> int:
+        """
+        Save in its own file the best body, along with the attractive moving bodies and the fake body.
+
+        Parameters
+        ----------
+        save_foldername : str
+            Name of the folder in which to save the best body.
+
+        Returns
+        -------
+        max_time_survived : int
+            Maximum time survived.
+        """
+        if self.best_body:
+            with gzip_open(f"{save_foldername}/best_body.gz", "wb") as file:
+                if self.attractive_result:
+                    # Save attractive moving bodies
+                    for body in self.attractive_result.get("attractive_moving", []):
+                        SimulationMother.dump_body(body, "attractive_moving", file)
+                    if self.attractive_result.get("fake"):
+                        fake = self.attractive_result["fake"]
+                        SimulationMother.dump_body(fake, fake.type, file)
+                SimulationMother.dump_body(self.best_body, self.best_body_type, file)
+        return self.max_time_survived
+
+
+class ResultsWriter:
+    """
+    Writes the results of the simulations of a dispatch to a folder one at a time, as soon as they are computed.
+    """
+
+    def __init__(
+            self,
+            save_foldername: str,
+            storage: str="pickle",
+            checkpoint: dict=None,
+            decimation_tolerance: float=None,
+            encoding_resolution: float=None
+        ):
+        """
+        Initialize a ResultsWriter object.
+
+        Parameters
+        ----------
+        save_foldername : str
+            Name of the folder in which to save the results.
+        storage : str
+            Format in which the bodies are saved: "pickle" or "columnar". Defaults to "pickle".
+        checkpoint : dict
+            State returned by the checkpoint method of a previous writer, in which case the writer resumes writing
+            after the last checkpoint. Defaults to None.
+        decimation_tolerance : float
+            If given, the trajectories are decimated within this distance before being written. Only supported by the
+            pickle storage. Defaults to None.
+        encoding_resolution : float
+            If given, the trajectories are written with the codec of src.tools.trajectory_codec and this resolution.
+            Only supported by the pickle storage. Defaults to None.
+        """
+        assert storage in ["pickle", "columnar"], \
+            f"{C.RED+C.BOLD}The currently implemented storages are: \"pickle\", \"columnar\".{C.END}"
+        assert not (decimation_tolerance or encoding_resolution) or storage == "pickle", \
+            f"{C.RED+C.BOLD}Trajectories can only be decimated or encoded with the pickle storage.{C.END}"
+        self.save_foldername = save_foldername
+        self.storage = storage
+        self.fake_body_saved = bool(checkpoint["fake_body_saved"]) if checkpoint else False
+        if checkpoint:
+            # Results written after the last checkpoint are discarded as they are not marked as completed
+            if storage == "pickle":
+                self.file = PickleWriter(save_foldername, bodies_count=int(checkpoint["bodies_count"]),
+                                         file_size=int(checkpoint["file_size"]),
+                                         decimation_tolerance=decimation_tolerance,
+                                         encoding_resolution=encoding_resolution)
+            else:
+                self.file = ColumnarWriter(save_foldername, bodies_count=int(checkpoint["bodies_count"]))
+            with gzip_open(f"{save_foldername}/checkpoint_best_body.gz", "rb") as file:
+                self.best_body_tracker = load(file)
+        else:
+            if storage == "pickle":
+                self.file = PickleWriter(save_foldername, decimation_tolerance=decimation_tolerance,
+                                         encoding_resolution=encoding_resolution)
+            else:
+                self.file = ColumnarWriter(save_foldername)
+            self.best_body_tracker = BestBodyTracker()
+
+    def __enter__(self) -> ResultsWriter:
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def write_body(self, body: GravitationalBody | ComputedBody | FakeBody, type: str):
+        """
+        Write a body of a certain type.
+
+        Parameters
+        ----------
+        body : GravitationalBody | ComputedBody | FakeBody
+            Body to write.
+        type : str
+            Type of the body.
+        """
+        self.file.write(body, type)
+
+    def write(self, result: dict):
+        """
+        Write every body of a single simulation's result and flush them to the disk.
+
+        Parameters
+        ----------
+        result : dict
+            Result of a single simulation.
+        """
+        self.best_body_tracker.update(result)
+        for key, value in result.items():
+            if key == "fake":
+                if value is not None and not self.fake_body_saved:
+                    self.write_body(value, value.type)
+                    self.fake_body_saved = True
+            else:
+                for body in value:
+                    self.write_body(body, key)
+        self.file.flush()
+
+    def checkpoint(self) -> dict:
+        """
+        Make the written results consistent on the disk and save the best body tracker.
+
+        Returns
+        -------
+        state : dict
+            State needed to resume writing after this checkpoint.
+        """
+        self.file.write_index()
+        file_size = self.file.size
+        bodies_count = len(self.file.columns["types"])
+        with gzip_open(f"{self.save_foldername}/checkpoint_best_body.gz", "wb") as file:
+            dump(self.best_body_tracker, file)
+        return {"file_size": file_size, "bodies_count": bodies_count, "fake_body_saved": self.fake_body_saved}
+
+    def close(self):
+        """
+        Close the results file.
+        """
+        self.file.close()
+
+
+class SharedArray:
+    """
+    A numpy array placed in shared memory so that pool workers can read it without it being copied for every task.
+    When pickled, only the name of the shared memory block is sent and the array is attached on unpickling.
+    """
+
+    def __init__(self, array: np.ndarray):
+        """
+        Initialize a SharedArray object by copying an array into a new shared memory block.
+
+        Parameters
+        ----------
+        array : np.ndarray
+            Array to share.
+        """
+        self.shape, self.dtype = array.shape, array.dtype
+        self.memory = SharedMemory(create=True, size=max(array.nbytes, 1))
+        self.array[...] = array
+        # The block is also freed when the array is garbage collected or at exit, e.g. if a dispatch is interrupted
+        self._finalizer = finalize(self, self._free, self.memory)
+
+    def __getstate__(self) -> dict:
+        return {"name": self.memory.name, "shape": self.shape, "dtype": self.dtype}
+
+    def __setstate__(self, state: dict):
+        self.shape, self.dtype = state["shape"], state["dtype"]
+        self.memory = SharedMemory(name=state["name"])
+
+    @property
+    def array(self) -> np.ndarray:
+        """
+        Gives the shared array, without copying it.
+        """
+        return np.ndarray(self.shape, dtype=self.dtype, buffer=self.memory.buf)
+
+    @staticmethod
+    def _free(memory: SharedMemory):
+        memory.close()
+        memory.unlink()
+
+    def release(self):
+        """
+        Free the shared memory block. Only the process that created the array can free it.
+        """
+        self._finalizer()
+
+
+# Data of the current sweep, published once in every pool worker by initialize_worker
+worker_state = {}
+
+
+def initialize_worker(
+        system: bytes,
+        body_positions: SharedArray,
+        body_velocities: SharedArray,
+        parameters: dict
+    ):
+    """
+    Pool initializer publishing the data shared by every simulation of a sweep to a worker.
+
+    Parameters
+    ----------
+    system : bytes
+        Pickled base system of the sweep. It is loaded once per worker, so the data computed by the system for the
+        simulations, such as the grids of the acceleration table of a VectorizedSystem, are shared by all the
+        simulations of the worker.
+    body_positions : SharedArray
+        Initial position of the bodies of each simulation.
+    body_velocities : SharedArray
+        Initial velocities of the bodies added to every simulation.
+    parameters : dict
+        Remaining arguments of the worker_simulation function.
+    """
+    worker_state.update(
+        system=loads(system), body_positions=body_positions, body_velocities=body_velocities, parameters=parameters
+    )
+
+
+def worker_trial(index: int) -> dict:
+    """
+    Worker function to execute the simulation of a sweep from its index, -1 being the attractive bodies simulation.
+    Every simulation gets its own copy of the base system's bodies.
+    """
+    system = worker_state["system"]
+    parameters = worker_state["parameters"]
+    if index == -1:
+        system = loads(dumps(system))
+        system.set_integrator(parameters["integrator"])
+        return worker_simulation(
+            None, None, system, parameters["delta_time"], parameters["simulation_duration"],
+            parameters["positions_saving_frequency"], None, None, parameters["integrator"], parameters["tolerance"]
+        )
+    return worker_simulation(
+        worker_state["body_positions"].array[index].copy(), worker_state["body_velocities"].array.tolist(), system,
+        **parameters
+    )
 
 
 def worker_simulation(
@@ -320,10 +904,13 @@ def worker_simulation(
         positions_saving_frequency: int,
         potential_gradient_limit: int,
         body_alive_func: tuple[int,int],
-        integrator: str
+        integrator: str,
+        tolerance: float=None,
+        ephemeris: Ephemeris=None
     ):
     """
-    Worker function to execute a single simulation.
+    Worker function to execute a single simulation. The given system is only modified by the special simulation of
+    the attractive bodies, the normal simulations using a copy of its bodies.
     """
     if not isinstance(body_position, np.ndarray) and not isinstance(body_velocities, np.ndarray):
         # Special simulation, occuring only once
@@ -331,27 +918,28 @@ def worker_simulation(
             system=system,
             maximum_delta_time=delta_time
         )
-        result = simulation.run_attractive_bodies(simulation_duration, positions_saving_frequency)
+        result = simulation.run_attractive_bodies(simulation_duration, positions_saving_frequency, tolerance)
 
     else:
         # Normal simulation
-        simulated_system = BaseSystem(
-            list_of_bodies=(
-                system.list_of_bodies + [GravitationalBody(
-                    mass=1,
-                    position=Vector(*body_position),
-                    velocity=Vector(v_x,v_y,v_z),
-                    has_potential=False,
-                    integrator=integrator
-                ) for v_x, v_y, v_z in body_velocities]
-            ),
-            n=system.n
+        # The system's class and options are kept so that alternative backends (e.g. VectorizedSystem) and their
+        # solvers are used by the workers
+        simulated_system = system.copy_with_bodies(
+            loads(dumps(system.list_of_bodies)) + [GravitationalBody(
+                mass=1,
+                position=Vector(*body_position),
+                velocity=Vector(v_x,v_y,v_z),
+                has_potential=False,
+                integrator=integrator
+            ) for v_x, v_y, v_z in body_velocities],
+            integrator=integrator
         )
+        simulated_system.set_ephemeris(ephemeris)
         simulation = Simulation(
             system=simulated_system,
             maximum_delta_time=delta_time
         )
         result = simulation.run(simulation_duration, positions_saving_frequency,
-                                potential_gradient_limit, body_alive_func)
+                                potential_gradient_limit, body_alive_func, tolerance)
 
     return result
@@ -1,4 +1,6 @@
-from typing import Dict, List, Union, Optional
+from __future__ import annotations
+
+from typing import Dict, List, Tuple, Union, Optional
 
 import numpy as np
 from numpy import abs, gradient, ones_like, rot90, zeros_like, argmax
@@ -9,8 +11,11 @@ from src.bodies.gravitational_body import GravitationalBody
 from src.bodies.fake_body import FakeBody
 from src.tools.vector import FakeVector, Vector
 from src.fields.scalar_field import ScalarField
+from src.fields.potential_tile_cache import shared_cache
 from src.fields.vector_field import VectorField
 from src.simulator.lambda_func import Lambda
+from src.tools.adaptive_integrator import hermite_interpolate
+from src.simulator.ephemeris import Ephemeris
 
 from pickle import dumps, loads
 
@@ -52,14 +57,15 @@ class BaseSystem:
             "runge-kutta".
         """
 
-        assert integrator in ["euler", "leapfrog", "synchronous", "kick-drift-kick", "yoshida", "runge-kutta"], \
-            ('The currently implemented integrators are:'
-             ' "euler", "leapfrog", "synchronous", "kick-drift-kick", "yoshida", "runge-kutta"')
-        self.integrator = integrator
         assert method in ["potential", "force"], 'The currently implemented methods are: "potential", "force"'
         self.method = method
 
         self.n = n
+        # Arguments of the constructor, used to create copies of the system with other bodies
+        self.options = dict(
+            base_potential=base_potential, base_force_field=base_force_field, n=n, method=method, integrator=integrator
+        )
+        self.set_integrator(integrator)
         if base_potential is None:
             base_potential = ScalarField([(0, 0, Vector(0, 0, 0))])
         if base_force_field is None:
@@ -73,8 +79,6 @@ class BaseSystem:
         self.dead_bodies = []
         self.list_of_bodies = list_of_bodies
 
-        if integrator == "leapfrog":
-            self.set_up_step = True
         self.fake_bodies = []
         for body in list_of_bodies:
             if isinstance(body, FakeBody):
@@ -87,7 +91,18 @@ class BaseSystem:
             if body.has_potential:
                 self.attractive_bodies.append(body)
 
-        self.current_potential = None
+        # Whether each moving body is checked by remove_dead_bodies, compacted along with the moving bodies
+        self._checked_mask = np.array([not body.has_potential for body in self.moving_bodies], dtype=bool)
+        # Index of each moving body's term within the aggregate fields, counted from the first attractive body's term,
+        # or -1 for the bodies without potential. It is also compacted along with the moving bodies
+        attractive_indices = {id(body): i for i, body in enumerate(self.attractive_bodies)}
+        self._term_indices = np.array([attractive_indices.get(id(body), -1) for body in self.moving_bodies], dtype=int)
+        self._fields = {method: self._build_field(method) for method in ["force", "potential"]}
+        # Time and steps elapsed since the creation of the system and the optional ephemeris of the moving attractive
+        # bodies
+        self.time = 0
+        self.steps = 0
+        self.ephemeris = None
         # Find origin for plotting the potential
         masses = loads(dumps([body.mass for body in self.list_of_bodies]))
         self.origin = tuple(self.list_of_bodies[argmax(masses)].position)
@@ -108,7 +123,52 @@ class BaseSystem:
 
         self.tracked_bodies = self.attractive_bodies + self.tracked_bodies
 
-    def update(self, time_step: float, epsilon: float = 10**(-2), method: str = "potential"):
+    def set_integrator(self, integrator: str):
+        """
+        Sets the integrator used when updating the position of the bodies. It should only be changed before the first
+        update.
+
+        Parameters
+        ----------
+        integrator : str
+            The type of integrator. Currently implemented integrators are: "euler", "leapfrog", "synchronous",
+            "kick-drift-kick", "yoshida", "runge-kutta".
+        """
+
+        assert integrator in ["euler", "leapfrog", "synchronous", "kick-drift-kick", "yoshida", "runge-kutta"], \
+            ('The currently implemented integrators are:'
+             ' "euler", "leapfrog", "synchronous", "kick-drift-kick", "yoshida", "runge-kutta"')
+        self.integrator = integrator
+        self.options["integrator"] = integrator
+        if integrator == "leapfrog":
+            self.set_up_step = True
+
+    def copy_with_bodies(self, list_of_bodies: List[Body], **options) -> BaseSystem:
+        """
+        Creates a system of the same class and with the same constructor arguments as this one, but with other bodies.
+
+        Parameters
+        ----------
+        list_of_bodies : List[Body]
+            A list of the bodies used to create the system.
+        options : dict
+            Constructor arguments replacing those of this system, e.g. the integrator.
+
+        Returns
+        -------
+        system : BaseSystem
+            The new system.
+        """
+
+        return self.__class__(list_of_bodies, **{**self.options, **options})
+
+    def update(
+            self,
+            time_step: float,
+            epsilon: float = 10**(-2),
+            method: str = "potential",
+            tolerance: Optional[float] = None
+    ):
         """
         Updates the position and velocity of the bodies within the system according to a potential and time step.
 
@@ -123,48 +183,180 @@ class BaseSystem:
         method : str
             The computation method, thus the form in which the interaction is required. The currently implemented
             methods are: "potential", "force". Defaults to "force".
+        tolerance : Optional[float]
+            If given, the bodies are advanced with adaptive substeps keeping their local position error below this
+            tolerance, in the system's space unit, instead of a single step of their integrator. Defaults to None.
         """
         
         method = self.method
-        if method == "force":
-            force_field = loads(dumps(self._base_force_field))
-            for body in self.attractive_bodies:
-                force_field += body.gravitational_field
-            if len(force_field.terms) > 2:
-                force_field -= VectorField([(0, 0, Vector(0, 0, 0))])
-            force_field = loads(dumps(force_field))
-            for body in self.moving_bodies:
-                if body is not None:
-                    if body.has_potential:
-                        acting_force = loads(dumps(force_field)) - body.gravitational_field  # equivalent to deepcopy()
-                    else:
-                        acting_force = loads(dumps(force_field))
-                    body(time_step, acting_force * (10 ** (-self.n)) ** 3, epsilon * 10 ** (-self.n), method=method)
-
-        elif method == "potential":
-            potential_field = loads(dumps(self._base_potential))
-            for body in self.attractive_bodies:
-                potential_field += body.potential
-            if len(potential_field.terms) > 2:
-                potential_field -= ScalarField([(0, 0, Vector(0, 0, 0))])
-            for body in self.moving_bodies:
+        field = self._refresh_field(method)
+        start = self._fields[method][1]
+        if tolerance:
+            self._adaptive_update(time_step, field, start, tolerance, method)
+        else:
+            for body, term_index in zip(self.moving_bodies, self._term_indices):
                 if body is not None:
                     if body.has_potential:
-                        acting_potential = loads(dumps(potential_field)) - body.potential    # equivalent to deepcopy()
+                        if self.ephemeris is not None:
+                            continue
+                        acting_field = field.without_term(start + term_index)
                     else:
-                        acting_potential = loads(dumps(potential_field))
-                    body(time_step, acting_potential * (10 ** (-self.n)) ** 3, epsilon * 10 ** (-self.n), method=method)
+                        acting_field = field
+                    body(time_step, acting_field, epsilon * 10 ** (-self.n), method=method)
+            if self.ephemeris is not None:
+                self._apply_ephemeris(self.time + time_step, time_step)
+        self.time += time_step
+        self.steps += 1
 
         if self.fake_bodies:
             for body in self.fake_bodies:
                 body(self.attractive_bodies)
 
-        potential_field = loads(dumps(self._base_potential))
+    def _adaptive_update(
+            self,
+            time_step: float,
+            field: ScalarField | VectorField,
+            start: int,
+            tolerance: float,
+            method: str
+    ):
+        """
+        Advances the moving bodies with adaptive substeps. The moving attractive bodies are advanced first, with the
+        sources frozen at their position at the beginning of the step. Their motion during the step is then
+        interpolated so the other bodies feel the sources move during their substeps.
+
+        Parameters
+        ----------
+        time_step : float
+            The time step by which the bodies are advanced.
+        field : ScalarField | VectorField
+            The up-to-date aggregate field.
+        start : int
+            The index of the first attractive body's term within the aggregate field.
+        tolerance : float
+            The maximum local error on the bodies' positions, in the system's space unit.
+        method : str
+            The form in which the interaction is required: "potential" or "force".
+        """
+
+        moving_sources = [(start + i, body) for i, body in enumerate(self.attractive_bodies) if not body.fixed]
+        rows = [row for row, body in moving_sources]
+        start_positions = np.array([tuple(body.position) for row, body in moving_sources]).reshape(-1, 3)
+        start_velocities = np.array([tuple(body.velocity) for row, body in moving_sources]).reshape(-1, 3)
+        if self.ephemeris is not None:
+            self._apply_ephemeris(self.time + time_step, time_step)
+        else:
+            for row, body in moving_sources:
+                body.adaptive_update(time_step, field.without_term(row), tolerance, method=method)
+        end_positions = np.array([tuple(body.position) for row, body in moving_sources]).reshape(-1, 3)
+        end_velocities = np.array([tuple(body.velocity) for row, body in moving_sources]).reshape(-1, 3)
+
+        def field_at(time: float) -> ScalarField | VectorField:
+            origins = field.origins.copy()
+            origins[rows] = hermite_interpolate(
+                start_positions, start_velocities, end_positions, end_velocities, time_step, [time]
+            )[0]
+            return field.from_arrays(field.powers, field.coefficients, origins)
+
+        for body in self.moving_bodies:
+            if body is not None and not body.has_potential:
+                body.adaptive_update(time_step, field_at if moving_sources else field, tolerance, method=method)
+
+    def set_ephemeris(self, ephemeris: Optional[Ephemeris]):
+        """
+        Sets the ephemeris from which the state of the moving attractive bodies is read instead of being integrated.
+        The ephemeris must start at the system's current time and the other moving bodies must have no potential.
+
+        Parameters
+        ----------
+        ephemeris : Optional[Ephemeris]
+            The ephemeris of the system's moving attractive bodies, None to integrate them again.
+        """
+
+        if ephemeris is not None:
+            assert ephemeris.positions.shape[1] == len(ephemeris.get_bodies(self)), \
+                "The ephemeris does not match the system's moving attractive bodies."
+        self.ephemeris = ephemeris
+
+    def _apply_ephemeris(self, time: float, time_step: float):
+        """
+        Sets the state of the moving attractive bodies to the one given by the ephemeris at a certain time.
+
+        Parameters
+        ----------
+        time : float
+            The time at which the state is read.
+        time_step : float
+            The time elapsed since the last update of the bodies, added to their time survived.
+        """
+
+        positions, velocities = self.ephemeris.get_state(time)
+        for body, position, velocity in zip(self.ephemeris.get_bodies(self), positions, velocities):
+            body._position = Vector(*position)
+            body._velocity = Vector(*velocity)
+            body.time_survived += time_step
+
+    def _build_field(self, method: str) -> Tuple[ScalarField | VectorField, int]:
+        """
+        Builds the aggregate field of the system, scaled to the system's units, from the base field and a single term
+        per attractive body. The aggregate is built once and only the origins of the terms are then updated.
+
+        Parameters
+        ----------
+        method : str
+            The form in which the interaction is required: "potential" or "force".
+
+        Returns
+        -------
+        field, start : Tuple[ScalarField | VectorField, int]
+            The aggregate field and the index of the first attractive body's term within it.
+        """
+
+        base_field = self._base_force_field if method == "force" else self._base_potential
+        field = base_field
+        if len(field) + len(self.attractive_bodies) > 2:
+            field -= base_field.__class__([(0, 0, Vector(0, 0, 0))])
+        start = len(field)
         for body in self.attractive_bodies:
-            potential_field += body.potential
-        if len(potential_field.terms) > 2:
-            potential_field -= ScalarField([(0, 0, Vector(0, 0, 0))])
-        self.current_potential = loads(dumps(potential_field))*(10**(-self.n))**3
+            field += body.get_field(method)
+        return field * (10 ** (-self.n)) ** 3, start
+
+    def _refresh_field(self, method: str) -> ScalarField | VectorField:
+        """
+        Updates in place the origins of the moving attractive bodies' terms within an aggregate field.
+
+        Parameters
+        ----------
+        method : str
+            The form in which the interaction is required: "potential" or "force".
+
+        Returns
+        -------
+        field : ScalarField | VectorField
+            The up-to-date aggregate field.
+        """
+
+        field, start = self._fields[method]
+        for i, body in enumerate(self.attractive_bodies):
+            if not body.fixed:
+                field.origins[start + i] = tuple(body.position)
+        return field
+
+    @property
+    def current_potential(self) -> ScalarField:
+        """
+        Gives a copy of the potential of the system at the current time, scaled to the system's units. It is only
+        computed when accessed, so steps that do not need it do not pay for it. The copy is not changed by the next
+        updates of the system.
+
+        Returns
+        -------
+        current_potential : ScalarField
+            The system's current potential.
+        """
+
+        field = self._refresh_field("potential")
+        return field.from_arrays(field.powers.copy(), field.coefficients.copy(), field.origins.copy())
 
     def update_with_matrices(self, time_step: float, epsilon: float = 10 ** (-2)):
         """
@@ -184,22 +376,22 @@ class BaseSystem:
         scale = (10**(-self.n))**3
         method = self.method
         if method == "force":
-            field = loads(dumps(self._base_force_field))
+            field = self._base_force_field
         elif method == "potential":
-            field = loads(dumps(self._base_potential))
+            field = self._base_potential
 
         for body in self.attractive_bodies:
             field += body.get_field(method)
         if (0, 0, Vector(0, 0, 0)) in field.terms:
             field -= ScalarField([(0, 0, Vector(0, 0, 0))])
-        field = loads(dumps(field * (10 ** (-self.n)) ** 3))
+        field = field * (10 ** (-self.n)) ** 3
         # self.time_survived += time_step
         positions = np.array([body.position for body in self.moving_bodies if body is not None])
         velocities = np.array([body.velocity for body in self.moving_bodies if body is not None])
         if self.integrator != "yoshida":
             accelerations = np.array(
                 [
-                    loads(dumps(field)).__sub__(body.get_field(method)*scale).get_acceleration(body.position, epsilon)
+                    field.__sub__(body.get_field(method)*scale).get_acceleration(body.position, epsilon)
                     for body in self.moving_bodies if body is not None
                 ]
             )
@@ -226,7 +418,7 @@ class BaseSystem:
 
             new_accelerations = np.array(
                 [
-                    loads(dumps(field)).__sub__(body.get_field(method)*scale).get_acceleration(
+                    field.__sub__(body.get_field(method)*scale).get_acceleration(
                         Vector(*updated_positions[i, :]),
                         epsilon
                     )
@@ -245,7 +437,7 @@ class BaseSystem:
                 body._position = Vector(*updated_positions[i, :])
             new_accelerations = np.array(
                 [
-                    loads(dumps(field)).__sub__(body.get_field(method)*scale).get_acceleration(body.position, epsilon)
+                    field.__sub__(body.get_field(method)*scale).get_acceleration(body.position, epsilon)
                     for body in self.moving_bodies if body is not None
                 ]
             )
@@ -256,7 +448,9 @@ class BaseSystem:
     def remove_dead_bodies(self, potential_gradient_limit: float, body_alive_func: Lambda):
         """
         Removes the bodies that are considered to be destroyed or too distant. Checks only for the moving bodies
-        without potentials.
+        without potentials. The dead bodies are first flagged in a mask and then removed from the moving bodies all at
+        once, so they are no longer integrated. Their death_step attribute gives the system's number of steps at their
+        removal.
 
         Parameters
         ----------
@@ -266,17 +460,68 @@ class BaseSystem:
             Lambda object specifying the conditions a body must respect to stay alive.
         """
 
-        epsilon = 10**(-2)*10**(-self.n)
-        for body in self.moving_bodies:
-            if not body.has_potential and body.is_dead(
-                    self.current_potential,
-                    epsilon,
-                    potential_gradient_limit,
-                    body_alive_func,
-                    self.tracked_body
-            ):
-                self.dead_bodies.append(body)
-                self.moving_bodies.remove(body)
+        checked_bodies = [body for body, checked in zip(self.moving_bodies, self._checked_mask) if checked]
+        if not checked_bodies:
+            return
+
+        # The potential gradient and the conditions of body_alive_func are evaluated for every body at once, the
+        # conditions being evaluated for each body only if body_alive_func cannot operate on arrays
+        positions = np.array([tuple(body.position) for body in checked_bodies])
+        gradients = self._refresh_field("potential").get_gradients(positions)
+        # The bodies abandoned by the adaptive integrator have a non-finite position
+        alive_mask = np.isfinite(positions).all(axis=1)
+        alive_mask &= ~(np.linalg.norm(gradients, axis=1) > potential_gradient_limit)
+        if body_alive_func:
+            alive_mask &= body_alive_func.alive_mask(
+                positions, tuple(self.tracked_body.position) if self.tracked_body else None
+            )
+
+        if not alive_mask.all():
+            dead_bodies = [body for body, alive in zip(checked_bodies, alive_mask) if not alive]
+            for body in dead_bodies:
+                body.death_step = self.steps
+            self.dead_bodies += dead_bodies
+            dead_ids = set(map(id, dead_bodies))
+            self._compact_moving_bodies(np.array([id(body) not in dead_ids for body in self.moving_bodies]))
+
+    def _compact_moving_bodies(self, kept: np.ndarray):
+        """
+        Removes at once moving bodies, which are no longer integrated.
+
+        Parameters
+        ----------
+        kept : np.ndarray
+            The boolean array giving whether each moving body is kept.
+        """
+
+        self.moving_bodies = [body for body, keep in zip(self.moving_bodies, kept) if keep]
+        self._checked_mask = self._checked_mask[np.asarray(kept, dtype=bool)]
+        self._term_indices = self._term_indices[np.asarray(kept, dtype=bool)]
+
+    @property
+    def alive_bodies_count(self) -> int:
+        """
+        Gives the number of moving bodies without potential that are still alive.
+        """
+
+        return int(np.count_nonzero(self._checked_mask))
+
+    def reserve_positions(self, count: int, reserve_fake=False):
+        """
+        Allocates the memory for saving a number of additional positions of every moving body, so their trajectories
+        are not reallocated while the positions are saved.
+
+        Parameters
+        ----------
+        count : int
+            The number of positions that will be saved.
+        reserve_fake : bool
+            Whether to also allocate the memory for the fake bodies. Defaults to False.
+        """
+
+        bodies = self.moving_bodies + (self.fake_bodies if reserve_fake else [])
+        for body in bodies:
+            body.trajectory.reserve(len(body.trajectory) + count)
 
     def save_positions(self, save_fake=False):
         """
@@ -295,7 +540,9 @@ class BaseSystem:
             show_potential: bool = False,
             show_bodies: bool = False,
             show_potential_null_slope_points: float = False,
-            axes: Optional[Dict[str, int]] = None
+            axes: Optional[Dict[str, int]] = None,
+            potential_solver: str = "direct",
+            use_tile_cache: bool = False
     ):
         """
         Shows the system as a collection of dots in 2D space. The size of the dots is linearly proportional to their
@@ -317,6 +564,13 @@ class BaseSystem:
         axes : Optional[Dict[str, int]]
             A dictionary of the two axes to plot as keys and the size in pixels of the region to plot as their
             respective values, defaults to x and y with 110% of the distance between the origin and the furthest point.
+        potential_solver : str
+            The solver used to compute the potential field, "direct" or "particle-mesh". See
+            ScalarField.get_potential_field. Defaults to "direct".
+        use_tile_cache : bool
+            Whether to interpolate the potential field from the tiles of the shared PotentialTileCache, which are
+            computed once for every region and zoom level and reused by the next calls as long as the potential does
+            not change. Defaults to False.
         """
 
         if axes is None:
@@ -349,7 +603,7 @@ class BaseSystem:
             axes_size = [max_first_axis * 1.1, max_second_axis * 1.1]
 
         if show_potential or show_potential_null_slope_points:
-            potential_field = loads(dumps(self._base_potential))
+            potential_field = self._base_potential
             for body in self.attractive_bodies:
                 potential_field += body.potential
 
@@ -357,12 +611,29 @@ class BaseSystem:
             setattr(stop, axes_names[0], axes_size[0])
             setattr(stop, axes_names[1], axes_size[1])
 
-            potential_array = potential_field.get_potential_field(
-                Vector(0, 0, 0),
-                stop.vectorise(),
-                {k: v for k in axes_names for v in axes_size},
-                (0, 0, 0)
-            )
+            nb_ticks_per_axis = {k: v for k in axes_names for v in axes_size}
+            if use_tile_cache:
+                # The image is given the shape of the array of the direct computation, with axes in x, y, z order
+                plane_axes = sorted(nb_ticks_per_axis, key="xyz".index)
+                missing_axis = ({"x", "y", "z"} - set(plane_axes)).pop()
+                image = shared_cache.get_image(
+                    potential_field,
+                    (0, 0),
+                    tuple(getattr(stop, axis) for axis in plane_axes),
+                    tuple(nb_ticks_per_axis[axis] for axis in plane_axes),
+                    tuple(plane_axes),
+                    0,
+                    potential_solver
+                )
+                potential_array = np.expand_dims(image, "xyz".index(missing_axis))
+            else:
+                potential_array = potential_field.get_potential_field(
+                    Vector(0, 0, 0),
+                    stop.vectorise(),
+                    nb_ticks_per_axis,
+                    (0, 0, 0),
+                    potential_solver
+                )
 
             if show_potential:
                 imshow(rot90(potential_array), cmap="binary", extent=(0, axes_size[0], 0, axes_size[1]))
@@ -416,16 +687,11 @@ class BaseSystem:
         Returns
         -------
         potential_function : ScalarField
-            Function of three variables giving the potential value at the specified position.
+            Function of three variables giving the potential value at the specified position. It is a copy that is not
+            changed by the next updates of the system.
         """
 
-        potential_field = loads(dumps(self._base_potential))
-        for body in self.attractive_bodies:
-            potential_field += body.potential
-        if len(potential_field.terms) > 2:
-            potential_field -= ScalarField([(0, 0, Vector(0, 0, 0))])
-
-        return loads(dumps(potential_field))*(10**(-self.n))**3
+        return self.current_potential
 
     def get_best_body(self) -> GravitationalBody:
         """
@@ -2,11 +2,12 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from src.systems.base_system import BaseSystem
+from src.simulator.body_index import BodyIndex
 from src.bodies.fake_body import *
 
 
 class ComputedSystem(BaseSystem):
-    def __init__(self, *args, tick_factor: int=1, info: dict=None, **kwargs):
+    def __init__(self, *args, tick_factor: int=1, info: dict=None, bodies_index: BodyIndex=None, **kwargs):
         """
         Initialize a ComputedSystem object.
 
@@ -15,20 +16,34 @@ class ComputedSystem(BaseSystem):
         args : list
             List of arguments to pass to the BaseSystem constructor.
         tick_factor : int
-            Sets the factor by which the tick rate of the system is multiplied. Defaults to 1. This is used for viewing
-            simulations in real-time which were done without saving every position.
+            Sets the factor by which the tick rate of the system is multiplied, which is the time between two saved
+            positions. Defaults to 1. This is used for viewing simulations in real-time which were done without saving
+            every position. It may be fractional, in which case the positions between the saved samples are
+            interpolated.
+        info : dict
+            Parameters of the simulation, as saved in its info.txt file. Defaults to None.
+        bodies_index : BodyIndex
+            Index of the saved bodies of the system, used to get the bodies' info without iterating over the bodies.
+            Defaults to None.
         kwargs : dict
             Dictionary of arguments to pass to the BaseSystem constructor.
         """
 
         super().__init__(*args, **kwargs)
         self.tick_factor = tick_factor
-        self.current_tick = 0
+        # Time of the playback and factor by which the time steps are multiplied, negative to play backwards
+        self.playback_time = 0
+        self.playback_speed = 1
+        # Played bodies and their state, built from the trajectories at the first seek
+        self.playback_bodies = None
+        self.playback_positions = None
+        self.dead_mask = None
         for body in self.list_of_bodies:
             if body.type.endswith("Body") or body.type.endswith("fake"):
                 self.tracked_bodies.append(body)
                 self.fake_bodies.append(body)
         self.info = info
+        self.bodies_index = bodies_index
 
     def update(self, time_step: float):
         """
@@ -37,16 +52,84 @@ class ComputedSystem(BaseSystem):
         Parameters
         ----------
         time_step : float
-            The time step during which the acceleration and velocity are considered constant, a smaller values gives
-            more accurate results.
+            The time by which the playback is advanced, multiplied by the playback speed.
         """
 
-        self.current_tick += time_step
-        if self.current_tick > self.tick_factor:
-            self.current_tick -= self.tick_factor
-            for body in self.moving_bodies:
-                if not body.dead:
-                    body.update()
+        self.seek(self.playback_time + self.playback_speed * time_step)
+
+    def build_playback(self):
+        """
+        Gathers the trajectories of every moving body in a single (S,3) array, in which the trajectory of the body of
+        row i starts at playback_offsets[i] and has playback_lengths[i] samples. The bodies' trajectories are replaced
+        by views of this array and the bodies then read their state from the playback arrays, so a playback step is a
+        few array operations whatever the number of bodies.
+        """
+
+        self.playback_bodies = list(self.moving_bodies)
+        self.playback_lengths = np.array([len(body.positions) for body in self.playback_bodies], dtype=int)
+        self.playback_offsets = np.concatenate(([0], np.cumsum(self.playback_lengths)[:-1])).astype(int)
+        # A last row is added so the offsets of empty trajectories stay within the array
+        self.playback_trajectories = np.zeros((self.playback_lengths.sum() + 1, 3))
+        for row, (body, offset, length) in enumerate(zip(self.playback_bodies, self.playback_offsets,
+                                                         self.playback_lengths)):
+            self.playback_trajectories[offset:offset+length] = body.positions
+            body.positions = self.playback_trajectories[offset:offset+length]
+            body.set_playback(self, row)
+        self.playback_positions = self.playback_trajectories[self.playback_offsets]
+        self.dead_mask = self.playback_lengths == 0
+
+    @property
+    def duration(self) -> float:
+        """
+        Gives the time of the last saved position of the longest trajectory.
+        """
+
+        if self.playback_bodies is None:
+            length = max([len(body.positions) for body in self.moving_bodies], default=0)
+        else:
+            length = self.playback_lengths.max(initial=0)
+        return max(length - 1, 0) * self.tick_factor
+
+    def seek(self, time: float):
+        """
+        Places every moving body at its position at a given time of the playback, interpolating linearly between the
+        saved positions. The (N,3) playback_positions array and the (N,) dead_mask array give the state of the bodies
+        of playback_bodies, the bodies being dead past the end of their trajectory. The trajectories are only read,
+        so the playback can go back and forth.
+
+        Parameters
+        ----------
+        time : float
+            Time of the playback, which is kept between 0 and one sample past the duration, where every body is dead.
+        """
+
+        if self.playback_bodies is None:
+            self.build_playback()
+        self.playback_time = min(max(time, 0), self.duration + self.tick_factor)
+        sample = self.playback_time / self.tick_factor
+        i = int(sample)
+        fraction = sample - i
+        last_samples = np.maximum(self.playback_lengths - 1, 0)
+        rows = self.playback_offsets + np.minimum(i, last_samples)
+        self.playback_positions = self.playback_trajectories[rows]
+        if fraction:
+            next_rows = self.playback_offsets + np.minimum(i + 1, last_samples)
+            self.playback_positions += fraction * (self.playback_trajectories[next_rows] - self.playback_positions)
+        self.dead_mask = sample > self.playback_lengths - 1
+
+    def rewind(self):
+        """
+        Places the bodies back at their initial positions.
+        """
+
+        self.seek(0)
+
+    def reverse(self):
+        """
+        Reverses the direction of the playback.
+        """
+
+        self.playback_speed = -self.playback_speed
 
     def to_base_system(self) -> BaseSystem:
         """
@@ -75,6 +158,10 @@ class ComputedSystem(BaseSystem):
         )
     
     def get_bodies_info(self) -> np.ndarray:
+        if self.bodies_index is not None:
+            # Only the simulated test bodies are kept, as when iterating over the bodies
+            bodies_info = self.bodies_index.get_bodies_info(self.bodies_index.select(types=["alive", "dead"]))
+            return bodies_info[bodies_info[:,4].argsort()]
         iterated_bodies = list(set(self.list_of_bodies) - set(self.attractive_bodies) - set(self.fake_bodies))
         # Columns are : position.x, position.y, position.z, velocity.x, velocity.y, velocity.z, time_survived
         bodies_info = np.array([body.get_info() for body in iterated_bodies])
@@ -0,0 +1,527 @@
+from __future__ import annotations
+
+from typing import List, Optional
+
+import numpy as np
+from scipy.constants.constants import gravitational_constant
+
+from src.bodies.base_body import Body
+from src.fields.scalar_field import ScalarField
+from src.fields.vector_field import VectorField
+from src.systems.base_system import BaseSystem
+from src.simulator.ephemeris import Ephemeris
+from src.simulator.lambda_func import Lambda
+from src.tools.acceleration_table import AccelerationTable
+from src.tools.adaptive_integrator import hermite_interpolate, integrate_adaptive
+from src.tools.octree import Octree
+from src.tools.vector import Vector
+
+
+class VectorizedSystem(BaseSystem):
+    """
+    A system backend storing the bodies' state in contiguous (N,3) arrays. All the pairwise accelerations of a step
+    are computed in a single batched operation instead of building fields for every body.
+    """
+
+    def __init__(
+            self,
+            list_of_bodies: List[Body],
+            base_potential: Optional[ScalarField] = None,
+            base_force_field: Optional[VectorField] = None,
+            n: int = 9,
+            method: str = "force",
+            integrator: str = "synchronous",
+            force_solver: str = "direct",
+            opening_angle: float = 0.5,
+            fixed_acceleration_tolerance: Optional[float] = None
+    ):
+        """
+        Defines the required parameters.
+
+        Parameters
+        ----------
+        list_of_bodies : List[Body]
+            A list of the bodies used to create the system.
+        base_potential : Optional[ScalarField]
+            A ScalarField object to define the source-less interactions. Defaults to a constant and null interaction.
+        base_force_field : Optional[VectorField]
+            A VectorField object to define the source-less interactions. Defaults to a constant and null interaction.
+        n : int
+            The log base 10 of the space unit relative to the meter (e.g. 3 means 1000m or km and 6 means 10**6m or
+            Mm). Defaults to 9 (Gm).
+        method : str
+            Kept for compatibility with the BaseSystem, both methods give the same closed-form accelerations. Defaults
+            to "force".
+        integrator : str
+            The type of integrator to use when updating the position of every moving body. Contrary to the BaseSystem,
+            the integrator is set for the whole system and the bodies' own integrator is ignored. Defaults to
+            "synchronous". Currently implemented integrators are: "euler", "leapfrog", "synchronous",
+            "kick-drift-kick", "yoshida", "runge-kutta".
+        force_solver : str
+            The way the accelerations caused by the attractive bodies are computed. "direct" sums every pair of bodies
+            exactly and "barnes-hut" groups the distant attractive bodies with an octree, which is faster for systems
+            with many attractive bodies at the cost of a small error controlled by the opening angle. The direct sum is
+            always used when integrating with adaptive substeps, as the sources then move during the step. Defaults to
+            "direct".
+        opening_angle : float
+            The ratio between a cell's size and its distance under which the attractive bodies of a cell are replaced
+            by their center of mass, when using the "barnes-hut" force solver. Defaults to 0.5.
+        fixed_acceleration_tolerance : Optional[float]
+            If given, the acceleration caused by the fixed attractive bodies, which is the same at every step, is
+            interpolated from an AccelerationTable precomputed on grids nested around them, within this tolerance
+            relative to the magnitude of their accelerations. The positions near the fixed bodies or far from them
+            are evaluated directly. Defaults to None, meaning the fixed bodies are summed directly like the others.
+        """
+
+        super().__init__(list_of_bodies, base_potential, base_force_field, n, method, integrator)
+        assert force_solver in ["direct", "barnes-hut"], \
+            'The currently implemented force solvers are: "direct", "barnes-hut"'
+        self.force_solver = force_solver
+        self.opening_angle = opening_angle
+        self.options.update(
+            force_solver=force_solver, opening_angle=opening_angle,
+            fixed_acceleration_tolerance=fixed_acceleration_tolerance
+        )
+
+        # Every row of the state arrays corresponds to the body at the same index in self._bodies
+        self._bodies = self.fixed_bodies + self.moving_bodies
+        self.positions = np.array([tuple(body.position) for body in self._bodies], dtype=float).reshape(-1, 3)
+        self.velocities = np.array([tuple(body.velocity) for body in self._bodies], dtype=float).reshape(-1, 3)
+        self.masses = np.array([body.mass for body in self._bodies], dtype=float)
+        self.time_survived = np.array([body.time_survived for body in self._bodies], dtype=float)
+        self.fixed_mask = np.array([body.fixed for body in self._bodies], dtype=bool)
+        self.attractive_mask = np.array([body.has_potential for body in self._bodies], dtype=bool)
+        # Last substep of each body when integrating with adaptive substeps, NaN before the first step
+        self.adaptive_steps = np.full(len(self._bodies), np.nan)
+        self.acceleration_table = None
+        fixed_sources = np.flatnonzero(self.fixed_mask & self.attractive_mask)
+        if fixed_acceleration_tolerance and len(fixed_sources):
+            # The coarsest grids cover twice the distance from the fixed bodies to the farthest body
+            extent = 2 * np.abs(self.positions[:, None, :] - self.positions[None, fixed_sources, :]).max()
+            self.acceleration_table = AccelerationTable(
+                self.positions[fixed_sources], self._get_coefficients(fixed_sources), max(extent, 1e-9),
+                fixed_acceleration_tolerance
+            )
+        self._update_indices()
+
+    def set_integrator(self, integrator: str):
+        """
+        Sets the integrator used when updating the position of the bodies. It should only be changed before the first
+        update.
+
+        Parameters
+        ----------
+        integrator : str
+            The type of integrator. Currently implemented integrators are: "euler", "leapfrog", "synchronous",
+            "kick-drift-kick", "yoshida", "runge-kutta".
+        """
+
+        super().set_integrator(integrator)
+        if integrator == "yoshida":
+            w_0 = -2 ** (1 / 3) / (2 - 2 ** (1 / 3))
+            w_1 = 1 / (2 - 2 ** (1 / 3))
+            self.yoshida_c_constants = (w_1 / 2, (w_0 + w_1) / 2, (w_0 + w_1) / 2, w_1 / 2)
+            self.yoshida_d_constants = (w_1, w_0, w_1)
+
+    def copy_with_bodies(self, list_of_bodies: List[Body], **options) -> VectorizedSystem:
+        """
+        Creates a system of the same class and with the same constructor arguments as this one, but with other bodies.
+        The copy shares the acceleration table of this system if it has the same fixed attractive bodies, so the
+        table's grids are computed once for all the copies, e.g. for all the simulations of a sweep.
+
+        Parameters
+        ----------
+        list_of_bodies : List[Body]
+            A list of the bodies used to create the system.
+        options : dict
+            Constructor arguments replacing those of this system, e.g. the integrator.
+
+        Returns
+        -------
+        system : VectorizedSystem
+            The new system.
+        """
+
+        system = super().copy_with_bodies(list_of_bodies, **options)
+        table, copied_table = self.acceleration_table, system.acceleration_table
+        if (
+            table is not None and copied_table is not None and table.tolerance == copied_table.tolerance
+            and np.array_equal(table.source_positions, copied_table.source_positions)
+            and np.array_equal(table.source_coefficients, copied_table.source_coefficients)
+        ):
+            system.acceleration_table = table
+        return system
+
+    def _update_indices(self):
+        """
+        Computes the row indices used to slice the state arrays. This must be called every time rows are removed.
+        """
+
+        self._moving_rows = np.flatnonzero(~self.fixed_mask)
+        # The fixed bodies are not summed with the other sources if their acceleration is interpolated
+        if self.acceleration_table is not None:
+            self._source_rows = np.flatnonzero(self.attractive_mask & ~self.fixed_mask)
+        else:
+            self._source_rows = np.flatnonzero(self.attractive_mask)
+        # Index of each moving body's own row within the sources, -1 if the body does not attract
+        source_index = np.full(len(self._bodies), -1)
+        source_index[self._source_rows] = np.arange(len(self._source_rows))
+        self._source_index = source_index
+        self._excluded_sources = source_index[self._moving_rows]
+        # Rows that must be kept in sync with the body objects at every step (used by fake and tracked bodies)
+        synced_rows = set(self._source_rows[~self.fixed_mask[self._source_rows]])
+        for i, body in enumerate(self._bodies):
+            if body is getattr(self, "tracked_body", None):
+                synced_rows.add(i)
+        self._synced_rows = np.array(sorted(synced_rows), dtype=int)
+        # Rows read from the ephemeris, in its order, and rows that are integrated
+        rows = {id(body): i for i, body in enumerate(self._bodies)}
+        bodies = self.ephemeris.get_bodies(self) if self.ephemeris is not None else []
+        self._ephemeris_rows = np.array([rows[id(body)] for body in bodies], dtype=int)
+        self._integrated_rows = np.setdiff1d(self._moving_rows, self._ephemeris_rows)
+
+    @staticmethod
+    def get_accelerations(
+            positions: np.ndarray,
+            source_positions: np.ndarray,
+            source_coefficients: np.ndarray,
+            excluded_sources: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Computes the gravitational acceleration of many points caused by many point sources in a single operation.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            The (Q,3) array of the positions where the acceleration should be evaluated.
+        source_positions : np.ndarray
+            The (S,3) array of the positions of the attracting bodies, or a (Q,S,3) array giving different source
+            positions for every point.
+        source_coefficients : np.ndarray
+            The (S,) array of each source's G*m product, expressed in the system's units.
+        excluded_sources : np.ndarray
+            The (Q,) array giving for each point the index of a source to ignore (the point's own body) or -1 if every
+            source acts on the point. Defaults to None, meaning every source acts on every point.
+
+        Returns
+        -------
+        accelerations : np.ndarray
+            The (Q,3) array of the accelerations at every given position.
+        """
+
+        separations = source_positions - positions[:, None, :]
+        distances = np.sqrt(np.einsum("qsi,qsi->qs", separations, separations))
+        # The distance between a body and its own source is 0, its factor being removed below
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factors = source_coefficients[None, :] / distances**3
+        if excluded_sources is not None:
+            excluded_points = np.flatnonzero(excluded_sources >= 0)
+            factors[excluded_points, excluded_sources[excluded_points]] = 0
+        return np.einsum("qs,qsi->qi", factors, separations)
+
+    @staticmethod
+    def _is_trivial(field: ScalarField | VectorField) -> bool:
+        """
+        Gives whether a base field has no effect, which is the case for the default fields.
+        """
+
+        return not ((field.powers != 0) & (field.coefficients != 0)).any()
+
+    def _get_coefficients(self, rows: np.ndarray) -> np.ndarray:
+        """
+        Gives the G*m product of the bodies of the given rows, expressed in the system's units.
+        """
+
+        return self.masses[rows] * gravitational_constant * (10 ** (-self.n)) ** 3
+
+    def _get_base_accelerations(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Computes the acceleration that only depends on the position, caused by the system's base force field and by the
+        fixed bodies if their acceleration is interpolated, at the given positions.
+        """
+
+        accelerations = 0
+        if self.acceleration_table is not None:
+            accelerations = self.acceleration_table.get_accelerations(positions)
+        if self._is_trivial(self._base_force_field):
+            return accelerations
+        field = self._base_force_field * (10 ** (-self.n)) ** 3
+        return accelerations + field.evaluate(positions)
+
+    def _get_acceleration_function(self, rows: np.ndarray = None, source_motion: tuple = None):
+        """
+        Gives the function computing the acceleration of moving bodies for the current step. The sources are frozen
+        at their position at the beginning of the step, as in the BaseSystem, unless their motion during the step is
+        given.
+
+        Parameters
+        ----------
+        rows : np.ndarray
+            The moving rows whose acceleration is computed. Defaults to None, meaning every moving row.
+        source_motion : tuple
+            The start positions, start velocities, end positions and end velocities of the sources over the step, along
+            with the step's duration. If given, the returned function takes the (Q,) array of the times elapsed since
+            the beginning of the step as first argument and the sources are interpolated at these times. Defaults to
+            None.
+        """
+
+        excluded_sources = self._excluded_sources if rows is None else self._source_index[rows]
+        source_positions = self.positions[self._source_rows].copy()
+        source_coefficients = self._get_coefficients(self._source_rows)
+
+        if source_motion is None and self.force_solver == "barnes-hut":
+            # The tree is built once per step, as the sources are frozen
+            tree = Octree(source_positions, source_coefficients)
+            def acceleration_function(positions: np.ndarray) -> np.ndarray:
+                return (
+                    tree.get_accelerations(positions, self.opening_angle, excluded_sources)
+                    + self._get_base_accelerations(positions)
+                )
+        elif source_motion is None:
+            def acceleration_function(positions: np.ndarray) -> np.ndarray:
+                return (
+                    self.get_accelerations(positions, source_positions, source_coefficients, excluded_sources)
+                    + self._get_base_accelerations(positions)
+                )
+        else:
+            def acceleration_function(times: np.ndarray, positions: np.ndarray) -> np.ndarray:
+                return (
+                    self.get_accelerations(positions, hermite_interpolate(*source_motion, times), source_coefficients,
+                                           excluded_sources)
+                    + self._get_base_accelerations(positions)
+                )
+
+        return acceleration_function
+
+    def _adaptive_update(self, time_step: float, tolerance: float):
+        """
+        Advances the moving bodies with adaptive substeps. The moving attractive bodies are advanced first, with the
+        sources frozen at their position at the beginning of the step. Their motion during the step is then
+        interpolated so the other bodies feel the sources move during their substeps.
+        """
+
+        moving = ~self.fixed_mask
+        start_positions = self.positions[self._source_rows].copy()
+        # Fixed sources keep their position whatever their velocity
+        start_velocities = np.where(moving[self._source_rows, None], self.velocities[self._source_rows], 0)
+
+        rows = np.flatnonzero(moving & self.attractive_mask)
+        if self.ephemeris is not None:
+            self._apply_ephemeris(self.time + time_step, time_step)
+        elif len(rows):
+            acceleration = self._get_acceleration_function(rows)
+            self.positions[rows], self.velocities[rows], self.adaptive_steps[rows], _ = integrate_adaptive(
+                self.positions[rows], self.velocities[rows], time_step,
+                lambda times, positions: acceleration(positions), tolerance, self.adaptive_steps[rows]
+            )
+
+        rows = np.flatnonzero(moving & ~self.attractive_mask)
+        if len(rows):
+            end_velocities = np.where(moving[self._source_rows, None], self.velocities[self._source_rows], 0)
+            source_motion = (start_positions, start_velocities, self.positions[self._source_rows], end_velocities,
+                             time_step)
+            acceleration = self._get_acceleration_function(rows, source_motion)
+            self.positions[rows], self.velocities[rows], self.adaptive_steps[rows], _ = integrate_adaptive(
+                self.positions[rows], self.velocities[rows], time_step, acceleration, tolerance,
+                self.adaptive_steps[rows]
+            )
+
+    def update(
+            self,
+            time_step: float,
+            epsilon: float = 10**(-2),
+            method: str = "potential",
+            tolerance: Optional[float] = None
+    ):
+        """
+        Updates the position and velocity of the bodies within the system according to the time step. All the moving
+        bodies are integrated at once with the system's integrator, or with adaptive substeps if a tolerance is given.
+
+        Parameters
+        ----------
+        time_step : float
+            The time step during which the acceleration and velocity are considered constant, a smaller values gives
+            more accurate results.
+        epsilon : float
+            Kept for compatibility with the BaseSystem, accelerations are computed in closed form.
+        method : str
+            Kept for compatibility with the BaseSystem.
+        tolerance : Optional[float]
+            If given, every body is advanced with its own adaptive substeps keeping its local position error below this
+            tolerance, in the system's space unit. Defaults to None.
+        """
+
+        rows = self._moving_rows
+        if len(rows):
+            if tolerance:
+                self._adaptive_update(time_step, tolerance)
+            else:
+                integrated = self._integrated_rows
+                self.positions[integrated], self.velocities[integrated] = self._integrate(
+                    self.positions[integrated], self.velocities[integrated], time_step,
+                    self._get_acceleration_function(integrated)
+                )
+                if self.ephemeris is not None:
+                    self._apply_ephemeris(self.time + time_step, time_step)
+            self.time_survived[rows] += time_step
+            self._sync_bodies(self._synced_rows)
+        self.time += time_step
+        self.steps += 1
+
+        if self.fake_bodies:
+            for body in self.fake_bodies:
+                body(self.attractive_bodies)
+
+    def set_ephemeris(self, ephemeris: Optional[Ephemeris]):
+        """
+        Sets the ephemeris from which the state of the moving attractive bodies is read instead of being integrated.
+        The ephemeris must start at the system's current time and the other moving bodies must have no potential.
+        """
+
+        super().set_ephemeris(ephemeris)
+        self._update_indices()
+
+    def _apply_ephemeris(self, time: float, time_step: float):
+        """
+        Sets the rows of the moving attractive bodies to the state given by the ephemeris at a certain time. Their
+        time survived is updated with the other moving rows.
+        """
+
+        self.positions[self._ephemeris_rows], self.velocities[self._ephemeris_rows] = self.ephemeris.get_state(time)
+
+    def _integrate(self, x: np.ndarray, v: np.ndarray, time_step: float, acceleration) -> tuple:
+        """
+        Advances the given positions and velocities by a time step with the system's integrator.
+
+        Returns
+        -------
+        state : tuple[np.ndarray, np.ndarray]
+            The updated positions and velocities.
+        """
+
+        dt = time_step
+        if self.integrator == "euler":
+            a = acceleration(x)
+            return x + v*dt + a/2*dt**2, v + a*dt
+
+        elif self.integrator == "leapfrog":
+            a = acceleration(x)
+            if self.set_up_step:
+                v = v - a*dt/2
+                self.set_up_step = False
+            v = v + a*dt
+            return x + v*dt, v
+
+        elif self.integrator == "synchronous":
+            a = acceleration(x)
+            x = x + v*dt + a/2*dt**2
+            return x, v + (a + acceleration(x))*dt/2
+
+        elif self.integrator == "kick-drift-kick":
+            v = v + acceleration(x)*dt/2
+            x = x + v*dt
+            return x, v + acceleration(x)*dt/2
+
+        elif self.integrator == "yoshida":
+            c_1, c_2, c_3, c_4 = self.yoshida_c_constants
+            for c, d in zip((c_1, c_2, c_3), self.yoshida_d_constants):
+                x = x + c*v*dt
+                v = v + d*acceleration(x)*dt
+            return x + c_4*v*dt, v
+
+        elif self.integrator == "runge-kutta":
+            a_1 = acceleration(x)
+            v_2 = v + a_1*dt/2
+            a_2 = acceleration(x + v*dt/2)
+            v_3 = v + a_2*dt/2
+            a_3 = acceleration(x + v_2*dt/2)
+            v_4 = v + a_3*dt
+            a_4 = acceleration(x + v_3*dt)
+            return x + (v + 2*v_2 + 2*v_3 + v_4)/6*dt, v + (a_1 + 2*a_2 + 2*a_3 + a_4)/6*dt
+
+    def _sync_bodies(self, rows: np.ndarray):
+        """
+        Copies the state of the given rows to the corresponding body objects.
+        """
+
+        for row in rows:
+            body = self._bodies[row]
+            body._position = Vector(*self.positions[row])
+            body._velocity = Vector(*self.velocities[row])
+            body.time_survived = self.time_survived[row]
+
+    def _remove_rows(self, rows: np.ndarray):
+        """
+        Removes rows from the state arrays and updates the indices accordingly.
+        """
+
+        kept = np.ones(len(self._bodies), dtype=bool)
+        kept[rows] = False
+        self._bodies = [body for body, keep in zip(self._bodies, kept) if keep]
+        self.positions = self.positions[kept]
+        self.velocities = self.velocities[kept]
+        self.masses = self.masses[kept]
+        self.time_survived = self.time_survived[kept]
+        self.fixed_mask = self.fixed_mask[kept]
+        self.attractive_mask = self.attractive_mask[kept]
+        self.adaptive_steps = self.adaptive_steps[kept]
+        self._update_indices()
+
+    def remove_dead_bodies(self, potential_gradient_limit: float, body_alive_func: Lambda):
+        """
+        Removes the bodies that are considered to be destroyed or too distant. Checks only for the moving bodies
+        without potentials. The potential gradient of every checked body is computed in a single operation.
+
+        Parameters
+        ----------
+        potential_gradient_limit: float
+            Limit for the potential gradient on a body to be considered still alive.
+        body_alive_func: Lambda
+            Lambda object specifying the conditions a body must respect to stay alive.
+        """
+
+        rows = np.flatnonzero(~self.fixed_mask & ~self.attractive_mask)
+        if not len(rows):
+            return
+        positions = self.positions[rows]
+        gradients = self.get_accelerations(
+            positions, self.positions[self._source_rows], self._get_coefficients(self._source_rows)
+        )
+        if self.acceleration_table is not None:
+            gradients += self.acceleration_table.get_accelerations(positions)
+        if not self._is_trivial(self._base_potential):
+            field = self._base_potential * (10 ** (-self.n)) ** 3
+            gradients -= field.get_gradients(positions)
+        # The bodies abandoned by the adaptive integrator have a non-finite position
+        dead = (np.linalg.norm(gradients, axis=1) > potential_gradient_limit) | ~np.isfinite(positions).all(axis=1)
+
+        if body_alive_func:
+            tracked_position = tuple(self.tracked_body.position) if self.tracked_body else None
+            dead |= ~body_alive_func.alive_mask(positions, tracked_position)
+
+        dead_rows = rows[dead]
+        if len(dead_rows):
+            self._sync_bodies(dead_rows)
+            dead_bodies = [self._bodies[row] for row in dead_rows]
+            for body in dead_bodies:
+                body.death_step = self.steps
+            self.dead_bodies += dead_bodies
+            dead_ids = set(map(id, dead_bodies))
+            self._compact_moving_bodies(np.array([id(body) not in dead_ids for body in self.moving_bodies]))
+            self._remove_rows(dead_rows)
+
+    @property
+    def alive_bodies_count(self) -> int:
+        """
+        Gives the number of moving bodies without potential that are still alive.
+        """
+
+        return int(np.count_nonzero(~self.fixed_mask & ~self.attractive_mask))
+
+    def save_positions(self, save_fake=False):
+        """
+        Save the positions of every body in the system.
+        """
+
+        self._sync_bodies(self._moving_rows)
+        super().save_positions(save_fake)
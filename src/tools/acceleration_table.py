@@ -0,0 +1,233 @@
+from __future__ import annotations
+
+import numpy as np
+from scipy.spatial import cKDTree
+
+
+class AccelerationTable:
+    """
+    Class used to interpolate the acceleration caused by motionless point sources from values precomputed on grids.
+    Every source is surrounded by nested cubic grids of the same number of nodes, the grid of level k having a half
+    side of extent / 2**k, so the grids get finer near the sources. A position is interpolated trilinearly in the finest
+    grid containing it, which is a grid of its nearest source and which it is in the outer half of. As the acceleration
+    varies over distances proportional to the distance to the nearest source, every grid gives about the same relative
+    error. The positions outside of the coarsest grids, within the inner half of the finest grids, or in a grid whose
+    error exceeds the tolerance are evaluated directly. Grids are computed and checked when they are first needed.
+    As a grid is checked at random positions only, its error is an estimate, so the grids are sized and checked for a
+    fraction safety_factor of the tolerance. Their number of nodes grows as tolerance**-1.5, so tolerances much below
+    1e-3 require a lot of memory.
+    """
+
+    safety_factor = 0.8
+
+    def __init__(
+            self,
+            source_positions: np.ndarray,
+            source_coefficients: np.ndarray,
+            extent: float,
+            tolerance: float = 1e-2,
+            levels: int = 12,
+            nodes_per_axis: int = None
+    ):
+        """
+        Defines the required parameters.
+
+        Parameters
+        ----------
+        source_positions : np.ndarray
+            The (S,3) array of the sources' positions.
+        source_coefficients : np.ndarray
+            The (S,) array of each source's G*m product.
+        extent : float
+            The half side of the coarsest grid around each source.
+        tolerance : float
+            The maximum error of the interpolated accelerations, relative to the sum of the magnitudes of the
+            accelerations caused by each source. This bound is approximate, as it is checked by sampling. The relative
+            error of the total acceleration may be larger where the sources' accelerations cancel out. Defaults to 1e-2.
+        levels : int
+            The number of nested grids around each source. The positions closer to a source than
+            extent / 2**levels along every axis are evaluated directly. Defaults to 12.
+        nodes_per_axis : int
+            The number of nodes along each axis of a grid. Defaults to None, which chooses it from the tolerance.
+        """
+
+        self.source_positions = np.asarray(source_positions, dtype=float).reshape(-1, 3)
+        self.source_coefficients = np.asarray(source_coefficients, dtype=float)
+        self.extent = extent
+        self.tolerance = tolerance
+        self.levels = levels
+        if nodes_per_axis is None:
+            # The relative error of a linear interpolation of a 1/r**2 field in the outer half of a grid is about
+            # 2*(h/w)**2 at worst, h being the spacing and w the half side of the grid, which is given a 25% margin
+            nodes_per_axis = int(np.ceil(np.sqrt(10 / (tolerance * self.safety_factor)))) + 1
+        self.nodes_per_axis = nodes_per_axis
+        self._reset_grids()
+
+    def _reset_grids(self):
+        """
+        Removes every computed grid.
+        """
+
+        self.tree = cKDTree(self.source_positions)
+        # Index of the grid of each source and level within the grids array, -1 if it was never needed and -2 if its
+        # error exceeds the tolerance
+        self.grid_indices = np.full((len(self.source_positions), self.levels), -1)
+        self.grids = np.zeros((0, self.nodes_per_axis, self.nodes_per_axis, self.nodes_per_axis, 3))
+
+    def __getstate__(self) -> dict:
+        # The grids are computed again by each process, as they are large
+        state = self.__dict__.copy()
+        for name in ("tree", "grid_indices", "grids"):
+            del state[name]
+        return state
+
+    def __setstate__(self, state: dict):
+        self.__dict__.update(state)
+        self._reset_grids()
+
+    def get_direct_accelerations(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Computes the exact acceleration caused by the sources at many positions.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            The (Q,3) array of positions.
+
+        Returns
+        -------
+        accelerations : np.ndarray
+            The (Q,3) array of the accelerations.
+        """
+
+        accelerations = np.zeros((len(positions), 3))
+        for source_position, coefficient in zip(self.source_positions, self.source_coefficients):
+            separations = source_position - positions
+            distances = np.sqrt(np.einsum("qi,qi->q", separations, separations))
+            with np.errstate(divide="ignore", invalid="ignore"):
+                accelerations += (coefficient / distances**3)[:, None] * separations
+        return accelerations
+
+    def get_levels(self, positions: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Gives the grid in which each position is interpolated.
+
+        Returns
+        -------
+        sources, levels : tuple[np.ndarray, np.ndarray]
+            The (Q,) arrays of the source and level of the finest grid containing each position. The level is -1 for
+            the positions outside of every grid and levels for the positions too close to a source.
+        """
+
+        # The finest grid is the one of the nearest source along the axis that separates them the most
+        distances, sources = self.tree.query(positions, p=np.inf)
+        with np.errstate(divide="ignore"):
+            levels = np.floor(np.log2(self.extent / distances))
+        levels = np.clip(np.nan_to_num(levels, posinf=self.levels), -1, self.levels).astype(int)
+        return sources, levels
+
+    def _compute_grid(self, source: int, level: int) -> np.ndarray | None:
+        """
+        Computes a grid and checks its error at random positions interpolated in it against the tolerance reduced by
+        the safety factor, so the error at the positions that were not checked stays within the tolerance.
+
+        Returns
+        -------
+        grid : np.ndarray | None
+            The (M,M,M,3) array of the accelerations at the grid's nodes, None if its error exceeds the tolerance.
+        """
+
+        half_side = self.extent / 2**level
+        axis = np.linspace(-half_side, half_side, self.nodes_per_axis)
+        nodes = np.stack(np.meshgrid(axis, axis, axis, indexing="ij"), axis=-1).reshape(-1, 3)
+        grid = self.get_direct_accelerations(nodes + self.source_positions[source])
+        # The nodes on a source are never used for interpolation, as they are surrounded by finer grids
+        grid[~np.isfinite(grid)] = 0
+        grid = grid.reshape(self.grids.shape[1:])
+
+        rng = np.random.default_rng(0)
+        samples = self.source_positions[source] + rng.uniform(-half_side, half_side, (4096, 3))
+        sources, levels = self.get_levels(samples)
+        samples = samples[(sources == source) & (levels == level)]
+        if len(samples):
+            exact = self.get_direct_accelerations(samples)
+            distances = np.linalg.norm(samples[:, None, :] - self.source_positions[None, :, :], axis=2)
+            scales = (np.abs(self.source_coefficients) / distances**2).sum(axis=1)
+            interpolated = self._interpolate(
+                samples, np.full(len(samples), source), np.full(len(samples), level), grid[None],
+                np.zeros(len(samples), dtype=int)
+            )
+            if (np.linalg.norm(interpolated - exact, axis=1) / scales).max() > self.tolerance * self.safety_factor:
+                return None
+        return grid
+
+    def _interpolate(
+            self,
+            positions: np.ndarray,
+            sources: np.ndarray,
+            levels: np.ndarray,
+            grids: np.ndarray,
+            indices: np.ndarray
+    ) -> np.ndarray:
+        """
+        Interpolates trilinearly the accelerations at positions, each within the grid of a source and level found at
+        an index of the given grids.
+        """
+
+        m = self.nodes_per_axis
+        half_sides = (self.extent / 2.**levels)[:, None]
+        coordinates = (positions - self.source_positions[sources] + half_sides) / (2 * half_sides) * (m - 1)
+        lower = np.clip(np.floor(coordinates).astype(int), 0, m - 2)
+        fractions = coordinates - lower
+        # The nodes are read from the flattened grids, the corners of a cell being at fixed offsets from its first node
+        corners = np.array(list(np.ndindex(2, 2, 2)))
+        first_nodes = ((indices * m + lower[:, 0]) * m + lower[:, 1]) * m + lower[:, 2]
+        corner_nodes = np.take(grids.reshape(-1, 3), first_nodes[:, None] + corners @ np.array([m * m, m, 1]), axis=0)
+        axis_weights = np.stack((1 - fractions, fractions), axis=1)
+        weights = np.prod([axis_weights[:, corners[:, axis], axis] for axis in range(3)], axis=0)
+        accelerations = np.einsum("qc,qci->qi", weights, corner_nodes)
+        return accelerations
+
+    def get_accelerations(self, positions: np.ndarray) -> np.ndarray:
+        """
+        Computes the acceleration caused by the sources at many positions, interpolated from the grids where possible.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            The (Q,3) array of positions.
+
+        Returns
+        -------
+        accelerations : np.ndarray
+            The (Q,3) array of the accelerations.
+        """
+
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        accelerations = np.zeros((len(positions), 3))
+        if not len(self.source_positions):
+            return accelerations
+        sources, levels = self.get_levels(positions)
+        tabulated = (levels >= 0) & (levels < self.levels)
+        new_grids = []
+        pairs = np.unique(sources[tabulated] * self.levels + levels[tabulated])
+        for source, level in zip(pairs // self.levels, pairs % self.levels):
+            if self.grid_indices[source, level] == -1:
+                grid = self._compute_grid(source, level)
+                if grid is None:
+                    self.grid_indices[source, level] = -2
+                else:
+                    self.grid_indices[source, level] = len(self.grids) + len(new_grids)
+                    new_grids.append(grid)
+        if new_grids:
+            self.grids = np.concatenate((self.grids, new_grids))
+
+        sources, levels = sources[tabulated], levels[tabulated]
+        indices = self.grid_indices[sources, levels]
+        interpolated = indices >= 0
+        tabulated[tabulated] = interpolated
+        accelerations[tabulated] = self._interpolate(
+            positions[tabulated], sources[interpolated], levels[interpolated], self.grids, indices[interpolated]
+        )
+        accelerations[~tabulated] = self.get_direct_accelerations(positions[~tabulated])
+        return accelerations
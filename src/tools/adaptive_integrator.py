@@ -0,0 +1,165 @@
+from __future__ import annotations
+
+from typing import Callable, Tuple
+
+import numpy as np
+
+
+# Runge-Kutta-Fehlberg 4(5) coefficients
+RKF45_C = np.array([0, 1/4, 3/8, 12/13, 1, 1/2])
+RKF45_A = [
+    [],
+    [1/4],
+    [3/32, 9/32],
+    [1932/2197, -7200/2197, 7296/2197],
+    [439/216, -8, 3680/513, -845/4104],
+    [-8/27, 2, -3544/2565, 1859/4104, -11/40]
+]
+RKF45_B5 = np.array([16/135, 0, 6656/12825, 28561/56430, -9/50, 2/55])
+RKF45_B4 = np.array([25/216, 0, 1408/2565, 2197/4104, -1/5, 0])
+
+
+def integrate_adaptive(
+        positions: np.ndarray,
+        velocities: np.ndarray,
+        duration: float,
+        acceleration: Callable[[np.ndarray, np.ndarray], np.ndarray],
+        tolerance: float,
+        steps: np.ndarray = None,
+        safety: float = 0.9,
+        minimum_step: float = None
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """
+    Advances many independent bodies by a duration with an embedded Runge-Kutta-Fehlberg 4(5) method. Every body
+    has its own substep, which is shrunk when the difference between the 4th and 5th order solutions exceeds the
+    tolerance and grown otherwise. The substeps never exceed the duration, so the bodies all end at the same time.
+    A body whose substep would fall below the minimum step, typically because it landed on a source and its
+    acceleration is no longer finite, is abandoned: its position and velocity are set to NaN so that it is removed as
+    dead, and the bodies whose state is not finite are not advanced. This also bounds the number of substeps of a
+    close approach, which would otherwise hold back every other body of the call.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        The (N,3) array of the bodies' positions.
+    velocities : np.ndarray
+        The (N,3) array of the bodies' velocities.
+    duration : float
+        The time by which the bodies are advanced.
+    acceleration : Callable[[np.ndarray, np.ndarray], np.ndarray]
+        Function giving the (Q,3) array of the accelerations from the (Q,) array of the times elapsed since the
+        beginning of the step and the (Q,3) array of the positions.
+    tolerance : float
+        The maximum local error on a body's position in the system's space unit. The error on the velocity is
+        converted to a position error by multiplying it by the duration.
+    steps : np.ndarray
+        The (N,) array of the substeps with which to start, typically the ones returned by the previous call. Defaults
+        to None, which starts with the whole duration. NaN values also start with the whole duration.
+    safety : float
+        Factor by which the optimal substep is reduced to limit the number of rejected substeps. Defaults to 0.9.
+    minimum_step : float
+        The smallest substep allowed before a body is abandoned. Defaults to None, which uses duration * 1e-4.
+
+    Returns
+    -------
+    positions, velocities, steps, evaluations : Tuple[np.ndarray, np.ndarray, np.ndarray, int]
+        The updated positions and velocities, the substeps to start the next call with and the number of
+        acceleration evaluations, counted per body.
+    """
+    x = np.array(positions, dtype=float).reshape(-1, 3)
+    v = np.array(velocities, dtype=float).reshape(-1, 3)
+    if steps is None:
+        steps = np.full(len(x), float(duration))
+    else:
+        steps = np.where(np.isnan(steps), duration, np.minimum(steps, duration))
+    if minimum_step is None:
+        minimum_step = duration * 1e-4
+    times = np.zeros(len(x))
+    evaluations = 0
+
+    active = np.flatnonzero((times < duration) & np.isfinite(x).all(axis=1) & np.isfinite(v).all(axis=1))
+    while len(active):
+        # The last substep of each body is cut so that it ends exactly at the duration
+        remaining = duration - times[active]
+        h = np.minimum(steps[active], remaining)[:, None]
+        x_0, v_0 = x[active], v[active]
+
+        k_x, k_v = [], []
+        for i in range(6):
+            x_i, v_i = x_0.copy(), v_0.copy()
+            for a, k_x_j, k_v_j in zip(RKF45_A[i], k_x, k_v):
+                x_i += a * h * k_x_j
+                v_i += a * h * k_v_j
+            k_x.append(v_i)
+            k_v.append(acceleration(times[active] + RKF45_C[i] * h[:, 0], x_i))
+        evaluations += 6 * len(active)
+
+        x_5 = x_0 + h * sum(b * k for b, k in zip(RKF45_B5, k_x))
+        v_5 = v_0 + h * sum(b * k for b, k in zip(RKF45_B5, k_v))
+        x_error = h * sum((b_5 - b_4) * k for b_5, b_4, k in zip(RKF45_B5, RKF45_B4, k_x))
+        v_error = h * sum((b_5 - b_4) * k for b_5, b_4, k in zip(RKF45_B5, RKF45_B4, k_v))
+        errors = np.maximum(np.linalg.norm(x_error, axis=1), np.linalg.norm(v_error, axis=1) * duration) / tolerance
+
+        # A non-finite error is a rejection, the substep being halved
+        finite = np.isfinite(errors)
+        accepted = finite & (errors <= 1)
+        accepted_rows = active[accepted]
+        x[accepted_rows] = x_5[accepted]
+        v[accepted_rows] = v_5[accepted]
+        times[accepted_rows] += h[accepted, 0]
+        # The substep is not grown after a substep that was only cut to reach the duration
+        with np.errstate(divide="ignore", invalid="ignore"):
+            factors = np.where(finite, np.clip(safety * errors**(-1/5), 0.2, 5), 0.5)
+        new_steps = h[:, 0] * factors
+        cut = accepted & (h[:, 0] < steps[active])
+        steps[active] = np.where(cut, np.maximum(steps[active], new_steps), new_steps)
+        steps[active] = np.minimum(steps[active], duration)
+
+        failed = active[~accepted & (new_steps < minimum_step)]
+        x[failed], v[failed], steps[failed] = np.nan, np.nan, np.nan
+        active = active[(times[active] < duration * (1 - 1e-12)) & ~np.isin(active, failed)]
+
+    return x, v, steps, evaluations
+
+
+def hermite_interpolate(
+        start_positions: np.ndarray,
+        start_velocities: np.ndarray,
+        end_positions: np.ndarray,
+        end_velocities: np.ndarray,
+        duration: float,
+        times: np.ndarray
+) -> np.ndarray:
+    """
+    Interpolates the positions of bodies during a step with cubic Hermite polynomials, which match the positions and
+    velocities at both ends of the step. The states at both ends may also be given as (Q,S,3) arrays to interpolate
+    every time in its own step.
+
+    Parameters
+    ----------
+    start_positions : np.ndarray
+        The (S,3) array of the positions at the beginning of the step.
+    start_velocities : np.ndarray
+        The (S,3) array of the velocities at the beginning of the step.
+    end_positions : np.ndarray
+        The (S,3) array of the positions at the end of the step.
+    end_velocities : np.ndarray
+        The (S,3) array of the velocities at the end of the step.
+    duration : float
+        The duration of the step.
+    times : np.ndarray
+        The (Q,) array of the times elapsed since the beginning of the step at which to interpolate.
+
+    Returns
+    -------
+    positions : np.ndarray
+        The (Q,S,3) array of the interpolated positions.
+    """
+    s = (np.asarray(times, dtype=float) / duration)[:, None, None]
+    s_2, s_3 = s**2, s**3
+    return (
+        (2*s_3 - 3*s_2 + 1) * start_positions
+        + (s_3 - 2*s_2 + s) * duration * start_velocities
+        + (-2*s_3 + 3*s_2) * end_positions
+        + (s_3 - s_2) * duration * end_velocities
+    )
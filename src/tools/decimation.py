@@ -0,0 +1,69 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def decimate(positions: np.ndarray, tolerance: float) -> np.ndarray:
+    """
+    Selects the samples of a trajectory needed to reconstruct it within a tolerance, with a variant of the
+    Douglas-Peucker algorithm. A trajectory is reconstructed by linear interpolation in time between the kept samples
+    (see reconstruct), so the error of a sample is its distance to its interpolated position, rather than to the
+    segment joining the kept samples as in the original algorithm. The first and last samples are always kept.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        The (T,3) array of the trajectory's positions, sampled at regular intervals.
+    tolerance : float
+        The maximum distance between a sample and its reconstructed position.
+
+    Returns
+    -------
+    sample_indices : np.ndarray
+        The sorted (K,) array of the indices of the kept samples.
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    if len(positions) <= 2:
+        return np.arange(len(positions))
+
+    keep = np.zeros(len(positions), dtype=bool)
+    keep[[0, -1]] = True
+    intervals = [(0, len(positions) - 1)]
+    while intervals:
+        start, end = intervals.pop()
+        if end - start < 2:
+            continue
+        fractions = (np.arange(start + 1, end) - start) / (end - start)
+        interpolated = positions[start] + fractions[:, None] * (positions[end] - positions[start])
+        errors = np.linalg.norm(positions[start+1:end] - interpolated, axis=1)
+        i = np.argmax(errors)
+        if errors[i] > tolerance:
+            # The sample with the largest error is kept and both halves are checked again
+            middle = start + 1 + i
+            keep[middle] = True
+            intervals += [(start, middle), (middle, end)]
+    return np.flatnonzero(keep)
+
+
+def reconstruct(sample_indices: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Reconstructs a decimated trajectory by linear interpolation in time between its kept samples.
+
+    Parameters
+    ----------
+    sample_indices : np.ndarray
+        The sorted (K,) array of the indices of the kept samples, the last one being the index of the trajectory's
+        last sample.
+    positions : np.ndarray
+        The (K,3) array of the kept samples' positions.
+
+    Returns
+    -------
+    positions : np.ndarray
+        The (T,3) array of the reconstructed trajectory.
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    if not len(sample_indices):
+        return positions
+    times = np.arange(sample_indices[-1] + 1)
+    return np.column_stack([np.interp(times, sample_indices, positions[:, axis]) for axis in range(3)])
@@ -0,0 +1,184 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class Octree:
+    """
+    Class used to compute the gravitational accelerations caused by many point sources with the Barnes-Hut algorithm.
+    The sources are divided in nested cubic cells, each cell storing the total coefficient and the center of mass of
+    its sources. The sources of a cell that is small enough when seen from a point are replaced by a single source at
+    their center of mass, which reduces the cost of the accelerations of N points caused by N sources from O(N^2) to
+    O(N log N). The points are processed together, level by level.
+    """
+
+    # Maximum number of points whose traversal is done at once
+    chunk_size = 4096
+
+    def __init__(self, source_positions: np.ndarray, source_coefficients: np.ndarray, leaf_size: int = 8):
+        """
+        Builds the tree.
+
+        Parameters
+        ----------
+        source_positions : np.ndarray
+            The (S,3) array of the sources' positions.
+        source_coefficients : np.ndarray
+            The (S,) array of each source's G*m product, which must not be negative.
+        leaf_size : int
+            The maximum number of sources in a cell that is not divided. The sources of such cells are summed
+            directly when the cell is opened. Defaults to 8.
+        """
+
+        self.source_positions = np.asarray(source_positions, dtype=float).reshape(-1, 3)
+        self.source_coefficients = np.asarray(source_coefficients, dtype=float)
+        count = len(self.source_positions)
+        # Sources are reordered so that the sources of every cell are contiguous
+        self.order = np.arange(count)
+        centers, half_sizes, starts, counts, children = [], [], [], [], []
+
+        cells = []
+        if count:
+            low, high = self.source_positions.min(axis=0), self.source_positions.max(axis=0)
+            half_size = max((high - low).max() / 2, 1e-12) * (1 + 1e-9)
+            # Every cell is given with its parent's index and its octant within the parent
+            cells.append(((low + high) / 2, half_size, 0, count, 0, -1, 0))
+        while cells:
+            center, half_size, start, cell_count, depth, parent, octant = cells.pop()
+            index = len(centers)
+            centers.append(center)
+            half_sizes.append(half_size)
+            starts.append(start)
+            counts.append(cell_count)
+            children.append([-1] * 8)
+            if parent >= 0:
+                children[parent][octant] = index
+            # Cells of coincident sources are not divided indefinitely
+            if cell_count <= leaf_size or depth >= 32:
+                continue
+
+            rows = self.order[start:start+cell_count]
+            octants = (self.source_positions[rows] > center) @ np.array([1, 2, 4])
+            self.order[start:start+cell_count] = rows[np.argsort(octants, kind="stable")]
+            octant_counts = np.bincount(octants, minlength=8)
+            octant_starts = start + np.concatenate(([0], np.cumsum(octant_counts)[:-1]))
+            for octant in np.flatnonzero(octant_counts):
+                offset = (np.array([octant & 1, octant >> 1 & 1, octant >> 2 & 1]) - 0.5) * half_size
+                cells.append((center + offset, half_size / 2, octant_starts[octant], octant_counts[octant], depth + 1,
+                              index, octant))
+
+        self.centers = np.array(centers, dtype=float).reshape(-1, 3)
+        self.half_sizes = np.array(half_sizes, dtype=float)
+        self.starts = np.array(starts, dtype=int)
+        self.counts = np.array(counts, dtype=int)
+        self.children = np.array(children, dtype=int).reshape(-1, 8)
+        self.leaf_mask = (self.children < 0).all(axis=1)
+
+        # Total coefficient and center of mass of every cell, from cumulative sums over the ordered sources
+        ordered_coefficients = self.source_coefficients[self.order]
+        coefficient_sums = np.concatenate(([0], np.cumsum(ordered_coefficients)))
+        weighted_sums = np.concatenate(
+            (np.zeros((1, 3)), np.cumsum(ordered_coefficients[:, None] * self.source_positions[self.order], axis=0))
+        )
+        ends = self.starts + self.counts
+        self.coefficients = coefficient_sums[ends] - coefficient_sums[self.starts]
+        with np.errstate(invalid="ignore", divide="ignore"):
+            centers_of_mass = (weighted_sums[ends] - weighted_sums[self.starts]) / self.coefficients[:, None]
+        self.centers_of_mass = np.where(self.coefficients[:, None] > 0, centers_of_mass, self.centers)
+
+    def get_accelerations(
+            self,
+            positions: np.ndarray,
+            opening_angle: float = 0.5,
+            excluded_sources: np.ndarray = None
+    ) -> np.ndarray:
+        """
+        Computes the acceleration of many points caused by the sources.
+
+        Parameters
+        ----------
+        positions : np.ndarray
+            The (Q,3) array of the positions where the acceleration should be evaluated.
+        opening_angle : float
+            The ratio between a cell's size and its distance to a point under which the cell's sources are replaced
+            by their center of mass. A cell containing the point is always opened. Smaller values are more accurate
+            and 0 sums every source directly. Defaults to 0.5.
+        excluded_sources : np.ndarray
+            The (Q,) array giving for each point the index of a source to ignore (the point's own body) or -1 if every
+            source acts on the point. Defaults to None, meaning every source acts on every point.
+
+        Returns
+        -------
+        accelerations : np.ndarray
+            The (Q,3) array of the accelerations at every given position.
+        """
+
+        positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+        accelerations = np.zeros((len(positions), 3))
+        if not len(self.centers):
+            return accelerations
+        if excluded_sources is None:
+            excluded_sources = np.full(len(positions), -1)
+
+        # The points are processed in chunks to bound the number of pairs held in memory
+        for start in range(0, len(positions), self.chunk_size):
+            self._add_accelerations(
+                accelerations, positions, np.arange(start, min(start + self.chunk_size, len(positions))),
+                opening_angle, excluded_sources
+            )
+
+        return accelerations
+
+    def _add_accelerations(
+            self,
+            accelerations: np.ndarray,
+            positions: np.ndarray,
+            points: np.ndarray,
+            opening_angle: float,
+            excluded_sources: np.ndarray
+    ):
+        """
+        Traverses the tree for some of the points and adds the resulting accelerations.
+        """
+
+        # Pairs of a point and a cell that remain to be evaluated, starting with the root cell for every point
+        cells = np.zeros(len(points), dtype=int)
+        while len(points):
+            separations = self.centers_of_mass[cells] - positions[points]
+            distances = np.sqrt(np.einsum("pi,pi->p", separations, separations))
+            inside = (np.abs(positions[points] - self.centers[cells]) <= self.half_sizes[cells, None]).all(axis=1)
+            accepted = ~inside & (2 * self.half_sizes[cells] < opening_angle * distances)
+            leaves = self.leaf_mask[cells] & ~accepted
+
+            # Far cells act as a single source at their center of mass
+            factors = self.coefficients[cells[accepted]] / distances[accepted]**3
+            self._accumulate(accelerations, points[accepted], factors[:, None] * separations[accepted])
+
+            # The sources of the other leaves are summed directly
+            leaf_points, leaf_cells = points[leaves], cells[leaves]
+            leaf_counts = self.counts[leaf_cells]
+            pair_points = np.repeat(leaf_points, leaf_counts)
+            offsets = np.arange(leaf_counts.sum()) - np.repeat(np.cumsum(leaf_counts) - leaf_counts, leaf_counts)
+            sources = self.order[np.repeat(self.starts[leaf_cells], leaf_counts) + offsets]
+            kept = sources != excluded_sources[pair_points]
+            pair_points, sources = pair_points[kept], sources[kept]
+            pair_separations = self.source_positions[sources] - positions[pair_points]
+            pair_distances = np.sqrt(np.einsum("pi,pi->p", pair_separations, pair_separations))
+            factors = self.source_coefficients[sources] / pair_distances**3
+            self._accumulate(accelerations, pair_points, factors[:, None] * pair_separations)
+
+            # The remaining cells are replaced by their children
+            opened = ~leaves & ~accepted
+            children = self.children[cells[opened]]
+            valid = children >= 0
+            points = np.repeat(points[opened], valid.sum(axis=1))
+            cells = children[valid]
+
+    @staticmethod
+    def _accumulate(accelerations: np.ndarray, points: np.ndarray, values: np.ndarray):
+        """
+        Adds values to the accelerations of points that may appear many times.
+        """
+
+        for i in range(3):
+            accelerations[:, i] += np.bincount(points, weights=values[:, i], minlength=len(accelerations))
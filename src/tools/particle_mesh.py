@@ -0,0 +1,128 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def get_mesh_potential(
+        axes_positions: tuple[np.ndarray, np.ndarray, np.ndarray],
+        coefficients: np.ndarray,
+        origins: np.ndarray
+) -> np.ndarray:
+    """
+    Computes the potential of point sources, sum(coefficient / |position - origin|), on a regular grid with the
+    particle-mesh method. The sources are deposited on the grid's nodes with cloud-in-cell weights and the deposited
+    coefficients are convolved with the 1/r kernel using zero-padded FFTs, so the cost depends on the grid's size
+    rather than on the product of the grid's size and the number of sources. The axes with a single position (e.g.
+    the missing axis of a plane) are not gridded: the sources are grouped by their exact offset along these axes,
+    with one convolution per group. When the sources are at many distinct heights above a plane, they are instead
+    deposited in layers along its normal, spaced as the grid's nodes, with one convolution per layer. If there are
+    fewer than two sources per convolution, the potential is summed directly. The error is largest within a few nodes
+    of a source, where the potential is smoothed over a node; the node of a source is given the potential at half the
+    smallest spacing. Sources outside the grid are summed directly.
+
+    Parameters
+    ----------
+    axes_positions : tuple[np.ndarray, np.ndarray, np.ndarray]
+        The regularly spaced positions of the grid along the x, y and z axes.
+    coefficients : np.ndarray
+        The (S,) array of each source's coefficient.
+    origins : np.ndarray
+        The (S,3) array of each source's position.
+
+    Returns
+    -------
+    potential : np.ndarray
+        The array of the potential at every node of the grid, of shape (len(x), len(y), len(z)).
+    """
+    axes_positions = [np.ravel(np.asarray(positions, dtype=float)) for positions in axes_positions]
+    coefficients = np.asarray(coefficients, dtype=float)
+    origins = np.asarray(origins, dtype=float).reshape(-1, 3)
+    shape = tuple(len(positions) for positions in axes_positions)
+    potential = np.zeros(shape)
+    gridded = [axis for axis in range(3) if shape[axis] > 1]
+    planar = [axis for axis in range(3) if shape[axis] == 1]
+    starts = np.array([axes_positions[axis][0] for axis in range(3)])
+    spacings = np.array([
+        (axes_positions[axis][-1] - axes_positions[axis][0]) / (shape[axis] - 1) if shape[axis] > 1 else 1.
+        for axis in range(3)
+    ])
+
+    # Fractional node coordinates of the sources along the gridded axes
+    nodes = (origins - starts) / spacings
+    inside = np.full(len(origins), bool(gridded))
+    for axis in gridded:
+        inside &= (nodes[:, axis] >= 0) & (nodes[:, axis] <= shape[axis] - 1)
+    if not inside.all():
+        grid = np.stack(np.meshgrid(*axes_positions, indexing="ij"), axis=-1).reshape(-1, 3)
+        for origin, coefficient in zip(origins[~inside], coefficients[~inside]):
+            potential += (coefficient / np.linalg.norm(grid - origin, axis=1)).reshape(shape)
+    if not inside.any():
+        return potential
+
+    # Offsets between nodes along every gridded axis, in the wrap-around order of the padded FFT
+    padded_shape = tuple(2 * shape[axis] for axis in gridded)
+    offsets = [np.fft.fftfreq(2 * shape[axis], 1 / (2 * shape[axis])) * spacings[axis] for axis in gridded]
+    squared_distances = sum(np.meshgrid(*(offset**2 for offset in offsets), indexing="ij", sparse=True))
+    gridded_shape = [shape[axis] for axis in gridded]
+    members = np.flatnonzero(inside)
+
+    # Sources sharing the same offset along the non-gridded axes share the same kernel. A convolution per offset is
+    # exact, but sources at distinct heights above a plane would each need their own convolution, so they are then
+    # deposited in layers along the plane's normal, spaced as the grid's nodes
+    planar_offsets = origins[members][:, planar] - starts[planar]
+    groups, group_indices = np.unique(planar_offsets, axis=0, return_inverse=True)
+    group_indices = np.ravel(group_indices)
+    layer_count = len(groups)
+    if len(planar) == 1 and len(gridded) == 2:
+        layer_spacing = spacings[gridded].min()
+        layer_nodes = planar_offsets[:, 0] / layer_spacing
+        first_layer = np.floor(min(layer_nodes.min(), 0))
+        layer_count = min(layer_count, int(np.ceil(max(layer_nodes.max(), 0)) - first_layer) + 1)
+    # A convolution costs more than the direct sum of a source, so the direct sum is used for fewer than two sources
+    # per convolution
+    if 2 * layer_count > len(members):
+        grid = np.stack(np.meshgrid(*axes_positions, indexing="ij"), axis=-1).reshape(-1, 3)
+        for origin, coefficient in zip(origins[members], coefficients[members]):
+            potential += (coefficient / np.linalg.norm(grid - origin, axis=1)).reshape(shape)
+        return potential
+
+    if layer_count < len(groups):
+        layer_offsets = ((first_layer + np.arange(layer_count)) * layer_spacing)[:, None]
+        densities = np.zeros(padded_shape + (layer_count,))
+        _deposit(
+            densities, np.column_stack((nodes[members][:, gridded], layer_nodes - first_layer)),
+            coefficients[members], gridded_shape + [layer_count]
+        )
+        layers = ((offset, densities[..., layer]) for layer, offset in enumerate(layer_offsets))
+    else:
+        def get_density(group: int) -> np.ndarray:
+            density = np.zeros(padded_shape)
+            group_members = members[group_indices == group]
+            _deposit(density, nodes[group_members][:, gridded], coefficients[group_members], gridded_shape)
+            return density
+        layers = ((offset, get_density(group)) for group, offset in enumerate(groups))
+
+    # The convolutions of every layer are summed in Fourier space, so a single inverse transform is needed
+    axes = tuple(range(len(padded_shape)))
+    transform = 0
+    for planar_offset, density in layers:
+        with np.errstate(divide="ignore"):
+            kernel = 1 / np.sqrt(squared_distances + np.sum(planar_offset**2))
+        if not np.isfinite(kernel.flat[0]):
+            kernel.flat[0] = 2 / spacings[gridded].min()
+        transform = transform + np.fft.rfftn(density, axes=axes) * np.fft.rfftn(kernel, axes=axes)
+    convolution = np.fft.irfftn(transform, s=padded_shape, axes=axes)
+    potential += convolution[tuple(slice(shape[axis]) for axis in gridded)].reshape(shape)
+    return potential
+
+
+def _deposit(density: np.ndarray, nodes: np.ndarray, coefficients: np.ndarray, shape: list):
+    """
+    Adds the coefficients of sources to the nodes around them with cloud-in-cell weights, which are the products of
+    the linear interpolation weights along every axis.
+    """
+    lower = np.minimum(np.floor(nodes).astype(int), np.array(shape) - 2)
+    fractions = nodes - lower
+    for corner in np.ndindex(*(2,) * len(shape)):
+        weights = np.prod(np.where(np.array(corner), fractions, 1 - fractions), axis=1)
+        np.add.at(density, tuple((lower + corner).T), coefficients * weights)
@@ -0,0 +1,92 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+class TrajectoryBuffer:
+    """
+    Class used to record the positions of a body in a preallocated (T,3) float64 array, which grows geometrically
+    when it is full. Recording a position copies its three components in the array instead of keeping an object per
+    position.
+    """
+
+    def __init__(self, positions=None, capacity: int = 0):
+        """
+        Defines the required parameters.
+
+        Parameters
+        ----------
+        positions : list | np.ndarray
+            The positions with which to start the trajectory. An array of float64 is used without being copied, as it
+            is only written to after being reallocated. Defaults to None, which starts an empty trajectory.
+        capacity : int
+            The number of positions for which to allocate memory. Defaults to 0, which only allocates the given
+            positions.
+        """
+
+        if positions is None:
+            positions = np.zeros((0, 3))
+        self._data = np.asarray(positions, dtype=np.float64).reshape(-1, 3)
+        self.length = len(self._data)
+        self.reserve(capacity)
+
+    def __len__(self) -> int:
+        return self.length
+
+    def __getstate__(self) -> dict:
+        # Only the recorded positions are pickled
+        return {"positions": self.array}
+
+    def __setstate__(self, state: dict):
+        self.__init__(state["positions"])
+
+    @property
+    def array(self) -> np.ndarray:
+        """
+        Gives the recorded positions.
+
+        Returns
+        -------
+        positions : np.ndarray
+            The (T,3) view of the recorded positions, which is valid until the next reallocation.
+        """
+
+        return self._data[:self.length]
+
+    @property
+    def capacity(self) -> int:
+        """
+        Gives the number of positions that can be recorded without reallocating.
+        """
+
+        return len(self._data)
+
+    def reserve(self, capacity: int):
+        """
+        Allocates memory for a number of positions, if it is not already allocated.
+
+        Parameters
+        ----------
+        capacity : int
+            The total number of positions that the trajectory should hold.
+        """
+
+        if capacity > self.capacity:
+            data = np.empty((capacity, 3), dtype=np.float64)
+            data[:self.length] = self._data[:self.length]
+            self._data = data
+
+    def append(self, position):
+        """
+        Records a position.
+
+        Parameters
+        ----------
+        position : Vector | np.ndarray
+            The position to record.
+        """
+
+        if self.length == self.capacity:
+            self.reserve(max(2 * self.capacity, 16))
+        self._data[self.length] = position
+        self.length += 1
@@ -0,0 +1,66 @@
+from __future__ import annotations
+
+import numpy as np
+
+
+def encode(positions: np.ndarray, resolution: float) -> dict:
+    """
+    Encodes a trajectory in a compact form that generic compressors handle well. The positions are quantized to
+    multiples of the resolution relative to the first position, and the second differences of the quantized values
+    are stored, which are small integers along smooth trajectories. Those are stored in the smallest integer type that
+    holds them, with the bytes of equal significance grouped together (byte-shuffle) so that their long runs of zeros
+    are compressed by the gzip file in which the trajectory is saved.
+
+    Parameters
+    ----------
+    positions : np.ndarray
+        The (T,3) array of the trajectory's positions.
+    resolution : float
+        The quantization step, in the positions' unit. Every decoded coordinate is within half of it of the original.
+
+    Returns
+    -------
+    encoded_trajectory : dict
+        The encoded trajectory, to be given to decode.
+    """
+    positions = np.asarray(positions, dtype=float).reshape(-1, 3)
+    reference = positions[0].copy() if len(positions) else np.zeros(3)
+    quantized = np.round((positions - reference) / resolution).astype(np.int64)
+    # Second differences along the time axis, each coordinate being stored contiguously. The first two are the
+    # quantized first and second positions, which are kept apart as the second one is not small
+    differences = np.diff(np.diff(quantized.T, axis=1, prepend=0), axis=1, prepend=0)
+    start, differences = differences[:, :2], differences[:, 2:]
+    # Zigzag encoding maps the small negative values to small unsigned values: 0, -1, 1, -2... -> 0, 1, 2, 3...
+    zigzag = ((differences << 1) ^ (differences >> 63)).astype(np.uint64)
+    maximum = int(zigzag.max()) if zigzag.size else 0
+    dtype = next(dtype for dtype in (np.uint8, np.uint16, np.uint32, np.uint64) if maximum <= np.iinfo(dtype).max)
+    payload = zigzag.astype(dtype).ravel().view(np.uint8).reshape(-1, np.dtype(dtype).itemsize).T.tobytes()
+    return {
+        "reference": reference,
+        "resolution": resolution,
+        "start": start,
+        "dtype": np.dtype(dtype).str,
+        "payload": payload
+    }
+
+
+def decode(encoded_trajectory: dict) -> np.ndarray:
+    """
+    Decodes a trajectory encoded with the encode function.
+
+    Parameters
+    ----------
+    encoded_trajectory : dict
+        The encoded trajectory.
+
+    Returns
+    -------
+    positions : np.ndarray
+        The (T,3) array of the decoded positions.
+    """
+    dtype = np.dtype(encoded_trajectory["dtype"])
+    shuffled = np.frombuffer(encoded_trajectory["payload"], dtype=np.uint8).reshape(dtype.itemsize, -1)
+    zigzag = shuffled.T.copy().view(dtype).astype(np.int64).reshape(3, -1)
+    differences = np.concatenate((encoded_trajectory["start"], (zigzag >> 1) ^ -(zigzag & 1)), axis=1)
+    quantized = np.cumsum(np.cumsum(differences, axis=1), axis=1)
+    return quantized.T * encoded_trajectory["resolution"] + encoded_trajectory["reference"]
@@ -0,0 +1,41 @@
+from pickle import dumps, loads
+
+import numpy as np
+
+from src.tools.acceleration_table import AccelerationTable
+
+
+def get_errors(table: AccelerationTable, positions: np.ndarray) -> np.ndarray:
+    """
+    Gives the error of the table's accelerations at the given positions, relative to the sum of the magnitudes of the
+    accelerations caused by each source.
+    """
+
+    exact = table.get_direct_accelerations(positions)
+    distances = np.linalg.norm(positions[:, None, :] - table.source_positions[None, :, :], axis=2)
+    scales = (np.abs(table.source_coefficients) / distances**2).sum(axis=1)
+    return np.linalg.norm(table.get_accelerations(positions) - exact, axis=1) / scales
+
+
+def test_error_within_tolerance():
+    rng = np.random.default_rng(0)
+    for tolerance in (1e-1, 1e-2, 1e-3):
+        table = AccelerationTable(rng.uniform(-100, 100, (3, 3)), rng.uniform(1, 10, 3), 200, tolerance, levels=6)
+        errors = get_errors(table, rng.uniform(-250, 250, (20000, 3)))
+        assert errors.max() <= tolerance
+        assert (table.grid_indices >= 0).any()
+
+
+def test_positions_outside_grids_are_exact():
+    table = AccelerationTable(np.zeros((1, 3)), np.ones(1), 10, levels=3)
+    positions = np.array([[20., 0, 0], [0, 0, 1e-3], [0, -50, 50]])
+    assert np.allclose(table.get_accelerations(positions), table.get_direct_accelerations(positions))
+    assert not len(table.grids)
+
+
+def test_grids_are_not_pickled():
+    table = AccelerationTable(np.zeros((1, 3)), np.ones(1), 10)
+    table.get_accelerations(np.array([[6., 0, 0]]))
+    copy = loads(dumps(table))
+    assert len(table.grids) and not len(copy.grids)
+    assert (copy.grid_indices == -1).all()
@@ -0,0 +1,70 @@
+import numpy as np
+
+from src.bodies.gravitational_body import GravitationalBody
+from src.simulator.lambda_func import Lambda
+from src.systems.base_system import BaseSystem
+from src.systems.vectorized_system import VectorizedSystem
+from src.tools.adaptive_integrator import hermite_interpolate, integrate_adaptive
+from src.tools.vector import Vector
+
+
+def kepler_acceleration(times: np.ndarray, positions: np.ndarray) -> np.ndarray:
+    """
+    Gives the acceleration caused by a unit source at the origin.
+    """
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return -positions / np.linalg.norm(positions, axis=1, keepdims=True)**3
+
+
+def test_circular_orbit():
+    # Circular orbits of radius 1 and 2 over a quarter of the first one's period
+    positions, velocities = np.array([[1., 0, 0], [2, 0, 0]]), np.array([[0., 1, 0], [0, 2**-0.5, 0]])
+    positions, velocities, steps, evaluations = integrate_adaptive(
+        positions, velocities, np.pi / 2, kepler_acceleration, 1e-8
+    )
+    assert np.allclose(positions[0], [0, 1, 0], atol=1e-6)
+    assert np.allclose(np.linalg.norm(positions, axis=1), [1, 2], atol=1e-6)
+    assert np.all(steps <= np.pi / 2)
+    assert evaluations > 12
+
+
+def test_body_on_source_is_abandoned():
+    positions, velocities = np.array([[0., 0, 0], [1, 0, 0]]), np.array([[0., 0, 0], [0, 1, 0]])
+    positions, velocities, steps, _ = integrate_adaptive(positions, velocities, 1, kepler_acceleration, 1e-8)
+    assert np.isnan(positions[0]).all() and np.isnan(velocities[0]).all() and np.isnan(steps[0])
+    assert np.allclose(positions[1], [np.cos(1), np.sin(1), 0], atol=1e-6)
+
+    # An abandoned body is not advanced again
+    _, _, _, evaluations = integrate_adaptive(positions[:1], velocities[:1], 1, kepler_acceleration, 1e-8)
+    assert evaluations == 0
+
+
+def test_minimum_step_bounds_substeps():
+    positions, velocities = np.array([[1e-3, 0, 0], [1, 0, 0]]), np.zeros((2, 3))
+    positions, _, _, evaluations = integrate_adaptive(
+        positions, velocities, 1, kepler_acceleration, 1e-12, minimum_step=1e-3
+    )
+    assert np.isnan(positions[0]).all() and np.isfinite(positions[1]).all()
+    assert evaluations < 6 * 2 * 1000
+
+
+def test_abandoned_bodies_are_removed_as_dead():
+    for system_class in (BaseSystem, VectorizedSystem):
+        system = system_class([
+            GravitationalBody(5.972e27, Vector(450, 450, 0), fixed=True),
+            GravitationalBody(1, Vector(450, 450, 0), Vector(0, 0, 0), has_potential=False),
+            GravitationalBody(1, Vector(600, 450, 0), Vector(0, 1e-3, 0), has_potential=False)
+        ])
+        system.update(5000, tolerance=1e-6)
+        system.remove_dead_bodies(1e10, Lambda("lambda x, y, z: True", 3))
+        assert system.alive_bodies_count == 1
+        assert [body.death_step for body in system.dead_bodies] == [1]
+
+
+def test_hermite_interpolation_of_a_cubic():
+    # x(t) = t**3 - t, whose velocity is 3t**2 - 1
+    times = np.linspace(0, 2, 9)
+    interpolated = hermite_interpolate(
+        np.array([[0., 0, 0]]), np.array([[-1., 0, 0]]), np.array([[6., 0, 0]]), np.array([[11., 0, 0]]), 2, times
+    )
+    assert np.allclose(interpolated[:, 0, 0], times**3 - times)
@@ -0,0 +1,48 @@
+import numpy as np
+
+from src.fields.scalar_field import ScalarField
+from src.tools.vector import Vector
+
+
+def get_arrays(field: ScalarField) -> tuple:
+    return field.powers.copy(), field.coefficients.copy(), field.origins.copy()
+
+
+def assert_unchanged(field: ScalarField, arrays: tuple):
+    assert len(field) == len(arrays[0])
+    for field_array, array in zip((field.powers, field.coefficients, field.origins), arrays):
+        assert np.array_equal(field_array, array)
+
+
+def test_operations_do_not_modify_operands():
+    first = ScalarField([(-1, -5000, Vector(450, 450, 0)), (-1, -20, Vector(600, 450, 0))])
+    second = ScalarField([(-1, -20, Vector(600, 450, 0)), (2, 3, Vector(0, 0, 0))])
+    first_arrays, second_arrays = get_arrays(first), get_arrays(second)
+
+    total = first + second
+    assert isinstance(total, ScalarField) and len(total) == 4
+    difference = first - second
+    # The common term is removed and the other term of the second field is added with an opposite coefficient
+    assert difference.terms == [(-1, -5000, Vector(450, 450, 0)), (2, -3, Vector(0, 0, 0))]
+    without_term = first.without_term(0)
+    assert without_term.terms == [(-1, -20, Vector(600, 450, 0))]
+    scaled = 2 * first
+    assert np.array_equal(scaled.coefficients, [-10000, -40])
+    assert_unchanged(first, first_arrays)
+    assert_unchanged(second, second_arrays)
+
+    # The results do not share storage with the operands
+    total.append(-1, 1, Vector(1, 1, 1))
+    without_term.append(-1, 1, Vector(1, 1, 1))
+    scaled.coefficients[:] = 0
+    assert_unchanged(first, first_arrays)
+    assert_unchanged(second, second_arrays)
+
+
+def test_append_grows_storage():
+    field = ScalarField()
+    for i in range(10):
+        field.append(-1, i, Vector(i, 0, 0))
+    assert len(field) == 10
+    assert np.array_equal(field.coefficients, np.arange(10))
+    assert np.array_equal(field.origins[:, 0], np.arange(10))
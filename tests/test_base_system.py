@@ -0,0 +1,85 @@
+from pickle import dumps, loads
+
+import numpy as np
+import pytest
+
+from src.bodies.gravitational_body import GravitationalBody
+from src.simulator.lambda_func import Lambda
+from src.systems.base_system import BaseSystem
+from src.systems.vectorized_system import VectorizedSystem
+from src.tools.vector import Vector
+
+
+def get_bodies() -> list:
+    """
+    Creates a fixed sun, two moving planets and two test bodies, the first test body being outside of (0,900).
+    """
+    return [
+        GravitationalBody(1, Vector(-10, 450, 0), Vector(0, 0, 0), has_potential=False),
+        GravitationalBody(5.972e27, Vector(450, 450, 0), fixed=True),
+        GravitationalBody(5.972e25, Vector(600, 450, 0), Vector(0, 1e-3, 0)),
+        GravitationalBody(5.972e25, Vector(300, 450, 0), Vector(0, -1e-3, 0)),
+        GravitationalBody(1, Vector(450, 600, 0), Vector(-1e-3, 0, 0), has_potential=False)
+    ]
+
+
+def get_positions(system: BaseSystem) -> np.ndarray:
+    return np.array([tuple(body.position) for body in system.moving_bodies])
+
+
+def test_update_matches_vectorized_system():
+    system, vectorized_system = BaseSystem(get_bodies()), VectorizedSystem(get_bodies())
+    pickled_system = loads(dumps(BaseSystem(get_bodies())))
+    for _ in range(20):
+        for updated_system in (system, vectorized_system, pickled_system):
+            updated_system.update(5000)
+    assert np.allclose(get_positions(system), vectorized_system.positions[~vectorized_system.fixed_mask])
+    assert np.array_equal(get_positions(system), get_positions(pickled_system))
+
+
+def test_update_after_removing_bodies():
+    # Removing the first test body shifts the moving planets, whose terms must still be excluded from their own field
+    system, reference_system = BaseSystem(get_bodies()), BaseSystem(get_bodies()[1:])
+    system.remove_dead_bodies(1e10, Lambda("lambda x, y, z: (0 < x < 900) and (0 < y < 900)", 3))
+    assert len(system.moving_bodies) == 3
+    for _ in range(20):
+        system.update(5000)
+        reference_system.update(5000)
+    assert np.array_equal(get_positions(system), get_positions(reference_system))
+
+
+def test_current_potential_is_a_snapshot():
+    system = BaseSystem(get_bodies())
+    potential = system.current_potential
+    origins = potential.origins.copy()
+    system.update(5000)
+    assert np.array_equal(potential.origins, origins)
+    assert not np.array_equal(system.current_potential.origins, origins)
+
+
+@pytest.mark.parametrize("system_class", [BaseSystem, VectorizedSystem])
+def test_dead_bodies_are_removed_at_once(system_class):
+    system = system_class(get_bodies() + [
+        # Close enough to the sun for its potential gradient to exceed the limit
+        GravitationalBody(1, Vector(451, 450, 0), Vector(0, 0, 0), has_potential=False),
+        GravitationalBody(1, Vector(450, 300, 0), Vector(0, 0, 0), has_potential=False)
+    ])
+    body_alive_func = Lambda("lambda x, y, z: (0 < x < 900) and (0 < y < 900)", 3)
+    test_bodies = [body for body in system.list_of_bodies if not body.has_potential]
+    for _ in range(3):
+        system.update(5000)
+    system.remove_dead_bodies(1e-11, body_alive_func)
+    assert system.dead_bodies == test_bodies[:1] + test_bodies[2:3]
+    assert all(body.death_step == 3 for body in system.dead_bodies)
+    assert system.alive_bodies_count == 2
+
+    # The remaining bodies are still integrated and a body abandoned by the adaptive integrator dies at the next check
+    if system_class is BaseSystem:
+        test_bodies[3]._position = Vector(np.nan, np.nan, np.nan)
+    else:
+        system.positions[system._bodies.index(test_bodies[3])] = np.nan
+    system.update(5000)
+    system.remove_dead_bodies(1e-11, body_alive_func)
+    assert system.dead_bodies[2:] == test_bodies[3:4] and test_bodies[3].death_step == 4
+    assert [body for body in system.moving_bodies if not body.has_potential] == test_bodies[1:2]
+    assert system.alive_bodies_count == 1
@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.bodies.computed_body import ComputedBody
+from src.simulator.body_index import BodyIndex
+from src.simulator.pickle_storage import PickleReader, PickleWriter
+from src.tools.vector import Vector
+
+
+def get_body(i: int, type: str, time_survived: float) -> ComputedBody:
+    return ComputedBody(np.full((i+1, 3), float(i)), type, time_survived, mass=1, position=Vector(i, 0, 0),
+                        velocity=Vector(0, i, 0), has_potential=False)
+
+
+def write_bodies(foldername: str) -> list[ComputedBody]:
+    """
+    Writes bodies in three gzip members, as done by a dispatch that flushes after every result.
+    """
+    bodies = [
+        get_body(0, "alive", 100), get_body(1, "dead", 20), get_body(2, "dead", 60),
+        get_body(3, "alive", 100), get_body(4, "dead", 80), get_body(5, "dead", 10)
+    ]
+    with PickleWriter(foldername) as writer:
+        for i, body in enumerate(bodies):
+            writer.write(body, body.type)
+            if i % 2:
+                writer.flush()
+    return bodies
+
+
+def test_select_and_bodies_info(tmp_path):
+    bodies = write_bodies(str(tmp_path))
+    index = BodyIndex.load(f"{tmp_path}/bodies_info.npz")
+    assert len(index) == len(bodies)
+    assert np.array_equal(index.select(min_time_survived=60), [0, 2, 3, 4])
+    assert np.array_equal(index.select(min_time_survived=60, types=["dead"]), [2, 4])
+    assert np.array_equal(index.select(), np.arange(6))
+    assert np.array_equal(index.get_bodies_info([1, 4]), [body.get_info() for body in (bodies[1], bodies[4])])
+    assert np.array_equal(index.subset([1, 4])["time_survived"], [20, 80])
+
+
+def test_reader_decompresses_requested_bodies(tmp_path):
+    bodies = write_bodies(str(tmp_path))
+    reader = PickleReader(str(tmp_path))
+    assert len(np.unique(reader.index["member_offsets"])) == 3
+    # The bodies are read in any order, within a member and across members
+    for indices in [[4, 2, 5], [0, 1, 3], [5, 5]]:
+        loaded = reader.get_bodies(indices)
+        assert [int(body.initial_position.x) for body in loaded] == indices
+        assert [len(body.positions) for body in loaded] == [len(bodies[i].positions) for i in indices]
+
+    # Without their trajectories, the bodies are created from the index
+    unloaded = reader.get_bodies([2, 4], load_positions=False)
+    assert [len(body.positions) for body in unloaded] == [0, 0]
+    assert [body.time_survived for body in unloaded] == [60, 80]
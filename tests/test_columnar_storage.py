@@ -0,0 +1,68 @@
+import numpy as np
+
+from src.bodies.computed_body import ComputedBody
+from src.simulator.columnar_storage import ColumnarReader, ColumnarWriter
+from src.tools.vector import Vector
+
+
+def get_bodies() -> list[ComputedBody]:
+    """
+    Creates bodies with trajectories of different lengths, one of which is empty.
+    """
+    rng = np.random.default_rng(0)
+    bodies = []
+    for i, length in enumerate([5, 0, 12, 3]):
+        body = ComputedBody(
+            rng.normal(size=(length, 3)), "dead" if i == 2 else "alive", time_survived=1000.*length, mass=i+1,
+            position=Vector(i, 2*i, 0), velocity=Vector(0, i, 0), fixed=False, has_potential=i == 0
+        )
+        if i == 2:
+            body.death_step = 11
+        bodies.append(body)
+    return bodies
+
+
+def assert_same_body(loaded: ComputedBody, body: ComputedBody):
+    assert np.array_equal(loaded.positions, np.asarray(body.positions).reshape(-1, 3))
+    assert loaded.type == body.type
+    assert loaded.time_survived == body.time_survived
+    assert loaded.mass == body.mass
+    assert tuple(loaded.initial_position) == tuple(body.initial_position)
+    assert tuple(loaded.initial_velocity) == tuple(body.initial_velocity)
+    assert loaded.has_potential == body.has_potential
+    assert getattr(loaded, "death_step", None) == getattr(body, "death_step", None)
+
+
+def test_round_trip(tmp_path):
+    bodies = get_bodies()
+    with ColumnarWriter(str(tmp_path)) as writer:
+        for body in bodies:
+            writer.write(body, body.type)
+    assert ColumnarReader.exists(str(tmp_path))
+
+    reader = ColumnarReader(str(tmp_path))
+    assert len(reader) == len(bodies)
+    for loaded, body in zip(reader.get_bodies(), bodies):
+        assert_same_body(loaded, body)
+    # The trajectories are views of the memory-mapped positions file
+    assert isinstance(reader.get_positions(2).base, np.memmap)
+    assert len(reader.get_body(2, load_positions=False).positions) == 0
+    assert np.array_equal(reader.index.select(types=["dead"]), [2])
+
+
+def test_resume_keeps_first_bodies(tmp_path):
+    bodies = get_bodies()
+    with ColumnarWriter(str(tmp_path)) as writer:
+        for body in bodies[:2]:
+            writer.write(body, body.type)
+        # The bodies written after the checkpoint are discarded when resuming
+        writer.write(bodies[3], "lost")
+
+    with ColumnarWriter(str(tmp_path), bodies_count=2) as writer:
+        for body in bodies[2:]:
+            writer.write(body, body.type)
+
+    reader = ColumnarReader(str(tmp_path))
+    assert len(reader) == len(bodies)
+    for loaded, body in zip(reader.get_bodies(), bodies):
+        assert_same_body(loaded, body)
@@ -0,0 +1,65 @@
+import numpy as np
+
+from src.bodies.computed_body import ComputedBody
+from src.systems.computed_system import ComputedSystem
+from src.tools.vector import Vector
+
+
+def get_system(lengths: list[int], tick_factor: float = 2) -> ComputedSystem:
+    """
+    Creates a system of bodies moving along the x axis by one unit per sample, with trajectories of given lengths.
+    """
+    bodies = [
+        ComputedBody(
+            np.column_stack((np.arange(length), np.zeros(length), np.zeros(length))).astype(float), "dead", mass=1,
+            position=Vector(0, 0, 0), velocity=Vector(0, 0, 0), has_potential=False
+        ) for length in lengths
+    ]
+    return ComputedSystem(bodies, tick_factor=tick_factor)
+
+
+def test_seek_interpolates_between_samples():
+    system = get_system([3, 5])
+    system.seek(3)
+    assert np.allclose(system.playback_positions[:, 0], [1.5, 1.5])
+    assert not system.dead_mask.any()
+
+
+def test_seek_at_last_sample_of_longest_body():
+    system = get_system([3, 5])
+    system.seek(system.duration)
+    assert system.duration == 8
+    assert np.allclose(system.playback_positions[:, 0], [2, 4])
+    assert system.dead_mask.tolist() == [True, False]
+
+
+def test_seek_past_end_marks_every_body_dead():
+    system = get_system([3, 5])
+    system.seek(system.duration + 1)
+    assert system.dead_mask.all()
+    system.seek(1e9)
+    assert system.dead_mask.all()
+    assert system.playback_time == system.duration + system.tick_factor
+
+
+def test_seek_before_start_is_clamped():
+    system = get_system([3, 5])
+    system.seek(-10)
+    assert system.playback_time == 0
+    assert np.allclose(system.playback_positions[:, 0], [0, 0])
+    assert not system.dead_mask.any()
+
+
+def test_reverse_from_end_revives_bodies():
+    system = get_system([3, 5])
+    system.seek(1e9)
+    system.reverse()
+    system.update(system.tick_factor)
+    assert system.playback_time == system.duration
+    assert system.dead_mask.tolist() == [True, False]
+    system.update(1e9)
+    assert system.playback_time == 0
+    assert not system.dead_mask.any()
+    system.reverse()
+    system.update(1)
+    assert system.playback_time == 1
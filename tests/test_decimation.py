@@ -0,0 +1,39 @@
+import numpy as np
+
+from src.tools.decimation import decimate, reconstruct
+
+
+def get_trajectory(samples: int) -> np.ndarray:
+    """
+    Creates a trajectory made of a circular orbit followed by a straight escape.
+    """
+    angles = np.linspace(0, 2 * np.pi, samples // 2)
+    orbit = np.column_stack((150 * np.cos(angles), 150 * np.sin(angles), np.zeros(len(angles))))
+    escape = orbit[-1] + np.outer(np.arange(1, samples - len(angles) + 1), [0, 2, 0])
+    return np.concatenate((orbit, escape))
+
+
+def test_reconstruction_within_tolerance():
+    positions = get_trajectory(2000)
+    for tolerance in (1, 1e-2, 1e-4):
+        sample_indices = decimate(positions, tolerance)
+        reconstructed = reconstruct(sample_indices, positions[sample_indices])
+        assert reconstructed.shape == positions.shape
+        assert np.linalg.norm(reconstructed - positions, axis=1).max() <= tolerance
+
+
+def test_keeps_ends_and_drops_straight_segments():
+    positions = get_trajectory(2000)
+    sample_indices = decimate(positions, 1e-2)
+    assert sample_indices[0] == 0 and sample_indices[-1] == len(positions) - 1
+    assert np.all(np.diff(sample_indices) > 0)
+    # The straight escape needs no sample besides its ends
+    assert np.count_nonzero(sample_indices > 1000) == 1
+
+
+def test_short_trajectories():
+    for length in (0, 1, 2):
+        positions = get_trajectory(4)[:length]
+        sample_indices = decimate(positions, 1e-2)
+        assert sample_indices.tolist() == list(range(length))
+        assert np.array_equal(reconstruct(sample_indices, positions[sample_indices]), positions)
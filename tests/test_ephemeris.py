@@ -0,0 +1,70 @@
+import numpy as np
+import pytest
+
+from src.bodies.fake_body import L4Body
+from src.bodies.gravitational_body import GravitationalBody
+from src.simulator.ephemeris import Ephemeris
+from src.simulator.simulation_mother import SimulationMother
+from src.systems.base_system import BaseSystem
+from src.tools.vector import Vector
+
+
+def get_system(test_body: bool = True, fake_bodies: bool = True) -> BaseSystem:
+    """
+    Creates a system of a fixed sun, a moving earth and optionally a test body and the L4 point.
+    """
+    bodies = [
+        GravitationalBody(5.972e27, Vector(450, 450, 0), fixed=True),
+        GravitationalBody(5.972e24, Vector(600, 450, 0), Vector(0, 1e-3, 0))
+    ]
+    if test_body:
+        bodies.append(GravitationalBody(1, Vector(450, 600, 0), Vector(-1e-3, 0, 0), has_potential=False))
+    if fake_bodies:
+        bodies.append(L4Body())
+    return BaseSystem(bodies)
+
+
+def test_system_with_ephemeris_matches_integration():
+    system, reference_system = get_system(), get_system()
+    ephemeris = Ephemeris.compute(system, 5000, 50000)
+    assert ephemeris.positions.shape == (11, 1, 3)
+    system.set_ephemeris(ephemeris)
+    for _ in range(10):
+        system.update(5000)
+        reference_system.update(5000)
+    for body, reference_body in zip(system.list_of_bodies, reference_system.list_of_bodies):
+        assert np.allclose(tuple(body.position), tuple(reference_body.position))
+
+
+def test_interpolated_states():
+    ephemeris = Ephemeris.compute(get_system(), 5000, 50000)
+    positions, velocities = ephemeris.get_states(np.array([0, 5000, 50000]))
+    assert np.array_equal(positions[:, 0], ephemeris.positions[[0, 1, 10], 0])
+    assert np.array_equal(velocities[:, 0], ephemeris.velocities[[0, 1, 10], 0])
+    # Halfway between two samples of a slow orbit, the state is close to the mean of the samples
+    position, velocity = ephemeris.get_state(7500)
+    assert np.allclose(position, ephemeris.positions[1:3].mean(axis=0), rtol=1e-6)
+    assert np.allclose(velocity, ephemeris.velocities[1:3].mean(axis=0), rtol=1e-3)
+
+
+@pytest.mark.parametrize("use_ephemeris", [True, False])
+def test_dispatch_without_fake_bodies(tmp_path, use_ephemeris):
+    save_foldername = SimulationMother(get_system(test_body=False, fake_bodies=False)).dispatch(
+        simulation_count=2, bodies_per_simulation=1, body_initial_position_limits=[(100, 200), (100, 200), (0, 0)],
+        body_initial_velocity_limits=[(0, 0), (0, 0), (0, 0)], save_foldername=str(tmp_path / "run"),
+        simulation_duration=50000, delta_time=5000, positions_saving_frequency=2, batched=True,
+        use_ephemeris=use_ephemeris
+    )
+    with np.load(f"{save_foldername}/bodies_info.npz") as file:
+        assert file["types"].tolist() == ["attractive_moving", "alive", "alive"]
+
+
+def test_dispatch_does_not_use_ephemeris_by_default(tmp_path, monkeypatch):
+    def compute(*args, **kwargs):
+        raise AssertionError("The ephemeris should only be computed when use_ephemeris is True")
+    monkeypatch.setattr(Ephemeris, "compute", compute)
+    SimulationMother(get_system(test_body=False)).dispatch(
+        simulation_count=2, bodies_per_simulation=1, body_initial_position_limits=[(100, 200), (100, 200), (0, 0)],
+        body_initial_velocity_limits=[(0, 0), (0, 0), (0, 0)], save_foldername=str(tmp_path / "run"),
+        simulation_duration=50000, delta_time=5000, positions_saving_frequency=2, batched=True
+    )
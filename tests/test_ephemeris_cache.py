@@ -0,0 +1,54 @@
+import numpy as np
+
+from src.bodies.fake_body import L4Body
+from src.bodies.gravitational_body import GravitationalBody
+from src.simulator.ephemeris import Ephemeris
+from src.simulator.ephemeris_cache import EphemerisCache
+from src.systems.base_system import BaseSystem
+from src.tools.vector import Vector
+
+
+def get_system(earth_speed: float = 1e-3) -> BaseSystem:
+    """
+    Creates a system of a fixed sun, a moving earth and the L4 point.
+    """
+    return BaseSystem([
+        GravitationalBody(5.972e27, Vector(450, 450, 0), fixed=True),
+        GravitationalBody(5.972e24, Vector(600, 450, 0), Vector(0, earth_speed, 0)),
+        L4Body()
+    ])
+
+
+def test_miss_then_hit(tmp_path, monkeypatch):
+    cache = EphemerisCache(str(tmp_path / "ephemerides"))
+    system = get_system()
+    key = EphemerisCache.get_key(system, 5000, 50000)
+    assert cache.load(key) is None
+    computed = cache.get(system, 5000, 50000)
+    assert (tmp_path / "ephemerides" / f"{key}.gz").exists()
+
+    # A hit loads the saved ephemeris instead of computing it
+    def compute(*args, **kwargs):
+        raise AssertionError("The ephemeris should be loaded from the cache")
+    monkeypatch.setattr(Ephemeris, "compute", compute)
+    loaded = cache.get(get_system(), 5000, 50000)
+    assert np.array_equal(loaded.positions, computed.positions)
+    assert np.array_equal(loaded.velocities, computed.velocities)
+
+
+def test_test_bodies_do_not_change_key():
+    system = get_system()
+    with_test_body = BaseSystem(system.list_of_bodies + [
+        GravitationalBody(1, Vector(150, 150, 0), has_potential=False)
+    ])
+    assert EphemerisCache.get_key(system, 5000, 50000) == EphemerisCache.get_key(with_test_body, 5000, 50000)
+
+
+def test_arguments_change_key():
+    key = EphemerisCache.get_key(get_system(), 5000, 50000)
+    assert key != EphemerisCache.get_key(get_system(2e-3), 5000, 50000)
+    assert key != EphemerisCache.get_key(get_system(), 2500, 50000)
+    assert key != EphemerisCache.get_key(get_system(), 5000, 100000)
+    assert key != EphemerisCache.get_key(get_system(), 5000, 50000, tolerance=1e-6)
+    assert key != EphemerisCache.get_key(get_system(), 5000, 50000, integrator="leapfrog")
+    assert key == EphemerisCache.get_key(get_system(), 5000, 50000, integrator=get_system().integrator)
@@ -0,0 +1,47 @@
+from pickle import dumps, loads
+
+import numpy as np
+import pytest
+
+from src.simulator.lambda_func import Lambda
+
+
+positions = np.random.default_rng(0).uniform(-10, 10, size=(200, 3))
+tracked_position = np.array([1., -2, 0.5])
+
+
+def get_expected_mask(function: Lambda, *tracked: np.ndarray) -> list[bool]:
+    return [bool(function(*position, *tracked)) for position in positions]
+
+
+@pytest.mark.parametrize("func_str", [
+    "lambda x, y, z: (0 < x < 5) and (-3 < y < 3)",
+    "lambda x, y, z: x > 8 or y < -8 or z == 0",
+    "lambda x, y, z: not (x > 0 and y > 0)",
+    "lambda x, y, z: -1 < x <= y < 4 != z",
+    "lambda x, y, z: (x**2 + y**2)**0.5 < 6 if z > 0 else abs(x) > 2",
+    "lambda x, y, z: True",
+    "lambda x, y, z: x"
+])
+def test_vectorized_function_matches_function(func_str):
+    function = Lambda(func_str, 3)
+    assert function.vectorized_func is not None
+    assert function.alive_mask(positions).tolist() == get_expected_mask(function)
+
+
+def test_vectorized_function_with_tracked_position():
+    function = Lambda("lambda x, y, z, t_x, t_y, t_z: 3 < ((x-t_x)**2 + (y-t_y)**2)**0.5 < 8", 6)
+    assert function.alive_mask(positions, tracked_position).tolist() == get_expected_mask(function, *tracked_position)
+
+
+def test_functions_that_cannot_be_vectorized_are_evaluated_per_body():
+    # int() cannot convert arrays, so the function is called for each body
+    function = Lambda("lambda x, y, z: int(x) > 3", 3)
+    assert function.alive_mask(positions).tolist() == get_expected_mask(function)
+
+
+def test_pickled_function_is_compiled_again():
+    function = Lambda("lambda x, y, z: not 0 < x < 5", 3)
+    function.alive_mask(positions)
+    copy = loads(dumps(function))
+    assert copy.alive_mask(positions).tolist() == get_expected_mask(function)
@@ -0,0 +1,38 @@
+import numpy as np
+
+from src.systems.vectorized_system import VectorizedSystem
+from src.tools.octree import Octree
+
+
+def get_sources(count: int) -> tuple[np.ndarray, np.ndarray]:
+    rng = np.random.default_rng(0)
+    return rng.uniform(0, 900, (count, 3)), rng.uniform(1, 10, count)
+
+
+def test_matches_direct_sum():
+    source_positions, source_coefficients = get_sources(500)
+    positions = np.random.default_rng(1).uniform(0, 900, (200, 3))
+    exact = VectorizedSystem.get_accelerations(positions, source_positions, source_coefficients)
+    tree = Octree(source_positions, source_coefficients)
+    for opening_angle, tolerance in ((0.2, 1e-3), (0.5, 1e-2)):
+        approximate = tree.get_accelerations(positions, opening_angle)
+        errors = np.linalg.norm(approximate - exact, axis=1) / np.linalg.norm(exact, axis=1)
+        assert np.median(errors) < tolerance
+    assert np.allclose(tree.get_accelerations(positions, 0), exact)
+
+
+def test_excluded_sources():
+    # Every point is on its own source, which is excluded
+    source_positions, source_coefficients = get_sources(100)
+    excluded_sources = np.arange(100)
+    exact = VectorizedSystem.get_accelerations(
+        source_positions, source_positions, source_coefficients, excluded_sources
+    )
+    approximate = Octree(source_positions, source_coefficients).get_accelerations(source_positions, 0, excluded_sources)
+    assert np.isfinite(approximate).all()
+    assert np.allclose(approximate, exact)
+
+
+def test_no_sources():
+    tree = Octree(np.zeros((0, 3)), np.zeros(0))
+    assert np.array_equal(tree.get_accelerations(np.ones((4, 3))), np.zeros((4, 3)))
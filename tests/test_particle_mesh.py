@@ -0,0 +1,76 @@
+import numpy as np
+
+from src.tools.particle_mesh import get_mesh_potential
+
+
+def get_direct_potential(axes_positions: tuple, coefficients: np.ndarray, origins: np.ndarray) -> np.ndarray:
+    grid = np.stack(np.meshgrid(*axes_positions, indexing="ij"), axis=-1)
+    distances = np.linalg.norm(grid[..., None, :] - origins, axis=-1)
+    return (coefficients / distances).sum(axis=-1)
+
+
+def test_plane_matches_direct_sum_away_from_sources():
+    axes_positions = (np.linspace(0, 900, 91), np.linspace(0, 900, 91), np.zeros(1))
+    rng = np.random.default_rng(0)
+    origins = np.column_stack((rng.uniform(300, 600, (5, 2)), np.zeros(5)))
+    coefficients = rng.uniform(1, 10, 5)
+    mesh = get_mesh_potential(axes_positions, coefficients, origins)
+    direct = get_direct_potential(axes_positions, coefficients, origins)
+    assert mesh.shape == (91, 91, 1)
+    # The potential is smoothed over a node around each source
+    grid = np.stack(np.meshgrid(*axes_positions, indexing="ij"), axis=-1)
+    far = np.linalg.norm(grid[..., None, :] - origins, axis=-1).min(axis=-1) > 50
+    errors = np.abs(mesh - direct)[far] / direct[far]
+    assert errors.max() < 1e-2
+
+
+def test_sources_outside_grid_are_exact():
+    axes_positions = (np.linspace(0, 100, 11), np.linspace(0, 100, 11), np.linspace(0, 100, 11))
+    origins = np.array([[200., 50, 50], [-50, -50, 300]])
+    coefficients = np.array([3., 5])
+    assert np.allclose(
+        get_mesh_potential(axes_positions, coefficients, origins),
+        get_direct_potential(axes_positions, coefficients, origins)
+    )
+
+
+def test_sources_off_the_plane():
+    axes_positions = (np.linspace(0, 900, 61), np.linspace(0, 900, 61), np.zeros(1))
+    # Two groups of sources at exact heights, each convolved with its own kernel
+    rng = np.random.default_rng(0)
+    origins = np.column_stack((rng.uniform(300, 600, (10, 2)), np.repeat([20., -20], 5)))
+    coefficients = rng.uniform(1, 10, 10)
+    mesh = get_mesh_potential(axes_positions, coefficients, origins)
+    direct = get_direct_potential(axes_positions, coefficients, origins)
+    assert (np.abs(mesh - direct) / direct).max() < 5e-2
+
+
+def test_many_sources_at_distinct_heights(monkeypatch):
+    axes_positions = (np.linspace(0, 900, 91), np.linspace(0, 900, 91), np.zeros(1))
+    rng = np.random.default_rng(0)
+    origins = np.column_stack((rng.uniform(100, 800, (500, 2)), rng.uniform(-30, 30, 500)))
+    coefficients = rng.uniform(1, 10, 500)
+    transforms = []
+    rfftn = np.fft.rfftn
+    def counted_rfftn(*args, **kwargs):
+        transforms.append(args[0].shape)
+        return rfftn(*args, **kwargs)
+    monkeypatch.setattr(np.fft, "rfftn", counted_rfftn)
+    mesh = get_mesh_potential(axes_positions, coefficients, origins)
+
+    # The sources are deposited in 7 layers 10 apart instead of needing a convolution each
+    assert len(transforms) == 2 * 7
+    direct = get_direct_potential(axes_positions, coefficients, origins)
+    assert np.median(np.abs(mesh - direct) / direct) < 1e-4
+
+
+def test_sources_at_too_many_heights_are_summed_directly(monkeypatch):
+    axes_positions = (np.linspace(0, 900, 31), np.linspace(0, 900, 31), np.zeros(1))
+    rng = np.random.default_rng(0)
+    origins = np.column_stack((rng.uniform(100, 800, (20, 2)), rng.uniform(-900, 900, 20)))
+    coefficients = rng.uniform(1, 10, 20)
+    monkeypatch.setattr(np.fft, "rfftn", None)
+    assert np.allclose(
+        get_mesh_potential(axes_positions, coefficients, origins),
+        get_direct_potential(axes_positions, coefficients, origins)
+    )
@@ -0,0 +1,58 @@
+from types import SimpleNamespace
+
+import numpy as np
+
+from src.bodies.computed_body import ComputedBody
+from src.bodies.gravitational_body import GravitationalBody
+from src.engines.playback import ObjectsPlayback
+from src.systems.computed_system import ComputedSystem
+from src.tools.vector import Vector
+
+
+def get_system(lengths: list[int]) -> ComputedSystem:
+    """
+    Creates a system of bodies moving along the x axis by one unit per sample, with trajectories of given lengths.
+    """
+    bodies = [
+        ComputedBody(
+            np.column_stack((np.arange(length), np.full(length, i), np.zeros(length))).astype(float), "dead", mass=1,
+            position=Vector(0, 0, 0), velocity=Vector(0, 0, 0), has_potential=False
+        ) for i, length in enumerate(lengths)
+    ]
+    return ComputedSystem(bodies)
+
+
+def test_states_of_played_bodies():
+    system = get_system([3, 5, 4])
+    system.seek(3)
+    # The objects are displayed in another order than the system's rows
+    objects = [SimpleNamespace(instance=body) for body in system.list_of_bodies[::-1]]
+    playback = ObjectsPlayback(system)
+    positions, dead_mask = playback.get_states(objects)
+    assert np.array_equal(positions, [[3, 2, 0], [3, 1, 0], [2, 0, 0]])
+    assert dead_mask.tolist() == [False, False, True]
+    for obj, position, dead in zip(objects, positions, dead_mask):
+        assert tuple(obj.instance.position) == tuple(position) and obj.instance.dead == dead
+
+
+def test_rows_follow_removed_objects():
+    system = get_system([3, 5, 4])
+    objects = [SimpleNamespace(instance=body) for body in system.list_of_bodies[::-1]]
+    playback = ObjectsPlayback(system)
+    system.seek(3)
+    positions, dead_mask = playback.get_states(objects)
+    objects = [obj for obj, dead in zip(objects, dead_mask) if not dead]
+    playback.keep(~dead_mask)
+    system.seek(4)
+    positions, dead_mask = playback.get_states(objects)
+    assert np.array_equal(positions, [[3, 2, 0], [4, 1, 0]])
+    assert dead_mask.tolist() == [True, False]
+
+
+def test_states_of_other_objects():
+    body = GravitationalBody(1, Vector(1, 2, 3), Vector(0, 0, 0))
+    body.dead = True
+    playback = ObjectsPlayback(None)
+    positions, dead_mask = playback.get_states([SimpleNamespace(instance=body), SimpleNamespace(instance=None)])
+    assert np.array_equal(positions[0], [1, 2, 3]) and np.isnan(positions[1]).all()
+    assert dead_mask.tolist() == [True, False]
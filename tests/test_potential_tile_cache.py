@@ -0,0 +1,54 @@
+import numpy as np
+import pytest
+
+from src.fields.potential_tile_cache import PotentialTileCache
+from src.fields.scalar_field import ScalarField
+from src.tools.vector import Vector
+
+
+def get_field() -> ScalarField:
+    """
+    Creates a smooth potential around the drawn views, whose singularities are outside of them.
+    """
+    return ScalarField([
+        (-1, -5000, Vector(-300, 200, 0)), (-1, -2000, Vector(900, 700, 40)), (2, 1e-3, Vector(300, 300, 0))
+    ])
+
+
+@pytest.mark.parametrize("start, stop, resolution", [
+    ((100, 50), (600, 400), (80, 60)),
+    ((200, 210), (230, 250), (40, 30)),
+    ((-100, -200), (300, 100), (50, 50))
+])
+def test_image_matches_potential_field(start, stop, resolution):
+    field = get_field()
+    image = PotentialTileCache(tile_size=32).get_image(field, start, stop, resolution)
+    expected = field.get_potential_field(
+        Vector(*start, 0), Vector(*stop, 0), {"x": resolution[0], "y": resolution[1]}
+    )[..., 0]
+    assert image.shape == tuple(resolution)
+    assert np.abs(image - expected).max() < 1e-4 * np.abs(expected).max()
+
+
+def test_image_of_other_plane_matches_potential_field():
+    field = get_field()
+    image = PotentialTileCache(tile_size=32).get_image(field, (0, 100), (400, 500), (40, 40), ("x", "z"), 250)
+    expected = field.get_potential_field(Vector(0, 0, 100), Vector(400, 0, 500), {"x": 40, "z": 40}, (0, 250, 0))
+    assert np.abs(image - expected[:, 0, :]).max() < 1e-4 * np.abs(expected).max()
+
+
+def test_tiles_are_reused_until_potential_changes():
+    field = get_field()
+    cache = PotentialTileCache(tile_size=32, max_tiles=30)
+    cache.get_image(field, (100, 50), (600, 400), (80, 60))
+    tiles_count = len(cache)
+    assert tiles_count
+    # Panning within the same tiles and drawing a copy of the potential computes no new tile
+    cache.get_image(field, (110, 60), (590, 390), (80, 60))
+    cache.get_image(field * 1, (100, 50), (600, 400), (80, 60))
+    assert len(cache) == tiles_count
+    # The tiles of a changed potential are computed again, the least recently used tiles being dropped
+    cache.get_image(field * 2, (100, 50), (600, 400), (80, 60))
+    assert len(cache) == min(2 * tiles_count, cache.max_tiles)
+    fingerprints = {key[0] for key in list(cache.tiles)[-tiles_count:]}
+    assert fingerprints == {cache.get_fingerprint(field * 2)}
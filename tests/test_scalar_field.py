@@ -0,0 +1,68 @@
+import numpy as np
+import pytest
+
+from src.fields.scalar_field import ScalarField
+from src.tools.vector import Vector
+
+
+def get_field() -> ScalarField:
+    """
+    Creates a field of terms of various powers, one of which is constant.
+    """
+    return ScalarField([
+        (-1, -5000, Vector(450, 450, 0)),
+        (-1, -20, Vector(600, 450, 10)),
+        (2, 0.5, Vector(300, 200, -40)),
+        (0, 7, Vector(0, 0, 0))
+    ])
+
+
+def test_gradients_match_finite_differences():
+    field = get_field()
+    positions = np.random.default_rng(0).uniform(100, 700, size=(50, 3))
+    epsilon = 1e-3
+    finite_differences = np.column_stack([
+        (field.evaluate(positions + offset) - field.evaluate(positions - offset)) / (2 * epsilon)
+        for offset in epsilon * np.eye(3)
+    ])
+    gradients = field.get_gradients(positions)
+    assert gradients.shape == (50, 3)
+    assert np.allclose(gradients, finite_differences, rtol=1e-6, atol=1e-9)
+    assert np.allclose(tuple(field.get_acceleration(Vector(*positions[0]))), -gradients[0])
+
+
+@pytest.mark.parametrize("nb_ticks_per_axis", [{"x": 13, "y": 9}, {"x": 5, "y": 4, "z": 6}])
+def test_chunked_grid_matches_whole_grid(nb_ticks_per_axis):
+    field = get_field()
+    start, stop, origin_position = Vector(100, 100, -50), Vector(700, 700, 50), (0, 0, 5)
+    for function in [field.evaluate, field.get_gradients]:
+        whole = ScalarField._compute_field_wide_operations(start, stop, function, nb_ticks_per_axis, origin_position)
+        for chunk_size in [1, 7, 1000]:
+            chunked = ScalarField._compute_field_wide_operations(
+                start, stop, function, nb_ticks_per_axis, origin_position, chunk_size
+            )
+            assert np.array_equal(chunked, whole)
+
+
+def test_grid_values_are_given_in_grid_shape():
+    field = get_field()
+    # The plane is at the height of the origin
+    x, y = np.linspace(100, 700, 13), np.linspace(100, 700, 9)
+    expected = [[field(Vector(x_i, y_j, 5)) for y_j in y] for x_i in x]
+    array = field.get_potential_field(Vector(100, 100, -50), Vector(700, 700, 50), {"x": 13, "y": 9}, (0, 0, 5))
+    assert array.shape == (13, 9, 1)
+    assert np.allclose(array[..., 0], expected)
+
+
+def test_grid_chunks_respect_memory_budget(monkeypatch):
+    field = get_field()
+    reference = field.get_potential_field(Vector(100, 100, 0), Vector(700, 700, 0), {"x": 40, "y": 30})
+    # A budget of a few positions at once splits the grid into many chunks
+    monkeypatch.setattr(ScalarField, "memory_budget", 4 * 3 * 8 * 4 * 5)
+    assert field._get_chunk_size() == 5
+    sizes = []
+    evaluate = field.evaluate
+    monkeypatch.setattr(field, "evaluate", lambda positions: sizes.append(len(positions)) or evaluate(positions))
+    chunked = field.get_potential_field(Vector(100, 100, 0), Vector(700, 700, 0), {"x": 40, "y": 30})
+    assert max(sizes) == 5 and sum(sizes) == 1200
+    assert np.array_equal(chunked, reference)
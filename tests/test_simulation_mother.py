@@ -0,0 +1,183 @@
+from multiprocessing import Pool
+from multiprocessing.shared_memory import SharedMemory
+from pickle import dumps, loads
+
+import numpy as np
+import pytest
+
+from src.bodies.computed_body import ComputedBody
+from src.bodies.fake_body import L4Body
+from src.bodies.gravitational_body import GravitationalBody
+from src.simulator.lambda_func import Lambda
+from src.simulator.simulation import Simulation
+from src.simulator.pickle_storage import PickleReader
+from src.simulator.simulation_mother import ResultsWriter, SharedArray, SimulationMother
+from src.systems.base_system import BaseSystem
+from src.tools.vector import Vector
+
+
+def get_system() -> BaseSystem:
+    """
+    Creates a system of a fixed sun, a moving earth and the L4 point.
+    """
+    return BaseSystem([
+        GravitationalBody(5.972e27, Vector(450, 450, 0), fixed=True),
+        GravitationalBody(5.972e24, Vector(600, 450, 0), Vector(0, 1e-3, 0)),
+        L4Body()
+    ])
+
+
+def get_body(time_survived: float, length: int) -> ComputedBody:
+    return ComputedBody(np.full((length, 3), time_survived), "dead", time_survived, mass=1,
+                        position=Vector(time_survived, 0, 0), velocity=Vector(0, 0, 0), has_potential=False)
+
+
+def get_shared_sum(shared_array: SharedArray) -> float:
+    return float(shared_array.array.sum())
+
+
+def get_arguments(save_foldername: str, **arguments) -> dict:
+    return dict(
+        simulation_count=7, bodies_per_simulation=2, body_initial_position_limits=[(100, 200), (100, 200), (0, 0)],
+        body_initial_velocity_limits=[(0, 0), (0, 0), (0, 0)], save_foldername=save_foldername,
+        simulation_duration=50000, delta_time=5000, positions_saving_frequency=2, batched=True, checkpoint_frequency=2
+    ) | arguments
+
+
+def interrupt_dispatch(monkeypatch, arguments: dict):
+    """
+    Runs a batched dispatch interrupted after its first two chunks of checkpoint_frequency simulations.
+    """
+    run_batched_simulations = SimulationMother.run_batched_simulations
+    calls = []
+    def interrupted_run_batched_simulations(self, *args, **kwargs):
+        calls.append(len(calls))
+        if len(calls) == 3:
+            raise KeyboardInterrupt
+        return run_batched_simulations(self, *args, **kwargs)
+    monkeypatch.setattr(SimulationMother, "run_batched_simulations", interrupted_run_batched_simulations)
+    try:
+        SimulationMother(get_system()).dispatch(**arguments)
+    except KeyboardInterrupt:
+        pass
+    monkeypatch.setattr(SimulationMother, "run_batched_simulations", run_batched_simulations)
+
+
+def test_batched_dispatch_matches_pool_dispatch(tmp_path):
+    results = []
+    for batched in [False, True]:
+        # Both dispatches draw the same initial conditions, some bodies leaving the allowed region
+        np.random.seed(0)
+        save_foldername = str(tmp_path / f"batched_{batched}")
+        SimulationMother(get_system()).dispatch(**get_arguments(
+            save_foldername, batched=batched, body_initial_velocity_limits=[(-1e-3, 1e-3), (-1e-3, 1e-3), (0, 0)],
+            body_alive_func=Lambda("lambda x,y,z: x > 140", 3)
+        ))
+        with np.load(f"{save_foldername}/bodies_info.npz") as file:
+            info = {key: file[key] for key in file.files}
+        system = Simulation.load_from_folder(save_foldername).system
+        trajectories = [np.array(body.positions) for body in system.list_of_bodies]
+        results.append((info, trajectories))
+
+    (pool_info, pool_trajectories), (batched_info, batched_trajectories) = results
+    assert "dead" in pool_info["types"]
+    assert np.array_equal(pool_info["types"], batched_info["types"])
+    assert np.array_equal(pool_info["death_steps"], batched_info["death_steps"])
+    for key in ["initial_positions", "initial_velocities", "time_survived"]:
+        assert np.allclose(pool_info[key], batched_info[key], equal_nan=True)
+    assert len(pool_trajectories) == len(batched_trajectories)
+    for pool_trajectory, batched_trajectory in zip(pool_trajectories, batched_trajectories):
+        assert pool_trajectory.shape == batched_trajectory.shape
+        assert np.allclose(pool_trajectory, batched_trajectory)
+
+
+def test_batched_dispatch_resumes_from_checkpoint(tmp_path, monkeypatch):
+    save_foldername = str(tmp_path / "run")
+    arguments = get_arguments(save_foldername)
+    interrupt_dispatch(monkeypatch, arguments)
+    checkpoint = SimulationMother.load_checkpoint(save_foldername)
+    assert checkpoint["completed"].tolist() == [True] * 4 + [False] * 3
+    assert checkpoint["attractive_completed"]
+
+    # Only the remaining simulations are run when resuming
+    run_batched_simulations = SimulationMother.run_batched_simulations
+    resumed_calls = []
+    def counted_run_batched_simulations(self, body_positions, *args, **kwargs):
+        resumed_calls.append(len(body_positions))
+        return run_batched_simulations(self, body_positions, *args, **kwargs)
+    monkeypatch.setattr(SimulationMother, "run_batched_simulations", counted_run_batched_simulations)
+    SimulationMother(get_system()).dispatch(**arguments, resume=True)
+    assert resumed_calls == [2, 1]
+    assert SimulationMother.load_checkpoint(save_foldername) is None
+
+    with np.load(f"{save_foldername}/bodies_info.npz") as file:
+        types, initial_positions = file["types"], file["initial_positions"]
+    assert types.tolist()[:2] == ["attractive_moving", "L4Body"]
+    assert len(types) == 2 + 14
+    # The bodies of a simulation share its initial position
+    assert np.array_equal(initial_positions[2:], np.repeat(checkpoint["body_positions"], 2, axis=0))
+
+
+@pytest.mark.parametrize("changed_arguments", [
+    dict(simulation_count=8), dict(bodies_per_simulation=3), dict(delta_time=2500), dict(simulation_duration=1e5),
+    dict(integrator="leapfrog"), dict(tolerance=1e-6), dict(encoding_resolution=1e-6), dict(storage="columnar")
+])
+def test_resume_with_other_parameters_fails(tmp_path, monkeypatch, changed_arguments):
+    save_foldername = str(tmp_path / "run")
+    interrupt_dispatch(monkeypatch, get_arguments(save_foldername))
+    with pytest.raises(ValueError, match=next(iter(changed_arguments))):
+        SimulationMother(get_system()).dispatch(**get_arguments(save_foldername, **changed_arguments), resume=True)
+    # The interrupted dispatch can still be resumed with its own parameters
+    assert SimulationMother.load_checkpoint(save_foldername)["completed"].sum() == 4
+
+
+@pytest.mark.parametrize("storage", ["pickle", "columnar"])
+def test_results_are_written_as_they_come(tmp_path, storage):
+    save_foldername = str(tmp_path)
+    results = [
+        {"dead": [get_body(3, 2), get_body(5, 3)], "alive": [], "fake": L4Body()},
+        {"dead": [get_body(4, 1)], "alive": [], "fake": L4Body()},
+        {"dead": [], "alive": [get_body(2, 4)], "fake": L4Body()}
+    ]
+    sizes = []
+    with ResultsWriter(save_foldername, storage) as writer:
+        for result in results:
+            writer.write(result)
+            # Every result is flushed to the disk before the next one is written
+            sizes.append(writer.file.size)
+        max_time_survived = writer.best_body_tracker.save(save_foldername)
+    assert sizes == sorted(sizes) and len(set(sizes)) == len(sizes)
+    # A body that stayed alive is the best body even if others survived longer before dying
+    assert max_time_survived == 2
+
+    index_filename = "bodies_info.npz" if storage == "pickle" else "bodies_index.npz"
+    with np.load(f"{save_foldername}/{index_filename}") as file:
+        types, time_survived = file["types"].tolist(), file["time_survived"].tolist()
+    # The fake body is written only once
+    assert types == ["dead", "dead", "L4Body", "dead", "alive"]
+    assert time_survived[:2] + time_survived[3:] == [3, 5, 4, 2]
+    if storage == "pickle":
+        bodies = PickleReader(save_foldername).get_bodies([0, 3, 4])
+        assert [len(body.positions) for body in bodies] == [2, 1, 4]
+
+
+def test_shared_array_is_sent_without_its_data():
+    array = np.random.default_rng(0).normal(size=(1000, 3))
+    shared_array = SharedArray(array)
+    try:
+        # Only the name of the memory block is pickled and the unpickled array reads the same block
+        assert len(dumps(shared_array)) < 1000
+        attached = loads(dumps(shared_array))
+        assert np.array_equal(attached.array, array)
+        shared_array.array[0] = 0
+        assert not attached.array[0].any()
+        with Pool(2) as pool:
+            assert pool.map(get_shared_sum, [shared_array] * 2) == [float(shared_array.array.sum())] * 2
+        name = shared_array.memory.name
+        attached.memory.close()
+    finally:
+        shared_array.release()
+    # The block is freed and releasing it again does nothing
+    with pytest.raises(FileNotFoundError):
+        SharedMemory(name=name)
+    shared_array.release()
@@ -0,0 +1,42 @@
+from pickle import dumps, loads
+
+import numpy as np
+
+from src.tools.trajectory_buffer import TrajectoryBuffer
+from src.tools.vector import Vector
+
+
+def test_buffer_grows_geometrically():
+    buffer = TrajectoryBuffer()
+    capacities = set()
+    for i in range(100):
+        buffer.append(Vector(i, 2*i, 3*i) if i % 2 else np.array([i, 2*i, 3*i]))
+        capacities.add(buffer.capacity)
+    assert len(buffer) == 100
+    assert sorted(capacities) == [16, 32, 64, 128]
+    assert np.array_equal(buffer.array, np.arange(100)[:, None] * [1, 2, 3])
+    assert buffer.array.dtype == np.float64
+
+
+def test_reserved_buffer_is_not_reallocated():
+    positions = np.arange(6, dtype=np.float64).reshape(2, 3)
+    buffer = TrajectoryBuffer(positions)
+    # The given positions are used without being copied until the buffer grows
+    assert np.shares_memory(buffer.array, positions)
+    buffer.reserve(50)
+    data = buffer._data
+    for i in range(48):
+        buffer.append((i, i, i))
+    assert buffer._data is data and buffer.capacity == 50
+    assert np.array_equal(buffer.array[:2], positions)
+
+
+def test_pickled_buffer_keeps_only_recorded_positions():
+    buffer = TrajectoryBuffer(capacity=1000)
+    for i in range(3):
+        buffer.append((i, 0, 0))
+    copy = loads(dumps(buffer))
+    assert len(dumps(buffer)) < 1000
+    assert copy.capacity == 3 and np.array_equal(copy.array, buffer.array)
+    copy.append((3, 0, 0))
+    assert len(copy) == 4 and len(buffer) == 3
@@ -0,0 +1,40 @@
+import numpy as np
+
+from src.tools.trajectory_codec import decode, encode
+
+
+def get_orbit(samples: int) -> np.ndarray:
+    """
+    Creates a circular orbit of radius 150 around (450,450,0).
+    """
+    angles = np.linspace(0, 4 * np.pi, samples)
+    return np.column_stack((450 + 150 * np.cos(angles), 450 + 150 * np.sin(angles), np.zeros(samples)))
+
+
+def test_round_trip_within_half_resolution():
+    positions = get_orbit(1000)
+    for resolution in (1e-2, 1e-4, 1e-6):
+        decoded = decode(encode(positions, resolution))
+        assert decoded.shape == positions.shape
+        assert np.abs(decoded - positions).max() <= resolution / 2 * (1 + 1e-6)
+
+
+def test_smooth_trajectory_uses_small_integers():
+    # The second differences of the orbit are about 2.4e-2, so a resolution of 1e-2 makes them fit in a byte
+    encoded = encode(get_orbit(1000), 1e-2)
+    assert encoded["dtype"] == np.dtype(np.uint8).str
+    assert len(encoded["payload"]) == 3 * 998
+
+
+def test_jumps_use_larger_integers():
+    positions = get_orbit(100)
+    positions[50:] += 1e4
+    encoded = encode(positions, 1e-4)
+    assert np.dtype(encoded["dtype"]).itemsize > 1
+    assert np.abs(decode(encoded) - positions).max() <= 5e-5 * (1 + 1e-6)
+
+
+def test_short_trajectories():
+    for length in (0, 1, 2):
+        positions = get_orbit(5)[:length]
+        assert np.allclose(decode(encode(positions, 1e-3)).reshape(-1, 3), positions, atol=5e-4)
@@ -0,0 +1,81 @@
+import warnings
+from pickle import dumps
+
+import numpy as np
+
+from src.bodies.fake_body import L4Body
+from src.bodies.gravitational_body import GravitationalBody
+from src.simulator import simulation_mother
+from src.simulator.simulation_mother import SharedArray, initialize_worker, worker_trial
+from src.simulator.lambda_func import Lambda
+from src.systems.vectorized_system import VectorizedSystem
+from src.tools.vector import Vector
+
+
+def get_system(**options) -> VectorizedSystem:
+    """
+    Creates a system of a fixed sun, a moving earth and the L4 point.
+    """
+    return VectorizedSystem([
+        GravitationalBody(5.972e27, Vector(450, 450, 0), fixed=True),
+        GravitationalBody(5.972e24, Vector(600, 450, 0), Vector(0, 1e-3, 0)),
+        L4Body()
+    ], **options)
+
+
+def get_test_body(position: tuple) -> GravitationalBody:
+    return GravitationalBody(1, Vector(*position), has_potential=False)
+
+
+def test_copy_with_bodies_keeps_options():
+    system = get_system(
+        force_solver="barnes-hut", opening_angle=0.3, fixed_acceleration_tolerance=1e-2, integrator="yoshida"
+    )
+    copy = system.copy_with_bodies(system.list_of_bodies + [get_test_body((150, 150, 0))], integrator="leapfrog")
+    assert isinstance(copy, VectorizedSystem)
+    assert copy.force_solver == "barnes-hut"
+    assert copy.opening_angle == 0.3
+    assert copy.integrator == "leapfrog"
+    assert copy.acceleration_table is system.acceleration_table
+
+
+def test_copy_with_bodies_does_not_share_table_of_other_sources():
+    system = get_system(fixed_acceleration_tolerance=1e-2)
+    other_sun = GravitationalBody(5.972e27, Vector(300, 450, 0), fixed=True)
+    copy = system.copy_with_bodies([other_sun, *system.list_of_bodies[1:]])
+    assert copy.acceleration_table is not None
+    assert copy.acceleration_table is not system.acceleration_table
+
+
+def test_accelerations_exclude_own_source_silently():
+    source_positions = np.array([[0., 0, 0], [3, 0, 0]])
+    with warnings.catch_warnings():
+        warnings.simplefilter("error")
+        accelerations = VectorizedSystem.get_accelerations(
+            source_positions, source_positions, np.array([9., 18]), np.array([0, 1])
+        )
+    assert np.allclose(accelerations, [[2, 0, 0], [-1, 0, 0]])
+
+
+def test_dispatched_trial_uses_acceleration_table():
+    system = get_system(fixed_acceleration_tolerance=1e-2)
+    shared_arrays = [SharedArray(np.array([[150., 150, 0], [700, 700, 0]])), SharedArray(np.zeros((2, 3)))]
+    try:
+        initialize_worker(dumps(system), *shared_arrays, dict(
+            delta_time=5000, simulation_duration=50000, positions_saving_frequency=2, potential_gradient_limit=1e10,
+            body_alive_func=Lambda("lambda x,y,z: True", 3), integrator="synchronous", tolerance=None,
+            ephemeris=None
+        ))
+        table = simulation_mother.worker_state["system"].acceleration_table
+        assert not len(table.grids)
+        result = worker_trial(0)
+        assert len(result["alive"]) == 2
+        # The grids computed by the trial belong to the worker's system and are reused by the next trials
+        grids_count = len(table.grids)
+        assert grids_count
+        worker_trial(0)
+        assert len(table.grids) == grids_count
+    finally:
+        simulation_mother.worker_state.clear()
+        for shared_array in shared_arrays:
+            shared_array.release()